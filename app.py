@@ -65,7 +65,7 @@ from core.url_validator import is_blocked, classify_url
 # RAG
 # ============================================================================
 
-from rag import KnowledgeBaseManager
+from rag import KnowledgeBaseManager, RetrievalRequest
 
 # ============================================================================
 # EXPORT
@@ -739,6 +739,9 @@ if submit and user_input.strip():
             # Prepare RAG context if active
             context_text = ""
             sources = []
+            # v1.16.0 — Embedding della domanda calcolato una volta, condiviso
+            # tra KB wiki e KB chat
+            retrieval = RetrievalRequest(user_input.strip())
             
             if st.session_state.get("use_knowledge_base"):
                 kb_manager: KnowledgeBaseManager = st.session_state.get("kb_manager")
@@ -746,7 +749,7 @@ if submit and user_input.strip():
                     top_k = st.session_state.get("rag_top_k", DEFAULT_TOP_K_RESULTS)
                     with st.spinner("🔍 Ricerca documenti rilevanti..."):
                         context_text, sources = kb_manager.get_context_for_prompt(
-                            user_input.strip(),
+                            retrieval,
                             top_k
                         )
 
@@ -759,7 +762,7 @@ if submit and user_input.strip():
                 _tipo_f = st.session_state.get("chat_kb_tipo_filter", []) or None
                 with st.spinner("📚 Ricerca nella KB Chat..."):
                     chat_kb_results = search_chat_kb(
-                        user_input.strip(), top_k=top_k_chat, tipo_filter=_tipo_f
+                        retrieval, top_k=top_k_chat, tipo_filter=_tipo_f
                     )
                 if chat_kb_results:
                     chat_context_parts = []
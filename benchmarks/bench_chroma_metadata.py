@@ -0,0 +1,105 @@
+# benchmarks/bench_chroma_metadata.py
+# DeepAiUG v1.16.0 - Benchmark spazio su disco dei metadata ChromaDB
+# ============================================================================
+# Costruisce due collection con gli stessi chunk ed embedding casuali:
+# metadata pre-v1.16.0 (Chunk.to_dict, con id e testo ripetuti) e metadata
+# snelli (Chunk.to_metadata). Confronta la dimensione su disco e il tempo di
+# query/lettura con include=["metadatas"].
+#
+# Uso:
+#   python benchmarks/bench_chroma_metadata.py            # 5000 chunk
+#   python benchmarks/bench_chroma_metadata.py 20000      # numero di chunk
+# ============================================================================
+
+import importlib.util
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from rag import Document, TextChunker
+from rag.vector_store import CHROMA_BATCH_SIZE
+
+EMBEDDING_DIM = 384  # multilingual-e5-small
+N_QUERIES = 50
+
+
+def _make_chunks(n_chunks: int) -> list:
+    """Chunk da ~1000 caratteri di testo pseudo-casuale."""
+    rng = random.Random(0)
+    vocab = [f"parola{i}" for i in range(5000)]
+    chunker = TextChunker()
+    chunks = []
+    doc_id = 0
+    while len(chunks) < n_chunks:
+        content = " ".join(rng.choices(vocab, k=1500))
+        chunks.extend(chunker.chunk_document(Document(path=f"doc_{doc_id}.md", content=content)))
+        doc_id += 1
+    return chunks[:n_chunks]
+
+
+def _dir_size(path: Path) -> int:
+    return sum(f.stat().st_size for f in path.rglob("*") if f.is_file())
+
+
+def _build(path: Path, chunks: list, vectors: list, slim: bool):
+    import chromadb
+
+    client = chromadb.PersistentClient(path=str(path))
+    collection = client.get_or_create_collection(name="bench_metadata", embedding_function=None)
+    for start in range(0, len(chunks), CHROMA_BATCH_SIZE):
+        batch = chunks[start:start + CHROMA_BATCH_SIZE]
+        collection.add(
+            ids=[c.id for c in batch],
+            documents=[c.text for c in batch],
+            metadatas=[c.to_metadata() if slim else c.to_dict() for c in batch],
+            embeddings=vectors[start:start + CHROMA_BATCH_SIZE],
+        )
+    return collection
+
+
+def _time_reads(collection, queries: list) -> tuple:
+    start = time.perf_counter()
+    for q in queries:
+        collection.query(query_embeddings=[q], n_results=5, include=["metadatas"])
+    query_ms = (time.perf_counter() - start) / len(queries) * 1000
+
+    start = time.perf_counter()
+    collection.get(include=["metadatas"])
+    scan_ms = (time.perf_counter() - start) * 1000
+    return query_ms, scan_ms
+
+
+def main():
+    if importlib.util.find_spec("chromadb") is None:
+        print("❌ ChromaDB non installato: pip install chromadb")
+        return
+
+    n_chunks = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    rng = random.Random(1)
+    chunks = _make_chunks(n_chunks)
+    vectors = [[rng.uniform(-1, 1) for _ in range(EMBEDDING_DIM)] for _ in chunks]
+    queries = [[rng.uniform(-1, 1) for _ in range(EMBEDDING_DIM)] for _ in range(N_QUERIES)]
+
+    print(f"{n_chunks} chunk, embedding {EMBEDDING_DIM} dim\n")
+    print(f"{'metadata':<12}{'disco MB':>10}{'query ms':>10}{'get() ms':>10}")
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, slim in (("v1.15 (dup)", False), ("v1.16", True)):
+            path = Path(tmp) / label.replace(" ", "_")
+            collection = _build(path, chunks, vectors, slim)
+            query_ms, scan_ms = _time_reads(collection, queries)
+            size_mb = _dir_size(path) / 1024 / 1024
+            results[label] = size_mb
+            print(f"{label:<12}{size_mb:>10.1f}{query_ms:>10.2f}{scan_ms:>10.0f}")
+
+    before, after = results["v1.15 (dup)"], results["v1.16"]
+    print(f"\nRisparmio su disco: {before - after:.1f} MB ({(1 - after / before) * 100:.0f}%)")
+
+
+if __name__ == "__main__":
+    main()
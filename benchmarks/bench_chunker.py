@@ -0,0 +1,101 @@
+# benchmarks/bench_chunker.py
+# DeepAiUG v1.16.0 - Benchmark TextChunker su documenti multi-MB
+# ============================================================================
+# Confronta il chunker attuale (offset + rfind limitato) con l'implementazione
+# v1.4.0 basata su slice, verificando che i chunk prodotti siano identici.
+#
+# Uso:
+#   python benchmarks/bench_chunker.py            # 1, 4, 8 MB
+#   python benchmarks/bench_chunker.py 2 16       # dimensioni in MB
+# ============================================================================
+
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from rag import Document, TextChunker
+
+
+def _legacy_chunk(chunker: TextChunker, content: str) -> list:
+    """Chunker v1.4.0: text[start:] + una slice per separatore a ogni chunk."""
+
+    def split_point(text, max_pos):
+        if max_pos >= len(text):
+            return len(text)
+        for sep in chunker.separators:
+            search_start = max(0, chunker.chunk_size // 3)
+            search_text = text[search_start:max_pos]
+            last_sep = search_text.rfind(sep)
+            if last_sep > 0:
+                return search_start + last_sep + len(sep)
+        return max_pos
+
+    text = re.sub(r'\n{4,}', '\n\n\n', content)
+    text = re.sub(r' {3,}', '  ', text)
+    out = []
+    start = 0
+    while start < len(text):
+        if start + chunker.chunk_size >= len(text):
+            chunk_text = text[start:].strip()
+            if chunk_text:
+                out.append((chunk_text, start, len(text)))
+            break
+        end = start + split_point(text[start:], chunker.chunk_size)
+        chunk_text = text[start:end].strip()
+        if chunk_text:
+            out.append((chunk_text, start, end))
+        start = max(start + 1, end - chunker.chunk_overlap)
+        if start >= len(text) or (end == start + chunker.chunk_size and end < len(text)):
+            break
+    return out
+
+
+def _make_text(size_mb: float, seed: int = 42) -> str:
+    """Testo sintetico simile a un PDF estratto: paragrafi, titoli, frasi."""
+    rng = random.Random(seed)
+    words = ["analisi", "dati", "modello", "sistema", "rete", "processo",
+             "valore", "risultato", "progetto", "sviluppo", "utente", "di",
+             "e", "il", "la", "per", "con"]
+    target = int(size_mb * 1024 * 1024)
+    parts = []
+    total = 0
+    while total < target:
+        sentence = " ".join(rng.choice(words) for _ in range(rng.randint(6, 20)))
+        sep = rng.choice([". ", ". ", ", ", "; ", ".\n", ".\n\n", "\n## Sezione\n"])
+        parts.append(sentence + sep)
+        total += len(sentence) + len(sep)
+    return "".join(parts)
+
+
+def main(sizes_mb):
+    chunker = TextChunker()
+    print(f"chunk_size={chunker.chunk_size} overlap={chunker.chunk_overlap}")
+    print(f"{'MB':>6} {'chunk':>8} {'v1.4.0 (s)':>11} {'offset (s)':>11} {'speedup':>8}")
+
+    for size in sizes_mb:
+        content = _make_text(size)
+        doc = Document(path="bench.txt", content=content)
+
+        t0 = time.perf_counter()
+        legacy = _legacy_chunk(chunker, content)
+        t_legacy = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        chunks = chunker.chunk_document(doc)
+        t_new = time.perf_counter() - t0
+
+        current = [(c.text, c.start_char, c.end_char) for c in chunks]
+        if current != legacy:
+            raise SystemExit(f"❌ Output diverso per {size} MB")
+
+        print(f"{size:>6g} {len(chunks):>8} {t_legacy:>11.3f} {t_new:>11.3f} "
+              f"{t_legacy / t_new if t_new else float('inf'):>7.1f}x")
+
+
+if __name__ == "__main__":
+    main([float(a) for a in sys.argv[1:]] or [1, 4, 8])
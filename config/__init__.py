@@ -22,6 +22,9 @@ from .constants import (
     DEFAULT_CHUNK_OVERLAP,
     DEFAULT_TOP_K_RESULTS,
     DEFAULT_EMBEDDING_MODEL,
+    SEARCH_MODES,
+    DEFAULT_SEARCH_MODE,
+    RRF_K,
     # Formati
     SUPPORTED_EXTENSIONS,
     EXPORT_FORMATS,
@@ -87,6 +90,9 @@ __all__ = [
     "DEFAULT_CHUNK_OVERLAP",
     "DEFAULT_TOP_K_RESULTS",
     "DEFAULT_EMBEDDING_MODEL",
+    "SEARCH_MODES",
+    "DEFAULT_SEARCH_MODE",
+    "RRF_K",
     "SUPPORTED_EXTENSIONS",
     "EXPORT_FORMATS",
     "CONTENT_OPTIONS",
@@ -48,6 +48,13 @@ DEFAULT_CHUNK_SIZE = 1000  # caratteri
 DEFAULT_CHUNK_OVERLAP = 200  # caratteri
 DEFAULT_TOP_K_RESULTS = 5  # documenti per query
 
+# v1.16.0 — Modalità di ricerca nella KB: "dense" (solo embedding),
+# "keyword" (solo BM25) o "hybrid" (entrambe, fuse con Reciprocal Rank Fusion).
+# L'ibrida recupera sigle, codici e nomi propri che l'embedding perde.
+SEARCH_MODES = ("dense", "keyword", "hybrid")
+DEFAULT_SEARCH_MODE = "hybrid"
+RRF_K = 60  # costante standard di RRF: score = Σ 1 / (RRF_K + rank)
+
 # v1.15.0 — Modello di embedding multilingua usato da ChromaDB
 # Override possibile via env var DEEPAIUG_EMBEDDING_MODEL.
 # Vedi rag/embeddings.py per dettagli e modelli alternativi.
@@ -57,6 +64,27 @@ DEFAULT_EMBEDDING_MODEL = _os.environ.get(
     "intfloat/multilingual-e5-small",
 )
 
+# v1.16.0 — Cache persistente degli embedding dei passage (KB wiki + KB chat).
+# Chiave: (modello, prefix, hash testo). Eviction LRU oltre il limite.
+# ~1.5 KB per vettore a 384 dim → 512 MB ≈ 340k chunk. 0 = cache disattivata.
+EMBEDDING_CACHE_MAX_MB = int(_os.environ.get("DEEPAIUG_EMBEDDING_CACHE_MB", "512"))
+
+# v1.16.0 — Cache persistente del testo estratto da PDF/HTML/canvas
+# (LocalFolderAdapter). Chiave: (path, size, mtime, versione estrattore).
+# Eviction LRU oltre il limite. 0 = cache disattivata.
+EXTRACTION_CACHE_MAX_MB = int(_os.environ.get("DEEPAIUG_EXTRACTION_CACHE_MB", "256"))
+
+# v1.16.0 — Worker per il caricamento parallelo dei file (LocalFolderAdapter):
+# thread per md/txt, processi per PDF/HTML/canvas (estrazione CPU-bound).
+# 0 = numero di CPU, 1 = caricamento sequenziale.
+LOCAL_FOLDER_WORKERS = int(_os.environ.get("DEEPAIUG_LOAD_WORKERS", "0"))
+
+# v1.16.0 — Indici KB persistenti: uno per sorgente + parametri di chunking,
+# così si passa da una sorgente all'altra senza re-indicizzare. Oltre questo
+# budget su disco vengono rimossi gli indici usati meno di recente
+# (mai quello attivo). 0 = nessun limite.
+KB_INDEX_DISK_BUDGET_MB = int(_os.environ.get("DEEPAIUG_KB_INDEX_BUDGET_MB", "2048"))
+
 # ============================================================================
 # FORMATI FILE SUPPORTATI
 # ============================================================================
@@ -136,6 +164,15 @@ MEDIAWIKI_DEFAULT_REQUEST_DELAY = 0.5
 MEDIAWIKI_DEFAULT_BATCH_SIZE = 50
 MEDIAWIKI_DEFAULT_TIMEOUT = 30
 
+# v1.16.0 — Richieste contemporanee verso la wiki (MediaWiki/DokuWiki). Il
+# ritmo resta limitato a 1/request_delay richieste al secondo (token bucket
+# condiviso): i worker servono a sovrapporre le latenze. 1 = sequenziale.
+WIKI_FETCH_WORKERS = int(_os.environ.get("DEEPAIUG_WIKI_WORKERS", "4"))
+# Tentativi aggiuntivi su 429/5xx/errori di rete, con backoff esponenziale
+# a partire da WIKI_RETRY_BACKOFF secondi
+WIKI_FETCH_RETRIES = 3
+WIKI_RETRY_BACKOFF = 1.0
+
 # ============================================================================
 # WIKI TYPES SUPPORTATI
 # ============================================================================
@@ -147,6 +184,12 @@ WIKI_TYPES = {
         "description": "Wikipedia, wiki aziendali (mwclient)",
         "package": "mwclient",
     },
+    "mediawiki_dump": {
+        "name": "Dump MediaWiki (XML)",
+        "icon": "🗜️",
+        "description": "pages-articles.xml(.bz2) letto offline, senza API",
+        "package": None,
+    },
     "dokuwiki": {
         "name": "DokuWiki",
         "icon": "📘",
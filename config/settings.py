@@ -234,7 +234,7 @@ def is_source_type_available(source_type: str) -> bool:
     Returns:
         True se disponibile
     """
-    if source_type == "local":
+    if source_type in ("local", "mediawiki_dump"):
         return True
     
     if source_type == "mediawiki":
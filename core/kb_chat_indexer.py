@@ -4,14 +4,17 @@
 # Gestisce la collection ChromaDB "deepaiug_chat_kb" separata dalla wiki.
 # Pattern replicato da rag/vector_store.py, con metadati specifici per chat.
 # v1.15.0: usa embedding multilingua e5-small (vedi rag/embeddings.py).
+# v1.16.0: search_chat_kb accetta una RetrievalRequest (embedding condiviso).
+# v1.16.0: cache dei risultati, invalidata a ogni scrittura sulla collection.
 # ============================================================================
 
 import hashlib
 import json
 import math
+import threading
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Union
 
 from config import KNOWLEDGE_BASE_DIR
 from core.persistence import get_kb_metadata, list_saved_conversations, load_conversation
@@ -20,6 +23,7 @@ from rag.embeddings import (
     get_embeddings_helper,
     get_active_model_tag,
 )
+from rag.retrieval import RetrievalRequest, bump_index_generation, cached_search
 
 CHAT_KB_META_FILE = KNOWLEDGE_BASE_DIR / "chat_kb_meta.json"
 
@@ -33,10 +37,71 @@ TURN_SEPARATOR = "\n\n---\n\n"
 # Boost per rilevanza nel retrieval
 RILEVANZA_BOOST = {1: 1.0, 2: 1.15, 3: 1.30}
 
+# v1.16.0 — Handle ChromaDB condiviso a livello di processo (lazy init).
+# Evita di ricreare PersistentClient e ripetere il migration check a ogni
+# ricerca / render della sidebar. Invalidato solo quando cambia il modello
+# di embedding attivo (o il percorso di persistenza, es. nei test).
+_pool_lock = threading.Lock()
+_pooled_client = None
+_pooled_collection = None
+_pooled_key: Optional[tuple] = None
+
 
 def _get_chroma_collection():
     """
-    Ottiene la collection ChromaDB per le chat-KB.
+    Ritorna l'handle condiviso (client, collection) della chat-KB.
+
+    La collection viene aperta alla prima chiamata (vedi
+    _open_chroma_collection) e riusata finché non cambiano il modello di
+    embedding attivo o CHAT_KB_PERSIST_PATH.
+
+    Returns:
+        Tupla (client, collection) o (None, None) se ChromaDB non disponibile.
+    """
+    global _pooled_client, _pooled_collection, _pooled_key
+
+    key = (CHAT_KB_PERSIST_PATH, get_active_model_tag())
+    if _pooled_collection is not None and _pooled_key == key:
+        return _pooled_client, _pooled_collection
+
+    with _pool_lock:
+        if _pooled_collection is not None and _pooled_key == key:
+            return _pooled_client, _pooled_collection
+
+        client, collection = _open_chroma_collection()
+        if collection is not None:
+            _pooled_client, _pooled_collection, _pooled_key = client, collection, key
+            # Collection (ri)aperta, forse ricreata per cambio modello
+            _bump_chat_kb_generation()
+        return client, collection
+
+
+def reset_chat_kb_collection_pool():
+    """
+    Invalida l'handle condiviso: la prossima chiamata riapre la collection.
+    Usato dopo errori ChromaDB (es. collection rimossa dall'esterno).
+    """
+    global _pooled_client, _pooled_collection, _pooled_key
+    with _pool_lock:
+        _pooled_client = None
+        _pooled_collection = None
+        _pooled_key = None
+    _bump_chat_kb_generation()
+
+
+def _chat_kb_cache_key() -> str:
+    """Identificativo della collection per la cache dei risultati di ricerca."""
+    return f"{CHAT_KB_PERSIST_PATH}::{CHAT_KB_COLLECTION}"
+
+
+def _bump_chat_kb_generation():
+    """Invalida i risultati di ricerca in cache dopo una scrittura."""
+    bump_index_generation(_chat_kb_cache_key())
+
+
+def _open_chroma_collection():
+    """
+    Apre la collection ChromaDB per le chat-KB.
     Usa lo stesso pattern di SimpleVectorStore: PersistentClient + get_or_create.
 
     v1.15.0 — passa embedding_function multilingua e gestisce migrazione
@@ -185,7 +250,14 @@ def index_chat_to_kb(chat_json: dict) -> int:
 
     # Rimuovi chunk precedenti (re-index pulito)
     _remove_by_chat_id(collection, chat_id)
+    try:
+        return _add_chat_chunks(collection, chat_json, kb_meta, chat_id)
+    finally:
+        _bump_chat_kb_generation()
+
 
+def _add_chat_chunks(collection, chat_json: dict, kb_meta: dict, chat_id: str) -> int:
+    """Serializza, chunka e scrive nella collection i messaggi della chat."""
     # Serializza e chunka
     messages = chat_json.get("messages", [])
     if not messages:
@@ -240,6 +312,7 @@ def index_chat_to_kb(chat_json: dict) -> int:
             collection.add(**add_kwargs)
         except Exception as exc:
             print(f"❌ Errore batch ChromaDB chat-KB: {exc}")
+            reset_chat_kb_collection_pool()
             return 0
 
     return total
@@ -267,6 +340,7 @@ def _remove_by_chat_id(collection, chat_id: str) -> bool:
         existing = collection.get(where={"chat_id": chat_id})
         if existing and existing["ids"]:
             collection.delete(ids=existing["ids"])
+            _bump_chat_kb_generation()
         return True
     except Exception as exc:
         print(f"⚠️ Errore rimozione chat {chat_id} da KB: {exc}")
@@ -301,6 +375,7 @@ def get_kb_chat_stats() -> Dict[str, Any]:
         }
     except Exception as exc:
         print(f"⚠️ Errore stats chat-KB: {exc}")
+        reset_chat_kb_collection_pool()
         return {"total_chunks": 0, "total_chats": 0, "using_chromadb": False}
 
 
@@ -346,7 +421,7 @@ def _save_chat_kb_meta(data: Dict[str, Any]):
 
 
 def search_chat_kb(
-    query: str,
+    query: Union[str, RetrievalRequest],
     top_k: int = 5,
     tipo_filter: List[str] | None = None,
 ) -> List[Dict[str, Any]]:
@@ -354,7 +429,8 @@ def search_chat_kb(
     Cerca nella collection chat-KB e applica boost per rilevanza.
 
     Args:
-        query: Testo della query
+        query: Testo della query, o RetrievalRequest del turno (riusa
+               l'embedding già calcolato per la KB wiki)
         top_k: Numero massimo risultati
         tipo_filter: Lista tipi da includere (filtro post-processing su CSV).
                      None o [] = nessun filtro.
@@ -366,6 +442,23 @@ def search_chat_kb(
     if collection is None:
         return []
 
+    request = RetrievalRequest.of(query)
+    return cached_search(
+        _chat_kb_cache_key(),
+        request.query,
+        top_k,
+        tuple(sorted(tipo_filter or ())),
+        lambda: _query_chat_kb(collection, request, top_k, tipo_filter),
+    )
+
+
+def _query_chat_kb(
+    collection,
+    request: RetrievalRequest,
+    top_k: int,
+    tipo_filter: List[str] | None,
+) -> List[Dict[str, Any]]:
+    """Ricerca effettiva nella collection chat-KB (senza cache)."""
     try:
         count = collection.count()
         if count == 0:
@@ -374,7 +467,7 @@ def search_chat_kb(
         # Fetch extra results when filtering by tipo (post-processing)
         fetch_k = min(top_k * 3, count) if tipo_filter else min(top_k, count)
         results = collection.query(
-            query_texts=[query],
+            **request.chroma_query_kwargs(),
             n_results=fetch_k,
             include=["documents", "metadatas", "distances"],
         )
@@ -412,6 +505,7 @@ def search_chat_kb(
 
     except Exception as exc:
         print(f"❌ Errore ricerca chat-KB: {exc}")
+        reset_chat_kb_collection_pool()
         return []
 
 
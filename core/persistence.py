@@ -1,8 +1,10 @@
 # core/persistence.py
-# DeepAiUG v1.14.2 - Persistenza conversazioni + KB Metadata + vault_used
+# DeepAiUG v1.16.0 - Persistenza conversazioni + KB Metadata + vault_used + catalogo
 # ============================================================================
 
 import json
+import os
+import threading
 from datetime import datetime
 from pathlib import Path
 from typing import Dict, Any, List, Optional
@@ -15,6 +17,15 @@ from config import (
 )
 
 
+# v1.16.0 — Catalogo delle conversazioni salvate (riepiloghi per la sidebar).
+# Evita di ri-parsare tutti i conv_*.json a ogni rerun di Streamlit:
+# ogni voce conserva mtime_ns/size del file da cui è stata costruita,
+# così i file modificati a mano vengono rilevati e ri-letti.
+CATALOG_FILENAME = "_catalog.json"
+CATALOG_VERSION = 3  # v2: kb_enabled, v3: kb_chunk_size/kb_chunk_overlap
+
+_catalog_lock = threading.RLock()
+
 KB_METADATA_DEFAULT = {
     "includi_in_kb": False,
     "rilevanza": 1,
@@ -118,7 +129,8 @@ def save_conversation(
         filename = get_conversation_filename(conversation_id)
         with open(filename, "w", encoding="utf-8") as f:
             json.dump(conversation_data, f, indent=2, ensure_ascii=False)
-        
+
+        _catalog_update(filename, conversation_data)
         return True
         
     except Exception as e:
@@ -143,6 +155,7 @@ def update_conversation_kb_metadata(
         data["last_updated"] = datetime.now().isoformat()
         with open(filename, "w", encoding="utf-8") as f:
             json.dump(data, f, indent=2, ensure_ascii=False)
+        _catalog_update(filename, data)
         return True
     except Exception as e:
         print(f"❌ Errore aggiornamento kb_metadata: {e}")
@@ -175,47 +188,156 @@ def load_conversation(conversation_id: str) -> Optional[Dict[str, Any]]:
 def list_saved_conversations() -> List[Dict[str, Any]]:
     """
     Elenca tutte le conversazioni salvate.
-    
+
+    v1.16.0: legge i riepiloghi dal catalogo; solo i file nuovi o con
+    mtime/size diversi da quelli registrati vengono ri-parsati.
+
     Returns:
         Lista di dizionari con info conversazioni (id, created_at, model, etc.)
         ordinata per last_updated decrescente
     """
     try:
         ensure_conversations_dir()
-        conversations = []
-        
-        for file_path in CONVERSATIONS_DIR.glob("conv_*.json"):
-            try:
-                with open(file_path, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                sensitivity = conversation_has_sensitive_content(data)
-                conversations.append({
-                    "id": data.get("conversation_id"),
-                    "created_at": data.get("created_at"),
-                    "last_updated": data.get("last_updated"),
-                    "model": data.get("model"),
-                    "provider": data.get("provider"),
-                    "message_count": data.get("stats", {}).get("total_messages", 0),
-                    "is_sensitive": sensitivity["is_sensitive"],
-                    "reason": sensitivity["reason"],
-                    "has_wiki": sensitivity["has_wiki"],
-                    "has_folder": sensitivity["has_folder"],
-                    "has_documents": sensitivity["has_documents"],
-                    "kb_folder_path": data.get("knowledge_base", {}).get("kb_folder_path", ""),
-                    "kb_metadata": get_kb_metadata(data),  # v1.14.0
-                    "vault_used": get_vault_used(data),  # v1.14.2
-                })
-            except Exception:
-                continue
-        
+
+        with _catalog_lock:
+            entries = _load_catalog()
+            seen = set()
+            changed = False
+            conversations = []
+
+            for dir_entry in os.scandir(CONVERSATIONS_DIR):
+                name = dir_entry.name
+                if not (name.startswith("conv_") and name.endswith(".json")):
+                    continue
+                seen.add(name)
+                try:
+                    st = dir_entry.stat()
+                except OSError:
+                    continue
+
+                cached = entries.get(name)
+                if (
+                    cached
+                    and cached.get("mtime_ns") == st.st_mtime_ns
+                    and cached.get("size") == st.st_size
+                ):
+                    conversations.append(dict(cached["summary"]))
+                    continue
+
+                try:
+                    with open(dir_entry.path, "r", encoding="utf-8") as f:
+                        data = json.load(f)
+                    summary = _build_conversation_summary(data)
+                except Exception:
+                    if entries.pop(name, None) is not None:
+                        changed = True
+                    continue
+
+                entries[name] = _catalog_entry(st, summary)
+                changed = True
+                conversations.append(dict(summary))
+
+            # File rimossi a mano
+            for name in set(entries) - seen:
+                del entries[name]
+                changed = True
+
+            if changed:
+                _save_catalog(entries)
+
         # Ordina per data aggiornamento
-        conversations.sort(key=lambda x: x.get("last_updated", ""), reverse=True)
+        conversations.sort(key=lambda x: x.get("last_updated") or "", reverse=True)
         return conversations
-        
+
     except Exception:
         return []
 
 
+def _build_conversation_summary(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Costruisce il riepilogo di una conversazione mostrato nella sidebar."""
+    sensitivity = conversation_has_sensitive_content(data)
+    return {
+        "id": data.get("conversation_id"),
+        "created_at": data.get("created_at"),
+        "last_updated": data.get("last_updated"),
+        "model": data.get("model"),
+        "provider": data.get("provider"),
+        "message_count": data.get("stats", {}).get("total_messages", 0),
+        "is_sensitive": sensitivity["is_sensitive"],
+        "reason": sensitivity["reason"],
+        "has_wiki": sensitivity["has_wiki"],
+        "has_folder": sensitivity["has_folder"],
+        "has_documents": sensitivity["has_documents"],
+        "kb_folder_path": data.get("knowledge_base", {}).get("kb_folder_path", ""),
+        "kb_enabled": data.get("knowledge_base", {}).get("use_knowledge_base", False),
+        "kb_chunk_size": data.get("knowledge_base", {}).get("kb_chunk_size", DEFAULT_CHUNK_SIZE),
+        "kb_chunk_overlap": data.get("knowledge_base", {}).get("kb_chunk_overlap", DEFAULT_CHUNK_OVERLAP),
+        "kb_metadata": get_kb_metadata(data),  # v1.14.0
+        "vault_used": get_vault_used(data),  # v1.14.2
+    }
+
+
+# ============================================================================
+# CATALOGO CONVERSAZIONI - v1.16.0
+# ============================================================================
+
+def _catalog_path() -> Path:
+    return CONVERSATIONS_DIR / CATALOG_FILENAME
+
+
+def _catalog_entry(st: os.stat_result, summary: Dict[str, Any]) -> Dict[str, Any]:
+    return {"mtime_ns": st.st_mtime_ns, "size": st.st_size, "summary": summary}
+
+
+def _load_catalog() -> Dict[str, Dict[str, Any]]:
+    """Carica le voci del catalogo ({nome_file: voce}); vuoto se assente/corrotto."""
+    try:
+        with open(_catalog_path(), "r", encoding="utf-8") as f:
+            raw = json.load(f)
+        if raw.get("version") != CATALOG_VERSION:
+            return {}
+        return dict(raw.get("entries", {}))
+    except Exception:
+        return {}
+
+
+def _save_catalog(entries: Dict[str, Dict[str, Any]]):
+    """Scrive il catalogo in modo atomico (file temporaneo + replace)."""
+    path = _catalog_path()
+    tmp = path.with_suffix(".json.tmp")
+    try:
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(
+                {"version": CATALOG_VERSION, "entries": entries},
+                f,
+                ensure_ascii=False,
+            )
+        os.replace(tmp, path)
+    except Exception as e:
+        print(f"⚠️ Errore salvataggio catalogo conversazioni: {e}")
+
+
+def _catalog_update(filename: Path, data: Dict[str, Any]):
+    """Aggiorna la voce di una conversazione appena scritta su disco."""
+    try:
+        with _catalog_lock:
+            entries = _load_catalog()
+            entries[filename.name] = _catalog_entry(
+                filename.stat(), _build_conversation_summary(data)
+            )
+            _save_catalog(entries)
+    except Exception as e:
+        print(f"⚠️ Errore aggiornamento catalogo conversazioni: {e}")
+
+
+def _catalog_remove(filename: Path):
+    """Rimuove dal catalogo la voce di una conversazione eliminata."""
+    with _catalog_lock:
+        entries = _load_catalog()
+        if entries.pop(filename.name, None) is not None:
+            _save_catalog(entries)
+
+
 def delete_conversation(conversation_id: str) -> bool:
     """
     Elimina una conversazione salvata.
@@ -230,6 +352,7 @@ def delete_conversation(conversation_id: str) -> bool:
         filename = get_conversation_filename(conversation_id)
         if filename.exists():
             filename.unlink()
+            _catalog_remove(filename)
             return True
     except Exception as e:
         print(f"❌ Errore eliminazione conversazione: {e}")
@@ -5,11 +5,14 @@
 from .models import Document, Chunk
 from .chunker import TextChunker
 from .vector_store import SimpleVectorStore
+from .retrieval import RetrievalRequest
 from .manager import KnowledgeBaseManager
 from .adapters import (
     WikiAdapter,
+    SourceUnavailableError,
     LocalFolderAdapter,
     MediaWikiAdapter,
+    MediaWikiDumpAdapter,
     DokuWikiAdapter,
 )
 
@@ -21,11 +24,15 @@ __all__ = [
     "TextChunker",
     # Vector Store
     "SimpleVectorStore",
+    # Retrieval
+    "RetrievalRequest",
     # Manager
     "KnowledgeBaseManager",
     # Adapters
     "WikiAdapter",
+    "SourceUnavailableError",
     "LocalFolderAdapter",
     "MediaWikiAdapter",
+    "MediaWikiDumpAdapter",
     "DokuWikiAdapter",
 ]
@@ -2,14 +2,17 @@
 # DeepAiUG v1.4.1 - Modulo adapters
 # ============================================================================
 
-from .base import WikiAdapter
+from .base import WikiAdapter, SourceUnavailableError
 from .local_folder import LocalFolderAdapter
 from .mediawiki import MediaWikiAdapter
+from .mediawiki_dump import MediaWikiDumpAdapter
 from .dokuwiki import DokuWikiAdapter
 
 __all__ = [
     "WikiAdapter",
+    "SourceUnavailableError",
     "LocalFolderAdapter",
     "MediaWikiAdapter",
+    "MediaWikiDumpAdapter",
     "DokuWikiAdapter",
 ]
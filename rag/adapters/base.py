@@ -1,13 +1,27 @@
 # rag/adapters/base.py
 # DeepAiUG v1.4.0 - Adapter base per sorgenti documenti
+# v1.16.0 - iter_documents() per l'indicizzazione in streaming
+# v1.16.0 - SourceUnavailableError: sorgente non leggibile ≠ sorgente vuota
+# v1.16.0 - iter_load_documents() distingue "caricamento fallito" da "eliminato"
 # ============================================================================
 
 from abc import ABC, abstractmethod
-from typing import Dict, Any, List
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Tuple
 
 from ..models import Document
 
 
+class SourceUnavailableError(Exception):
+    """
+    La sorgente non è raggiungibile o non è stata letta per intero.
+
+    Sollevata da list_document_stamps() e iter_documents() al posto di un
+    listing vuoto o di una fine "normale": i documenti non visti non sono
+    stati cancellati dalla sorgente, quindi l'indice esistente non va
+    toccato.
+    """
+
+
 class WikiAdapter(ABC):
     """
     Classe base astratta per tutti gli adapter di sorgenti documenti.
@@ -55,6 +69,102 @@ class WikiAdapter(ABC):
         """
         raise NotImplementedError
     
+    def iter_documents(self, progress_callback=None) -> Iterator[Document]:
+        """
+        Genera i documenti della sorgente uno alla volta.
+        
+        Usato dall'indicizzazione in streaming: i documenti non vengono
+        accumulati in self.documents, così la memoria resta limitata anche
+        su sorgenti molto grandi. L'implementazione base ricade su
+        load_documents(); gli adapter la ridefiniscono per caricare
+        davvero un documento alla volta.
+        
+        Args:
+            progress_callback: Funzione opzionale (progress_fraction, status_text)
+            
+        Yields:
+            Document caricati
+            
+        Raises:
+            SourceUnavailableError: Sorgente non raggiungibile o lettura
+                interrotta prima della fine
+        """
+        yield from self.load_documents()
+    
+    def get_source_id(self) -> str:
+        """
+        Identificativo stabile della sorgente (es. percorso cartella, URL wiki).
+        
+        Usato dal manifest per capire se un indice esistente è stato
+        costruito dalla stessa sorgente.
+        
+        Returns:
+            Stringa identificativa della sorgente
+        """
+        return self.name
+    
+    def list_document_stamps(self) -> Optional[Dict[str, Dict[str, Any]]]:
+        """
+        Elenca i documenti della sorgente con uno "stamp" economico.
+        
+        Lo stamp (es. size + mtime per i file) permette di capire quali
+        documenti sono cambiati senza leggerne il contenuto. Gli adapter
+        che non lo supportano ritornano None: il manager caricherà tutti
+        i documenti e confronterà l'hash del contenuto.
+        
+        Returns:
+            {doc_path: stamp} oppure None se non supportato
+            
+        Raises:
+            SourceUnavailableError: Sorgente non raggiungibile o listing
+                non ottenibile (un dict vuoto significa "nessun documento")
+        """
+        return None
+    
+    def load_document(self, doc_path: str) -> Optional[Document]:
+        """
+        Carica un singolo documento a partire dal path ritornato da
+        list_document_stamps().
+        
+        Args:
+            doc_path: Path del documento
+            
+        Returns:
+            Document, None se vuoto o non più presente nella sorgente
+            
+        Raises:
+            Errori di caricamento (rete, timeout, lettura)
+        """
+        raise NotImplementedError
+    
+    def iter_load_documents(
+        self, doc_paths: Iterable[str]
+    ) -> Iterator[Tuple[str, Optional[Document], Optional[Exception]]]:
+        """
+        Carica più documenti (path da list_document_stamps()) nell'ordine dato.
+        
+        L'implementazione base chiama load_document() uno alla volta; gli
+        adapter possono ridefinirla per caricare in parallelo, purché
+        mantengano l'ordine.
+        
+        Args:
+            doc_paths: Path dei documenti
+            
+        Yields:
+            (doc_path, Document, None) se caricato; (doc_path, None, None) se
+            vuoto o non più presente nella sorgente; (doc_path, None, errore)
+            se il caricamento è fallito (rete, timeout...): in quel caso il
+            documento non va tolto dall'indice
+        """
+        for doc_path in doc_paths:
+            try:
+                doc = self.load_document(doc_path)
+            except Exception as e:
+                print(f"⚠️ Errore caricamento {doc_path}: {e}")
+                yield doc_path, None, e
+                continue
+            yield doc_path, doc, None
+    
     def get_document_count(self) -> int:
         """
         Ritorna il numero di documenti caricati.
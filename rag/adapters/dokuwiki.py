@@ -1,16 +1,24 @@
 # rag/adapters/dokuwiki.py
 # DeepAiUG v1.4.1 - Adapter per wiki DokuWiki
+# v1.16.0 - iter_documents() per l'indicizzazione in streaming
+# v1.16.0 - Sync incrementale: getRecentChanges + cache locale delle pagine
+# v1.16.0 - Richieste concorrenti con rate limit (token bucket) e retry
+# v1.16.0 - Wiki non raggiungibile o listing fallito: SourceUnavailableError
+# v1.16.0 - Pagine non scaricate (errori di rete) distinte da quelle cancellate
 # ============================================================================
 
 import re
 import json
 import time
 import hashlib
+import threading
 from pathlib import Path
-from datetime import datetime
-from typing import Dict, Any, List, Optional
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Tuple
 
-from .base import WikiAdapter
+from .base import WikiAdapter, SourceUnavailableError
+from .wiki_cache import WikiPageCache
+from .fetching import TokenBucket, call_with_retry, iter_ordered
 from ..models import Document
 from core.url_validator import is_blocked
 from config import (
@@ -18,6 +26,7 @@ from config import (
     MEDIAWIKI_DEFAULT_REQUEST_DELAY,
     MEDIAWIKI_DEFAULT_TIMEOUT,
 )
+from config.constants import WIKI_FETCH_WORKERS
 
 
 class DokuWikiAdapter(WikiAdapter):
@@ -28,7 +37,7 @@ class DokuWikiAdapter(WikiAdapter):
     - Connessione via XML-RPC a DokuWiki
     - Download batch delle pagine
     - Parsing DokuWiki syntax → testo pulito
-    - Cache locale per sync incrementali
+    - Cache locale per sync incrementali (getRecentChanges + revisioni)
     - Supporto autenticazione
     
     Richiede: dokuwiki (pip install dokuwiki)
@@ -65,6 +74,9 @@ class DokuWikiAdapter(WikiAdapter):
         self.timeout = config.get("timeout", MEDIAWIKI_DEFAULT_TIMEOUT) if config else MEDIAWIKI_DEFAULT_TIMEOUT
         self.request_delay = config.get("request_delay", MEDIAWIKI_DEFAULT_REQUEST_DELAY) if config else MEDIAWIKI_DEFAULT_REQUEST_DELAY
         self.strip_wiki_markup = config.get("strip_wiki_markup", True) if config else True
+        self.workers = config.get("workers", WIKI_FETCH_WORKERS) if config else WIKI_FETCH_WORKERS
+        # Ritmo massimo 1/request_delay richieste al secondo, anche in parallelo
+        self.rate_limiter = TokenBucket.from_delay(self.request_delay)
         
         # Cache
         self.cache_dir = Path(config.get("cache_dir", str(WIKI_CACHE_DIR))) if config else WIKI_CACHE_DIR
@@ -72,6 +84,10 @@ class DokuWikiAdapter(WikiAdapter):
         
         # Stato
         self.wiki = None
+        self._page_cache: Optional[WikiPageCache] = None
+        self._listing: Dict[str, str] = {}
+        # Un client XML-RPC per thread: ServerProxy non è thread-safe
+        self._local = threading.local()
         self.last_sync = None
         self.sync_stats = {}
         
@@ -110,20 +126,9 @@ class DokuWikiAdapter(WikiAdapter):
             return False
 
         try:
-            import dokuwiki
-            
-            # Costruisci URL XML-RPC
-            xmlrpc_url = self.wiki_url.rstrip("/") + "/lib/exe/xmlrpc.php"
-            
-            # Connetti (con o senza autenticazione)
-            if self.requires_auth and self.username and self.password:
-                self.wiki = dokuwiki.DokuWiki(
-                    xmlrpc_url,
-                    self.username,
-                    self.password
-                )
-            else:
-                self.wiki = dokuwiki.DokuWiki(xmlrpc_url)
+            self.wiki = self._new_client()
+            self._local = threading.local()
+            self._local.wiki = self.wiki
             
             # Verifica connessione con getVersion
             version = self.wiki.version
@@ -135,6 +140,45 @@ class DokuWikiAdapter(WikiAdapter):
             print(f"❌ Errore connessione a {self.wiki_url}: {e}")
             return False
     
+    def _new_client(self):
+        """Crea un client XML-RPC DokuWiki (con o senza autenticazione)."""
+        import dokuwiki
+        
+        # Costruisci URL XML-RPC
+        xmlrpc_url = self.wiki_url.rstrip("/") + "/lib/exe/xmlrpc.php"
+        
+        if self.requires_auth and self.username and self.password:
+            return dokuwiki.DokuWiki(
+                xmlrpc_url,
+                self.username,
+                self.password
+            )
+        return dokuwiki.DokuWiki(xmlrpc_url)
+    
+    def _client(self):
+        """
+        Client del thread corrente: quello di connect() nel thread che ha
+        connesso, uno nuovo (creato al primo uso) nei thread di iter_ordered.
+        """
+        client = getattr(self._local, "wiki", None)
+        if client is None:
+            client = self._local.wiki = self._new_client()
+        return client
+    
+    def _call(self, method: str, *args) -> Any:
+        """
+        Chiama client.pages.<method>(*args) con rate limit condiviso e retry
+        su 429/5xx/errori di rete.
+        """
+        return call_with_retry(
+            lambda: getattr(self._client().pages, method)(*args),
+            limiter=self.rate_limiter,
+        )
+    
+    def get_source_id(self) -> str:
+        """L'URL della wiki identifica la sorgente."""
+        return f"dokuwiki://{self.wiki_url}"
+    
     def load_documents(self, progress_callback=None) -> List[Document]:
         """
         Carica tutte le pagine dalla wiki DokuWiki.
@@ -146,45 +190,57 @@ class DokuWikiAdapter(WikiAdapter):
         Returns:
             Lista di Document caricati
         """
-        self.documents = []
+        self.documents = list(self.iter_documents(progress_callback))
+        return self.documents
+    
+    def iter_documents(self, progress_callback=None) -> Iterator[Document]:
+        """
+        Genera le pagine della wiki una alla volta, senza trattenerle in
+        memoria (indicizzazione in streaming).
         
-        if not self.connect():
-            return self.documents
+        Args:
+            progress_callback: Funzione opzionale (progress_fraction, status_text)
+                              per aggiornare la UI durante il caricamento
         
-        try:
-            pages_to_load = self._get_pages_list()
-            
-            if not pages_to_load:
-                print("⚠️ Nessuna pagina trovata con i filtri specificati")
-                return self.documents
+        Yields:
+            Document caricati
             
+        Raises:
+            SourceUnavailableError: Wiki non raggiungibile, listing fallito
+                o vuoto, caricamento interrotto o pagine non scaricate
+                (sollevata a fine iterazione: le pagine mancanti non sono
+                cancellate dalla wiki)
+        """
+        pages_to_load = self._list_pages_or_raise()
+        failed = 0
+        
+        try:
             total = len(pages_to_load)
+            loaded = 0
             
-            for i, page_info in enumerate(pages_to_load):
-                try:
-                    # Delay tra richieste
-                    if i > 0:
-                        time.sleep(self.request_delay)
-                    
-                    doc = self._load_page(page_info)
-                    if doc:
-                        self.documents.append(doc)
-                    
-                    # Callback progress
-                    if progress_callback:
-                        progress = (i + 1) / total
-                        status = f"📥 Caricamento: {i+1}/{total} pagine"
-                        progress_callback(progress, status)
-                    
-                except Exception as e:
+            # Pagine scaricate in parallelo (rate limit condiviso), in ordine
+            results = iter_ordered(self._load_page, pages_to_load, self.workers)
+            for i, (page_info, doc, error) in enumerate(results):
+                if error is not None:
+                    failed += 1
                     page_id = page_info.get("id", "unknown") if isinstance(page_info, dict) else str(page_info)
-                    print(f"⚠️ Errore pagina '{page_id}': {e}")
+                    print(f"⚠️ Errore pagina '{page_id}': {error}")
+                
+                # Callback progress
+                if progress_callback:
+                    progress = (i + 1) / total
+                    status = f"📥 Caricamento: {i+1}/{total} pagine"
+                    progress_callback(progress, status)
+                
+                if doc:
+                    loaded += 1
+                    yield doc
             
             # Aggiorna statistiche sync
             self.last_sync = datetime.now().isoformat()
             self.sync_stats = {
                 "total_pages": total,
-                "loaded_pages": len(self.documents),
+                "loaded_pages": loaded,
                 "wiki_url": self.wiki_url,
                 "timestamp": self.last_sync
             }
@@ -192,11 +248,210 @@ class DokuWikiAdapter(WikiAdapter):
             # Salva statistiche sync
             self._save_sync_info()
             
-            return self.documents
-            
         except Exception as e:
             print(f"❌ Errore caricamento pagine: {e}")
-            return self.documents
+            raise SourceUnavailableError(f"Caricamento pagine interrotto: {e}") from e
+        
+        if failed:
+            raise SourceUnavailableError(f"{failed} pagine non scaricate (errori di rete)")
+    
+    def _list_pages_or_raise(self) -> list:
+        """
+        Connessione + listing completo (_get_pages_list).
+        
+        Raises:
+            SourceUnavailableError: Wiki non raggiungibile, listing fallito o
+                vuoto (non va scambiato per "tutte le pagine cancellate")
+        """
+        if not self.connect():
+            raise SourceUnavailableError(f"Wiki non raggiungibile: {self.wiki_url}")
+        try:
+            pages = self._get_pages_list()
+        except Exception as e:
+            print(f"❌ Errore recupero lista pagine: {e}")
+            raise SourceUnavailableError(f"Lista pagine non disponibile: {e}") from e
+        if not pages:
+            print("⚠️ Nessuna pagina trovata con i filtri specificati")
+            raise SourceUnavailableError("Nessuna pagina trovata con i filtri specificati")
+        return pages
+    
+    # ------------------------------------------------------------------
+    # Sync incrementale (v1.16.0)
+    # ------------------------------------------------------------------
+    
+    def _doc_path(self, page_id: str) -> str:
+        """Path del Document di una pagina (URL, per unicità)."""
+        return f"dokuwiki://{self.wiki_url}/{page_id}"
+    
+    def _page_id_from_path(self, doc_path: str) -> str:
+        return doc_path[len(self._doc_path("")):]
+    
+    def _get_page_cache(self) -> WikiPageCache:
+        """Cache delle pagine di questa wiki (testo pulito o sintassi grezza)."""
+        if self._page_cache is None:
+            wiki_id = hashlib.md5(self.wiki_url.encode()).hexdigest()[:12]
+            suffix = "" if self.strip_wiki_markup else "_raw"
+            self._page_cache = WikiPageCache(self.cache_dir / f"pages_doku_{wiki_id}{suffix}.sqlite")
+        return self._page_cache
+    
+    def _listing_filters(self) -> Dict[str, Any]:
+        """Configurazione che determina quali pagine entrano nel listing."""
+        return {
+            "namespaces": self.namespaces,
+            "exclude_namespaces": self.exclude_namespaces,
+            "exclude_patterns": self.exclude_patterns,
+            "max_pages": self.max_pages,
+        }
+    
+    def _in_namespaces(self, page_id: str) -> bool:
+        """True se la pagina è in uno dei namespace configurati (o non ce ne sono)."""
+        if not self.namespaces:
+            return True
+        return any(page_id.startswith(ns.rstrip(":") + ":") for ns in self.namespaces)
+    
+    def list_document_stamps(self) -> Optional[Dict[str, Dict[str, Any]]]:
+        """
+        Elenca le pagine della wiki con la revisione corrente come stamp.
+        
+        Dopo la prima sync il listing completo è sostituito da
+        wiki.getRecentChanges a partire dall'ultima sync. Il listing completo
+        viene rifatto se i filtri cambiano, dopo cache_ttl_hours e sempre con
+        max_pages. Le pagine cancellate in DokuWiki restano nel listing con
+        una nuova revisione e contenuto vuoto: al caricamento ritornano None
+        e il manager le toglie dall'indice.
+        
+        Returns:
+            {doc_path: {"rev": revisione}}, None se la wiki non fornisce le
+            revisioni (il manager scorre allora tutte le pagine)
+            
+        Raises:
+            SourceUnavailableError: Wiki non raggiungibile, listing fallito o
+                vuoto: il manager annulla la sync senza toccare l'indice
+        """
+        if not self.connect():
+            raise SourceUnavailableError(f"Wiki non raggiungibile: {self.wiki_url}")
+        
+        cache = self._get_page_cache()
+        filters = self._listing_filters()
+        started_at = time.time()
+        since = cache.changes_since(filters, self.cache_ttl_hours)
+        if self.max_pages:
+            since = None
+        
+        changed = None
+        if since is not None:
+            try:
+                changed, removed = self._recent_changes(since)
+                cache.update_listing(changed, removed)
+            except Exception as e:
+                print(f"⚠️ getRecentChanges non disponibile ({e}): listing completo")
+                changed = None
+        
+        if changed is None:
+            pages = self._list_pages_or_raise()
+            listing = {}
+            for page_info in pages:
+                if not isinstance(page_info, dict):
+                    return None
+                rev = page_info.get("rev") or page_info.get("mtime")
+                if not rev:
+                    return None
+                listing[self._doc_path(page_info["id"])] = str(rev)
+            cache.replace_listing(listing)
+        
+        cache.mark_synced(started_at, full=changed is None, filters=filters)
+        self._listing = cache.listing()
+        
+        # Aggiorna statistiche sync
+        self.last_sync = datetime.now().isoformat()
+        self.sync_stats = {
+            "total_pages": len(self._listing),
+            "loaded_pages": len(self._listing),
+            "changed_pages": len(self._listing) if changed is None else len(changed),
+            "sync_mode": "full" if changed is None else "incremental",
+            "wiki_url": self.wiki_url,
+            "timestamp": self.last_sync
+        }
+        self._save_sync_info()
+        
+        return {doc_path: {"rev": rev} for doc_path, rev in self._listing.items()}
+    
+    def _recent_changes(self, since: float) -> Tuple[Dict[str, str], List[str]]:
+        """
+        Pagine modificate dopo il timestamp since (wiki.getRecentChanges).
+        
+        Args:
+            since: Timestamp Unix
+            
+        Returns:
+            ({doc_path: revisione} da aggiornare, doc_path da rimuovere)
+        """
+        try:
+            changes = self._call("changes", int(since))
+        except Exception as e:
+            # DokuWiki < 2023 risponde con un errore se non ci sono modifiche
+            if "no changes" not in str(e).lower():
+                raise
+            changes = []
+        
+        changed: Dict[str, str] = {}
+        removed: List[str] = []
+        for change in changes:
+            page_id = change.get("name", "")
+            doc_path = self._doc_path(page_id)
+            if self._in_namespaces(page_id) and self._should_include_page(page_id):
+                rev = change.get("version") or _to_timestamp(change.get("lastModified"))
+                changed[doc_path] = str(rev)
+            else:
+                removed.append(doc_path)
+        return changed, removed
+    
+    def iter_load_documents(
+        self, doc_paths: Iterable[str]
+    ) -> Iterator[Tuple[str, Optional[Document], Optional[Exception]]]:
+        """
+        Carica le pagine indicate (path da list_document_stamps()) in
+        parallelo, mantenendo l'ordine.
+        
+        Args:
+            doc_paths: Path delle pagine
+            
+        Yields:
+            (doc_path, Document oppure None se vuota/cancellata, errore se
+            il download è fallito)
+        """
+        if not self._listing:
+            self._listing = self._get_page_cache().listing()
+        for doc_path, doc, error in iter_ordered(self.load_document, doc_paths, self.workers):
+            if error is not None:
+                print(f"⚠️ Errore caricamento {doc_path}: {error}")
+            yield doc_path, doc, error
+    
+    def load_document(self, doc_path: str) -> Optional[Document]:
+        """
+        Carica una pagina (path da list_document_stamps()).
+        
+        Se la cache ha il testo della revisione del listing la pagina non
+        viene scaricata; altrimenti viene scaricata e salvata in cache.
+        """
+        cache = self._get_page_cache()
+        if not self._listing:
+            self._listing = cache.listing()
+        rev = self._listing.get(doc_path, "")
+        
+        hit = cache.get_text(doc_path, rev)
+        if hit is None:
+            page_id = self._page_id_from_path(doc_path)
+            content = self._call("get", page_id)
+            doc = self._build_document(page_id, page_id, int(rev) if rev.isdigit() else None, content)
+            # Anche le pagine vuote vanno in cache: non si riscaricano
+            # finché la revisione non cambia
+            hit = (doc.content, doc.metadata) if doc else ("", {})
+            if doc_path in self._listing:
+                cache.put_text(doc_path, rev, *hit)
+        
+        text, metadata = hit
+        return Document(doc_path, text, metadata) if text else None
     
     def _get_pages_list(self) -> list:
         """
@@ -206,40 +461,32 @@ class DokuWikiAdapter(WikiAdapter):
         
         Returns:
             Lista di dizionari con info pagina
+            
+        Raises:
+            Errori XML-RPC/di rete: un listing parziale non è affidabile
         """
         pages = []
         
-        try:
-            # Ottieni lista di tutte le pagine
-            if self.namespaces:
-                # Filtra per namespace specifici
-                for ns in self.namespaces:
-                    try:
-                        ns_pages = self.wiki.pages.list(ns)
-                        for page_info in ns_pages:
-                            if self._should_include_page(page_info):
-                                pages.append(page_info)
-                                if self.max_pages and len(pages) >= self.max_pages:
-                                    return pages
-                    except Exception as e:
-                        print(f"⚠️ Namespace '{ns}' non accessibile: {e}")
-            else:
-                # Tutte le pagine (namespace root)
-                try:
-                    all_pages = self.wiki.pages.list()
-                    for page_info in all_pages:
-                        if self._should_include_page(page_info):
-                            pages.append(page_info)
-                            if self.max_pages and len(pages) >= self.max_pages:
-                                return pages
-                except Exception as e:
-                    print(f"❌ Errore recupero lista pagine: {e}")
-            
-            return pages
-            
-        except Exception as e:
-            print(f"❌ Errore recupero lista pagine: {e}")
-            return []
+        # Ottieni lista di tutte le pagine
+        if self.namespaces:
+            # Filtra per namespace specifici
+            for ns in self.namespaces:
+                ns_pages = self._call("list", ns)
+                for page_info in ns_pages:
+                    if self._should_include_page(page_info):
+                        pages.append(page_info)
+                        if self.max_pages and len(pages) >= self.max_pages:
+                            return pages
+        else:
+            # Tutte le pagine (namespace root)
+            all_pages = self._call("list")
+            for page_info in all_pages:
+                if self._should_include_page(page_info):
+                    pages.append(page_info)
+                    if self.max_pages and len(pages) >= self.max_pages:
+                        return pages
+        
+        return pages
     
     def _should_include_page(self, page_info) -> bool:
         """
@@ -292,25 +539,45 @@ class DokuWikiAdapter(WikiAdapter):
             page_info: Dizionario con info pagina o stringa ID
             
         Returns:
-            Document se caricato con successo
-        """
-        try:
-            # Estrai ID pagina
-            if isinstance(page_info, dict):
-                page_id = page_info.get("id", "")
-                page_title = page_info.get("title", page_id)
-                page_modified = page_info.get("mtime", None)
-            else:
-                page_id = str(page_info)
-                page_title = page_id
-                page_modified = None
-            
-            if not page_id:
-                return None
+            Document, o None se la pagina è vuota
             
-            # Ottieni contenuto pagina
-            content = self.wiki.pages.get(page_id)
+        Raises:
+            Errori XML-RPC/di rete (dopo i retry)
+        """
+        # Estrai ID pagina
+        if isinstance(page_info, dict):
+            page_id = page_info.get("id", "")
+            page_title = page_info.get("title", page_id)
+            page_modified = page_info.get("mtime", None)
+        else:
+            page_id = str(page_info)
+            page_title = page_id
+            page_modified = None
+        
+        if not page_id:
+            return None
+        
+        # Ottieni contenuto pagina
+        content = self._call("get", page_id)
+        
+        return self._build_document(page_id, page_title, page_modified, content)
+    
+    def _build_document(
+        self, page_id: str, page_title: str, page_modified: Any, content: str
+    ) -> Optional[Document]:
+        """
+        Crea il Document di una pagina dalla sua sintassi DokuWiki.
+        
+        Args:
+            page_id: ID pagina (ns1:ns2:pagename)
+            page_title: Titolo della pagina
+            page_modified: Data dell'ultima modifica
+            content: Contenuto DokuWiki della pagina
             
+        Returns:
+            Document, o None se la pagina è vuota
+        """
+        try:
             if not content:
                 return None
             
@@ -331,10 +598,7 @@ class DokuWikiAdapter(WikiAdapter):
                 "last_modified": page_modified,
             }
             
-            # Usa URL come path per unicità
-            doc_path = f"dokuwiki://{self.wiki_url}/{page_id}"
-            
-            return Document(doc_path, content, metadata)
+            return Document(self._doc_path(page_id), content, metadata)
             
         except Exception as e:
             print(f"⚠️ Errore caricamento pagina: {e}")
@@ -455,3 +719,39 @@ class DokuWikiAdapter(WikiAdapter):
             stats["last_sync_info"] = sync_info
         
         return stats
+
+
+def _to_timestamp(value: Any) -> Optional[int]:
+    """
+    Timestamp Unix di una data restituita da XML-RPC.
+
+    Senza "version", getRecentChanges indica solo lastModified come
+    xmlrpc.client.DateTime ("20240131T10:15:00", con o senza offset): la
+    revisione va convertita nello stesso intero usato dal listing (mtime).
+    Le date senza fuso sono considerate UTC.
+    """
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return int(value)
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return int(value.timestamp())
+
+    text = str(getattr(value, "value", value)).strip()
+    if text.isdigit():
+        return int(text)
+    match = re.fullmatch(
+        r"(\d{4})-?(\d{2})-?(\d{2})T(\d{2}):?(\d{2}):?(\d{2})(?:Z|([+-])(\d{2}):?(\d{2}))?",
+        text,
+    )
+    if not match:
+        return None
+    year, month, day, hour, minute, second = (int(g) for g in match.groups()[:6])
+    moment = datetime(year, month, day, hour, minute, second, tzinfo=timezone.utc)
+    sign, off_h, off_m = match.groups()[6:]
+    if sign:
+        offset = timedelta(hours=int(off_h), minutes=int(off_m))
+        moment -= offset if sign == "+" else -offset
+    return int(moment.timestamp())
@@ -0,0 +1,219 @@
+# rag/adapters/fetching.py
+# DeepAiUG v1.16.0 - Richieste verso le wiki: rate limit, retry, concorrenza
+# ============================================================================
+# Prima ogni adapter wiki faceva una richiesta alla volta con
+# time.sleep(request_delay) tra l'una e l'altra: il tempo di sync era
+# (latenza + delay) × richieste. Ora:
+# - un TokenBucket per adapter fa rispettare il ritmo massimo
+#   (1 / request_delay richieste al secondo), condiviso tra i thread
+# - più richieste possono essere in volo insieme (iter_ordered): la durata
+#   dipende dal ritmo consentito dal server, non dalla latenza
+# - gli errori temporanei (429, 5xx, rete) vengono ritentati con backoff
+#   esponenziale, rispettando Retry-After quando presente
+# ============================================================================
+
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Iterable, Iterator, Optional, Tuple
+
+from config.constants import WIKI_FETCH_RETRIES, WIKI_RETRY_BACKOFF
+
+RETRYABLE_STATUS = frozenset({429, 500, 502, 503, 504})
+
+# Richieste in coda per worker oltre a quelle in esecuzione (come
+# _INFLIGHT_PER_WORKER del caricamento file locali)
+_INFLIGHT_PER_WORKER = 2
+
+# Latenza tipica di una richiesta alla wiki, usata solo per le stime di durata
+TYPICAL_REQUEST_LATENCY = 1.0
+
+
+class TokenBucket:
+    """
+    Limite di richieste al secondo condiviso tra thread.
+
+    Attributes:
+        rate: Richieste al secondo (None o <= 0 = nessun limite)
+        burst: Richieste consentite di fila dopo un periodo di inattività
+    """
+
+    def __init__(self, rate: Optional[float], burst: int = 1):
+        self.rate = rate if rate and rate > 0 else None
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_delay(cls, request_delay: float) -> "TokenBucket":
+        """Bucket equivalente al vecchio delay tra richieste (0 = nessun limite)."""
+        return cls(1.0 / request_delay if request_delay and request_delay > 0 else None)
+
+    def acquire(self):
+        """Attende finché una richiesta è consentita e la conteggia."""
+        if self.rate is None:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+def estimate_fetch_seconds(
+    requests: int,
+    request_delay: float,
+    workers: int,
+    latency: float = TYPICAL_REQUEST_LATENCY,
+) -> float:
+    """
+    Durata stimata di un numero di richieste fatte con iter_ordered.
+
+    I worker sovrappongono le latenze (requests × latency / workers), ma
+    il TokenBucket non fa partire più di 1/request_delay richieste al
+    secondo: vale il più lento dei due limiti.
+
+    Args:
+        requests: Richieste HTTP da fare
+        request_delay: Delay configurato (0 = nessun limite)
+        workers: Richieste contemporanee
+        latency: Durata di una singola richiesta
+
+    Returns:
+        Secondi stimati
+    """
+    latency_bound = requests * latency / max(1, workers)
+    rate_bound = requests * request_delay if request_delay and request_delay > 0 else 0.0
+    return max(latency_bound, rate_bound)
+
+
+def _status_code(error: BaseException) -> Optional[int]:
+    """Codice HTTP dell'errore (requests, xmlrpc.client), anche se incapsulato."""
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        response = getattr(error, "response", None)
+        for status in (
+            getattr(response, "status_code", None),
+            getattr(error, "status_code", None),
+            getattr(error, "errcode", None),
+        ):
+            if isinstance(status, int):
+                return status
+        error = error.__cause__ or error.__context__
+    return None
+
+
+def _retry_after(error: BaseException) -> Optional[float]:
+    """Secondi indicati dall'header Retry-After (solo forma numerica)."""
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if headers is None:
+        headers = getattr(error, "headers", None)
+    try:
+        return float(headers.get("Retry-After")) if headers else None
+    except (TypeError, ValueError):
+        return None
+
+
+def is_retryable(error: BaseException) -> bool:
+    """True per 429/5xx ed errori di rete senza risposta HTTP."""
+    status = _status_code(error)
+    if status is not None:
+        return status in RETRYABLE_STATUS
+    return isinstance(error, (OSError, TimeoutError))
+
+
+def call_with_retry(
+    fn: Callable[..., Any],
+    *args,
+    limiter: Optional[TokenBucket] = None,
+    retries: int = WIKI_FETCH_RETRIES,
+    backoff: float = WIKI_RETRY_BACKOFF,
+    **kwargs,
+) -> Any:
+    """
+    Esegue fn(*args, **kwargs) rispettando il rate limit, con retry.
+
+    Ogni tentativo consuma un token del limiter. Tra un tentativo e il
+    successivo attende Retry-After se indicato, altrimenti
+    backoff × 2^tentativo (± 25% casuale, per non risincronizzare i thread).
+
+    Args:
+        fn: Richiesta da eseguire
+        limiter: Rate limiter condiviso (None = nessun limite)
+        retries: Tentativi aggiuntivi dopo il primo
+        backoff: Attesa base in secondi
+
+    Returns:
+        Risultato di fn
+
+    Raises:
+        L'ultima eccezione di fn, o subito quelle non ritentabili
+    """
+    for attempt in range(retries + 1):
+        if limiter is not None:
+            limiter.acquire()
+        try:
+            return fn(*args, **kwargs)
+        except Exception as e:
+            if attempt >= retries or not is_retryable(e):
+                raise
+            wait = _retry_after(e)
+            if wait is None:
+                wait = backoff * (2 ** attempt) * random.uniform(0.75, 1.25)
+            print(f"⚠️ Richiesta fallita ({e}), nuovo tentativo tra {wait:.1f}s")
+            time.sleep(wait)
+
+
+def iter_ordered(
+    fn: Callable[[Any], Any], items: Iterable[Any], workers: int
+) -> Iterator[Tuple[Any, Any, Optional[Exception]]]:
+    """
+    Applica fn a ogni elemento su un pool di thread, risultati in ordine.
+
+    Al più workers × _INFLIGHT_PER_WORKER elementi sono in volo: i
+    risultati sono consegnati nell'ordine di items man mano che arrivano.
+    Con workers <= 1 esegue in sequenza nel thread chiamante.
+
+    Args:
+        fn: Funzione da applicare (es. download di una pagina o di un batch)
+        items: Elementi da elaborare
+        workers: Richieste contemporanee
+
+    Yields:
+        (elemento, risultato, None) oppure (elemento, None, eccezione)
+    """
+    if workers <= 1:
+        for item in items:
+            try:
+                yield item, fn(item), None
+            except Exception as e:
+                yield item, None, e
+        return
+
+    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="wiki-fetch")
+    window = deque()
+    try:
+        for item in items:
+            window.append((item, pool.submit(fn, item)))
+            if len(window) >= workers * _INFLIGHT_PER_WORKER:
+                yield _collect(*window.popleft())
+        while window:
+            yield _collect(*window.popleft())
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def _collect(item: Any, future) -> Tuple[Any, Any, Optional[Exception]]:
+    try:
+        return item, future.result(), None
+    except Exception as e:
+        return item, None, e
@@ -1,13 +1,79 @@
 # rag/adapters/local_folder.py
 # DeepAiUG v1.4.0 - Adapter per cartelle locali
+# v1.16.0 - iter_documents() per l'indicizzazione in streaming
+# v1.16.0 - Caricamento parallelo (thread per testo, processi per PDF/HTML)
+# v1.16.0 - Cache persistente del testo estratto (PDF/HTML/canvas)
+# v1.16.0 - Elenco file con walk_files (un passaggio, cartelle escluse potate)
+# v1.16.0 - Cartella non accessibile: SourceUnavailableError, non un listing vuoto
+# v1.16.0 - iter_load_documents(): errori di caricamento separati dai file vuoti
+# v1.16.0 - Chiave cache estrazione con l'estrattore HTML usato (bs4 o testo grezzo)
 # ============================================================================
 
+import importlib.util
+import os
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from pathlib import Path
 from datetime import datetime
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Tuple
 
-from .base import WikiAdapter
+from .base import WikiAdapter, SourceUnavailableError
 from ..models import Document
+from ..disk_cache import DiskLRUCache
+from ..vault import walk_files
+from config.constants import (
+    KNOWLEDGE_BASE_DIR,
+    LOCAL_FOLDER_WORKERS,
+    EXTRACTION_CACHE_MAX_MB,
+)
+
+# Estensioni con estrazione CPU-bound (pypdf, BeautifulSoup, JSON canvas):
+# in modalità parallela vanno in un pool di processi, il resto in thread
+PROCESS_POOL_EXTENSIONS = frozenset({".pdf", ".html", ".htm", ".canvas"})
+
+# File in volo per worker: limita la memoria mantenendo i pool occupati
+_INFLIGHT_PER_WORKER = 4
+
+# v1.16.0 — Cache del testo estratto. Solo per le estensioni costose: i file
+# di testo si rileggono più in fretta di quanto costi la cache.
+EXTRACTION_CACHE_FILE = KNOWLEDGE_BASE_DIR / "extraction_cache.sqlite"
+EXTRACTION_CACHE_EXTENSIONS = PROCESS_POOL_EXTENSIONS
+
+# Da incrementare quando cambia il codice di estrazione (_load_pdf_file,
+# _load_html_file, parse_canvas_file): invalida le voci in cache
+EXTRACTOR_VERSION = 1
+
+_extraction_cache_singleton: Optional[DiskLRUCache] = None
+_extraction_cache_init_failed: bool = False
+
+
+def get_extraction_cache() -> Optional[DiskLRUCache]:
+    """
+    Singleton della cache del testo estratto. Ritorna None se disattivata
+    (EXTRACTION_CACHE_MAX_MB = 0) o non inizializzabile: in quel caso i
+    file vengono semplicemente ri-estratti.
+    
+    Usata solo dal processo principale (i worker del pool di processi non
+    toccano SQLite).
+    """
+    global _extraction_cache_singleton, _extraction_cache_init_failed
+
+    if _extraction_cache_singleton is not None:
+        return _extraction_cache_singleton
+    if _extraction_cache_init_failed or EXTRACTION_CACHE_MAX_MB <= 0:
+        return None
+
+    try:
+        _extraction_cache_singleton = DiskLRUCache(
+            EXTRACTION_CACHE_FILE,
+            max_bytes=EXTRACTION_CACHE_MAX_MB * 1024 * 1024,
+        )
+        return _extraction_cache_singleton
+    except Exception as e:
+        print(f"⚠️ Cache estrazione non disponibile ({e}). Testo ri-estratto.")
+        _extraction_cache_init_failed = True
+        return None
 
 
 class LocalFolderAdapter(WikiAdapter):
@@ -24,6 +90,9 @@ class LocalFolderAdapter(WikiAdapter):
         folder_path: Percorso della cartella da scansionare
         extensions: Lista estensioni da includere
         recursive: Se True, cerca anche nelle sottocartelle
+        exclude_patterns: Pattern (sottostringhe del path) da escludere
+        workers: Worker per il caricamento parallelo (0 = numero di CPU,
+            1 = sequenziale)
     """
     
     name = "Cartella Locale"
@@ -34,6 +103,8 @@ class LocalFolderAdapter(WikiAdapter):
         self.folder_path = config.get("folder_path", "") if config else ""
         self.extensions = config.get("extensions", [".md", ".txt", ".html"]) if config else [".md", ".txt", ".html"]
         self.recursive = config.get("recursive", True) if config else True
+        self.exclude_patterns = config.get("exclude_patterns", []) if config else []
+        self.workers = config.get("workers", LOCAL_FOLDER_WORKERS) if config else LOCAL_FOLDER_WORKERS
     
     def connect(self) -> bool:
         """
@@ -57,156 +128,240 @@ class LocalFolderAdapter(WikiAdapter):
         Returns:
             Lista di Document caricati
         """
-        self.documents = []
+        self.documents = list(self.iter_documents())
+        return self.documents
+    
+    def iter_documents(self, progress_callback=None) -> Iterator[Document]:
+        """
+        Genera i documenti della cartella nell'ordine dei file (caricati
+        in parallelo se workers > 1).
         
+        Args:
+            progress_callback: Funzione opzionale (progress_fraction, status_text)
+            
+        Yields:
+            Document caricati (i file illeggibili vengono saltati)
+            
+        Raises:
+            SourceUnavailableError: Cartella inesistente o non montata
+        """
         if not self.connect():
-            return self.documents
-        
-        folder = Path(self.folder_path)
+            raise SourceUnavailableError(f"Cartella non accessibile: {self.folder_path}")
         
-        # Trova tutti i file con estensioni supportate
-        if self.recursive:
-            files = []
-            for ext in self.extensions:
-                files.extend(folder.rglob(f"*{ext}"))
-        else:
-            files = []
-            for ext in self.extensions:
-                files.extend(folder.glob(f"*{ext}"))
+        files = self._list_files()
+        total = len(files)
         
-        for file_path in files:
-            try:
-                doc = self._load_single_file(file_path)
-                if doc:
-                    self.documents.append(doc)
-            except Exception as e:
-                print(f"⚠️ Errore caricamento {file_path.name}: {e}")
-        
-        return self.documents
+        for i, (file_path, doc, _) in enumerate(self._iter_load_files(files)):
+            if progress_callback:
+                progress_callback((i + 1) / total, f"📥 Caricamento: {i+1}/{total} file")
+            
+            if doc:
+                yield doc
     
-    def _load_single_file(self, file_path: Path) -> Optional[Document]:
+    def iter_load_documents(
+        self, doc_paths: Iterable[str]
+    ) -> Iterator[Tuple[str, Optional[Document], Optional[Exception]]]:
         """
-        Carica un singolo file.
+        Carica i file indicati, in parallelo se configurato (ordine invariato).
         
         Args:
-            file_path: Path del file da caricare
+            doc_paths: Path dei file (da list_document_stamps())
             
-        Returns:
-            Document se caricato con successo, None altrimenti
+        Yields:
+            (doc_path, Document oppure None se vuoto, errore se il
+            caricamento è fallito)
+        """
+        for file_path, doc, error in self._iter_load_files([Path(p) for p in doc_paths]):
+            yield str(file_path), doc, error
+    
+    def _resolve_workers(self) -> int:
+        """Numero effettivo di worker (0/None = numero di CPU)."""
+        return int(self.workers or os.cpu_count() or 1)
+    
+    def _iter_load_files(
+        self, files: List[Path]
+    ) -> Iterator[Tuple[Path, Optional[Document], Optional[Exception]]]:
         """
-        ext = file_path.suffix.lower()
+        Carica i file nell'ordine dato: sequenzialmente con un solo worker,
+        altrimenti con i pool (vedi _iter_load_parallel).
+        """
+        workers = self._resolve_workers()
+        if workers <= 1 or len(files) < 2:
+            for file_path in files:
+                try:
+                    doc = self._load_single_file(file_path)
+                except Exception as e:
+                    print(f"⚠️ Errore caricamento {file_path.name}: {e}")
+                    yield file_path, None, e
+                    continue
+                yield file_path, doc, None
+            return
+        yield from self._iter_load_parallel(files, workers)
+    
+    def _iter_load_parallel(
+        self, files: List[Path], workers: int
+    ) -> Iterator[Tuple[Path, Optional[Document], Optional[Exception]]]:
+        """
+        Caricamento parallelo con output in ordine deterministico.
+        
+        I file di testo vanno in un pool di thread (I/O), PDF/HTML/canvas in
+        un pool di processi (estrazione CPU-bound, fuori dal GIL). Al più
+        workers × _INFLIGHT_PER_WORKER file sono in volo: i risultati sono
+        consegnati nell'ordine di `files` man mano che arrivano.
+        """
+        n_heavy = sum(1 for f in files if f.suffix.lower() in PROCESS_POOL_EXTENSIONS)
+        thread_pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="kb-load")
+        process_pool = None
+        if n_heavy > 1:
+            try:
+                process_pool = ProcessPoolExecutor(max_workers=min(workers, n_heavy))
+            except Exception as e:
+                print(f"⚠️ Pool di processi non disponibile ({e}), uso i thread")
 
+        window = deque()
         try:
-            # F3 Vault Support: file .canvas Obsidian
-            if ext == '.canvas':
-                from rag.vault import parse_canvas_file
-                content = parse_canvas_file(file_path)
-                if content:
-                    metadata = {
-                        "file_size": file_path.stat().st_size,
-                        "modified_at": datetime.fromtimestamp(
-                            file_path.stat().st_mtime
-                        ).isoformat(),
-                    }
-                    return Document(str(file_path), content, metadata)
-                return None
-
-            if ext in [".md", ".txt"]:
-                content = self._load_text_file(file_path)
-            elif ext in [".html", ".htm"]:
-                content = self._load_html_file(file_path)
-            elif ext == ".pdf":
-                content = self._load_pdf_file(file_path)
-            else:
-                return None
-            
-            if content:
-                metadata = {
-                    "file_size": file_path.stat().st_size,
-                    "modified_at": datetime.fromtimestamp(
-                        file_path.stat().st_mtime
-                    ).isoformat(),
-                }
-                return Document(str(file_path), content, metadata)
+            for file_path in files:
+                # Cache consultata qui, nel processo principale
+                cache_key, cached = self._lookup_extraction_cache(file_path)
+                if cached is not None:
+                    future = Future()
+                    future.set_result(cached)
+                    cache_key = None
+                else:
+                    future = None
+                    if process_pool and file_path.suffix.lower() in PROCESS_POOL_EXTENSIONS:
+                        try:
+                            future = process_pool.submit(load_local_file, file_path)
+                        except BrokenProcessPool:
+                            # Un worker è terminato (es. memoria): il pool non
+                            # accetta più lavoro, i file rimanenti vanno nei thread
+                            print("⚠️ Pool di processi interrotto, continuo con i thread")
+                            process_pool.shutdown(wait=True, cancel_futures=True)
+                            process_pool = None
+                    if future is None:
+                        future = thread_pool.submit(load_local_file, file_path)
+                window.append((file_path, future, cache_key))
+                if len(window) >= workers * _INFLIGHT_PER_WORKER:
+                    yield self._collect_loaded(*window.popleft())
+            while window:
+                yield self._collect_loaded(*window.popleft())
+        finally:
+            thread_pool.shutdown(wait=True, cancel_futures=True)
+            if process_pool:
+                process_pool.shutdown(wait=True, cancel_futures=True)
+    
+    @staticmethod
+    def _collect_loaded(
+        file_path: Path, future, cache_key: Optional[str]
+    ) -> Tuple[Path, Optional[Document], Optional[Exception]]:
+        """Risultato di un caricamento parallelo (errori gestiti per file)."""
+        try:
+            try:
+                doc = future.result()
+            except BrokenProcessPool:
+                # Processo worker terminato (es. memoria): riprova qui
+                doc = load_local_file(file_path)
         except Exception as e:
-            print(f"⚠️ Errore lettura {file_path}: {e}")
-        
-        return None
+            print(f"⚠️ Errore caricamento {file_path.name}: {e}")
+            return file_path, None, e
+        _store_extraction_cache(cache_key, doc)
+        return file_path, doc, None
     
-    def _load_text_file(self, file_path: Path) -> str:
+    @staticmethod
+    def _lookup_extraction_cache(file_path: Path) -> Tuple[Optional[str], Optional[Document]]:
         """
-        Carica file di testo provando diversi encoding.
+        Cerca il testo estratto del file nella cache.
         
-        Args:
-            file_path: Path del file
-            
         Returns:
-            Contenuto del file come stringa
+            (chiave cache, Document se in cache). La chiave è None per i
+            file non cacheabili (testo semplice, cache disattivata).
         """
-        encodings = ["utf-8", "latin-1", "cp1252"]
-        for encoding in encodings:
-            try:
-                with open(file_path, "r", encoding=encoding) as f:
-                    return f.read()
-            except UnicodeDecodeError:
-                continue
-        return ""
+        if file_path.suffix.lower() not in EXTRACTION_CACHE_EXTENSIONS:
+            return None, None
+        cache = get_extraction_cache()
+        if cache is None:
+            return None, None
+        try:
+            stat = file_path.stat()
+            key = _extraction_cache_key(file_path, stat)
+            blob = cache.get(key)
+        except Exception as e:
+            print(f"⚠️ Cache estrazione non leggibile per {file_path.name}: {e}")
+            return None, None
+        if blob is None:
+            return key, None
+        return key, _build_document(file_path, blob.decode("utf-8", "surrogatepass"), stat)
     
-    def _load_html_file(self, file_path: Path) -> str:
+    def _list_files(self) -> List[Path]:
         """
-        Carica e pulisce file HTML.
+        Elenca i file da indicizzare (estensioni + pattern di esclusione).
         
-        Rimuove tag script, style, nav, footer, header.
-        Richiede beautifulsoup4.
-        
-        Args:
-            file_path: Path del file HTML
-            
         Returns:
-            Testo estratto dall'HTML
+            Lista ordinata di Path
         """
+        return walk_files(
+            self.folder_path,
+            self.extensions,
+            self.exclude_patterns,
+            recursive=self.recursive,
+        )
+    
+    def get_source_id(self) -> str:
+        """Il percorso assoluto della cartella identifica la sorgente."""
         try:
-            from bs4 import BeautifulSoup
-            html_content = self._load_text_file(file_path)
-            if html_content:
-                soup = BeautifulSoup(html_content, "html.parser")
-                # Rimuovi elementi non testuali
-                for tag in soup(["script", "style", "nav", "footer", "header"]):
-                    tag.decompose()
-                return soup.get_text(separator="\n", strip=True)
-        except ImportError:
-            print("⚠️ beautifulsoup4 non installato. Installa con: pip install beautifulsoup4")
-            return self._load_text_file(file_path)  # Fallback a testo grezzo
-        except Exception as e:
-            print(f"⚠️ Errore parsing HTML {file_path}: {e}")
-        return ""
+            return str(Path(self.folder_path).resolve())
+        except Exception:
+            return self.folder_path
     
-    def _load_pdf_file(self, file_path: Path) -> str:
+    def list_document_stamps(self) -> Optional[Dict[str, Dict[str, Any]]]:
         """
-        Carica file PDF.
+        Elenca i file della cartella con size e mtime, senza leggerli.
         
-        Richiede pypdf.
+        Returns:
+            {path_file: {"size": int, "mtime_ns": int}}
+            
+        Raises:
+            SourceUnavailableError: Cartella inesistente o non montata (es.
+                disco o share di rete scollegati): solo una cartella
+                esistente e vuota significa "tutti i file eliminati"
+        """
+        if not self.connect():
+            raise SourceUnavailableError(f"Cartella non accessibile: {self.folder_path}")
+        
+        stamps: Dict[str, Dict[str, Any]] = {}
+        
+        for file_path in self._list_files():
+            try:
+                stat = file_path.stat()
+            except OSError as e:
+                print(f"⚠️ Errore lettura {file_path.name}: {e}")
+                continue
+            stamps[str(file_path)] = {
+                "size": stat.st_size,
+                "mtime_ns": stat.st_mtime_ns,
+            }
+        return stamps
+    
+    def load_document(self, doc_path: str) -> Optional[Document]:
+        """Carica un singolo file della cartella (vedi _load_single_file)."""
+        return self._load_single_file(Path(doc_path))
+    
+    def _load_single_file(self, file_path: Path) -> Optional[Document]:
+        """
+        Carica un singolo file (vedi load_local_file), passando dalla cache
+        di estrazione per PDF/HTML/canvas.
         
         Args:
-            file_path: Path del file PDF
+            file_path: Path del file da caricare
             
         Returns:
-            Testo estratto dal PDF
+            Document se caricato con successo, None altrimenti
         """
-        try:
-            from pypdf import PdfReader
-            reader = PdfReader(str(file_path))
-            text_parts = []
-            for page in reader.pages:
-                text = page.extract_text()
-                if text:
-                    text_parts.append(text)
-            return "\n\n".join(text_parts)
-        except ImportError:
-            print("⚠️ pypdf non installato. Installa con: pip install pypdf")
-        except Exception as e:
-            print(f"⚠️ Errore lettura PDF {file_path}: {e}")
-        return ""
+        cache_key, doc = self._lookup_extraction_cache(file_path)
+        if doc is None:
+            doc = load_local_file(file_path)
+            _store_extraction_cache(cache_key, doc)
+        return doc
     
     def get_stats(self) -> Dict[str, Any]:
         """
@@ -219,4 +374,166 @@ class LocalFolderAdapter(WikiAdapter):
         stats["folder_path"] = self.folder_path
         stats["extensions"] = self.extensions
         stats["recursive"] = self.recursive
+        stats["exclude_patterns"] = self.exclude_patterns
         return stats
+
+
+# ============================================================================
+# Estrazione testo (funzioni di modulo: eseguibili nel pool di processi)
+# ============================================================================
+
+def load_local_file(file_path: Path) -> Optional[Document]:
+    """
+    Carica un singolo file.
+    
+    Args:
+        file_path: Path del file da caricare
+        
+    Returns:
+        Document se caricato con successo, None altrimenti
+    """
+    file_path = Path(file_path)
+    ext = file_path.suffix.lower()
+
+    try:
+        # F3 Vault Support: file .canvas Obsidian
+        if ext == '.canvas':
+            from rag.vault import parse_canvas_file
+            content = parse_canvas_file(file_path)
+        elif ext in [".md", ".txt"]:
+            content = _load_text_file(file_path)
+        elif ext in [".html", ".htm"]:
+            content = _load_html_file(file_path)
+        elif ext == ".pdf":
+            content = _load_pdf_file(file_path)
+        else:
+            return None
+        
+        if content:
+            return _build_document(file_path, content, file_path.stat())
+    except Exception as e:
+        print(f"⚠️ Errore lettura {file_path}: {e}")
+    
+    return None
+
+
+def _build_document(file_path: Path, content: str, stat: os.stat_result) -> Document:
+    """Crea il Document di un file con i metadati da stat."""
+    metadata = {
+        "file_size": stat.st_size,
+        "modified_at": datetime.fromtimestamp(stat.st_mtime).isoformat(),
+    }
+    return Document(str(file_path), content, metadata)
+
+
+def _extraction_cache_key(file_path: Path, stat: os.stat_result) -> str:
+    """Chiave cache: (versione estrattore, estrattore usato, path assoluto, size, mtime)."""
+    extractor = _extractor_tag(file_path.suffix.lower())
+    return f"{EXTRACTOR_VERSION}|{extractor}|{file_path.resolve()}|{stat.st_size}|{stat.st_mtime_ns}"
+
+
+def _extractor_tag(ext: str) -> str:
+    """
+    Estrattore che _load_html_file userà per l'estensione. Senza bs4 l'HTML
+    è salvato come testo grezzo: con la chiave distinta, installare bs4
+    invalida quelle voci invece di servirle per sempre.
+    """
+    if ext in (".html", ".htm"):
+        return "bs4" if importlib.util.find_spec("bs4") is not None else "raw"
+    return ""
+
+
+def _store_extraction_cache(cache_key: Optional[str], doc: Optional[Document]):
+    """
+    Salva in cache il testo estratto. I file senza testo non vengono
+    salvati: l'estrazione potrebbe essere fallita per una dipendenza
+    mancante (pypdf) e va ritentata. Il fallback HTML senza bs4 è salvato
+    con una chiave propria (vedi _extractor_tag).
+    """
+    if not cache_key or doc is None:
+        return
+    cache = get_extraction_cache()
+    if cache is None:
+        return
+    try:
+        cache.put(cache_key, doc.content.encode("utf-8", "surrogatepass"))
+    except Exception as e:
+        print(f"⚠️ Errore scrittura cache estrazione: {e}")
+
+
+def _load_text_file(file_path: Path) -> str:
+    """
+    Carica file di testo provando diversi encoding.
+    
+    Args:
+        file_path: Path del file
+        
+    Returns:
+        Contenuto del file come stringa
+    """
+    encodings = ["utf-8", "latin-1", "cp1252"]
+    for encoding in encodings:
+        try:
+            with open(file_path, "r", encoding=encoding) as f:
+                return f.read()
+        except UnicodeDecodeError:
+            continue
+    return ""
+
+
+def _load_html_file(file_path: Path) -> str:
+    """
+    Carica e pulisce file HTML.
+    
+    Rimuove tag script, style, nav, footer, header.
+    Richiede beautifulsoup4.
+    
+    Args:
+        file_path: Path del file HTML
+        
+    Returns:
+        Testo estratto dall'HTML
+    """
+    try:
+        from bs4 import BeautifulSoup
+        html_content = _load_text_file(file_path)
+        if html_content:
+            soup = BeautifulSoup(html_content, "html.parser")
+            # Rimuovi elementi non testuali
+            for tag in soup(["script", "style", "nav", "footer", "header"]):
+                tag.decompose()
+            return soup.get_text(separator="\n", strip=True)
+    except ImportError:
+        print("⚠️ beautifulsoup4 non installato. Installa con: pip install beautifulsoup4")
+        return _load_text_file(file_path)  # Fallback a testo grezzo
+    except Exception as e:
+        print(f"⚠️ Errore parsing HTML {file_path}: {e}")
+    return ""
+
+
+def _load_pdf_file(file_path: Path) -> str:
+    """
+    Carica file PDF.
+    
+    Richiede pypdf.
+    
+    Args:
+        file_path: Path del file PDF
+        
+    Returns:
+        Testo estratto dal PDF
+    """
+    try:
+        from pypdf import PdfReader
+        reader = PdfReader(str(file_path))
+        text_parts = []
+        for page in reader.pages:
+            text = page.extract_text()
+            if text:
+                text_parts.append(text)
+        return "\n\n".join(text_parts)
+    except ImportError:
+        print("⚠️ pypdf non installato. Installa con: pip install pypdf")
+    except Exception as e:
+        print(f"⚠️ Errore lettura PDF {file_path}: {e}")
+    return ""
@@ -1,5 +1,13 @@
 # rag/adapters/mediawiki.py
 # DeepAiUG v1.4.0 - Adapter per wiki MediaWiki
+# v1.16.0 - iter_documents() per l'indicizzazione in streaming
+# v1.16.0 - Contenuto scaricato a batch (prop=revisions, fino a 50 titoli)
+# v1.16.0 - Sync incrementale: recentchanges + cache locale delle pagine
+# v1.16.0 - Categorie escluse risolte in blocco (list=categorymembers)
+# v1.16.0 - Richieste concorrenti con rate limit (token bucket) e retry
+# v1.16.0 - strip_wikitext() e is_excluded_title() a livello di modulo (dump XML)
+# v1.16.0 - Wiki non raggiungibile o listing fallito: SourceUnavailableError
+# v1.16.0 - Pagine non scaricate (errori di rete) distinte da quelle cancellate
 # ============================================================================
 
 import re
@@ -7,10 +15,12 @@ import json
 import time
 import hashlib
 from pathlib import Path
-from datetime import datetime
-from typing import Dict, Any, List, Optional
+from datetime import datetime, timezone
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Tuple
 
-from .base import WikiAdapter
+from .base import WikiAdapter, SourceUnavailableError
+from .wiki_cache import WikiPageCache
+from .fetching import TokenBucket, call_with_retry, iter_ordered
 from ..models import Document
 from core.url_validator import is_blocked
 from config import (
@@ -20,6 +30,113 @@ from config import (
     MEDIAWIKI_DEFAULT_BATCH_SIZE,
     MEDIAWIKI_DEFAULT_TIMEOUT,
 )
+from config.constants import WIKI_FETCH_WORKERS
+
+# v1.16.0 — Limite dell'API MediaWiki per prop=revisions con contenuto su più
+# pagine (titles=A|B|...): al massimo 50 titoli per richiesta.
+MEDIAWIKI_MAX_TITLES_PER_REQUEST = 50
+
+
+def strip_wikitext(text: str) -> str:
+    """
+    Converte wikitext in testo pulito.
+    
+    Rimuove markup wiki, template, riferimenti e converte
+    la formattazione in equivalenti leggibili. Usata da MediaWikiAdapter
+    e MediaWikiDumpAdapter.
+    
+    Args:
+        text: Wikitext originale
+        
+    Returns:
+        Testo pulito
+    """
+    if not text:
+        return ""
+
+    # Rimuovi commenti HTML
+    text = re.sub(r'<!--.*?-->', '', text, flags=re.DOTALL)
+
+    # Rimuovi tag nowiki
+    text = re.sub(r'<nowiki>.*?</nowiki>', '', text, flags=re.DOTALL)
+
+    # Rimuovi template semplici ({{ ... }})
+    # Iterativo per template annidati
+    for _ in range(5):
+        prev = text
+        text = re.sub(r'\{\{[^{}]*\}\}', '', text)
+        if prev == text:
+            break
+
+    # Rimuovi tag ref
+    text = re.sub(r'<ref[^>]*>.*?</ref>', '', text, flags=re.DOTALL)
+    text = re.sub(r'<ref[^>]*/>', '', text)
+
+    # Converti wikilink [[link|testo]] → testo (o link se no testo)
+    text = re.sub(r'\[\[(?:[^|\]]*\|)?([^\]]+)\]\]', r'\1', text)
+
+    # Converti link esterni [url testo] → testo
+    text = re.sub(r'\[https?://[^\s\]]+\s+([^\]]+)\]', r'\1', text)
+    text = re.sub(r'\[https?://[^\s\]]+\]', '', text)
+
+    # Rimuovi bold/italic wiki
+    text = re.sub(r"'{2,5}", '', text)
+
+    # Converti titoli wiki in markdown
+    text = re.sub(r'^======\s*(.+?)\s*======', r'###### \1', text, flags=re.MULTILINE)
+    text = re.sub(r'^=====\s*(.+?)\s*=====', r'##### \1', text, flags=re.MULTILINE)
+    text = re.sub(r'^====\s*(.+?)\s*====', r'#### \1', text, flags=re.MULTILINE)
+    text = re.sub(r'^===\s*(.+?)\s*===', r'### \1', text, flags=re.MULTILINE)
+    text = re.sub(r'^==\s*(.+?)\s*==', r'## \1', text, flags=re.MULTILINE)
+    text = re.sub(r'^=\s*(.+?)\s*=', r'# \1', text, flags=re.MULTILINE)
+
+    # Rimuovi liste con * e # (converti in testo)
+    text = re.sub(r'^[*#]+\s*', '• ', text, flags=re.MULTILINE)
+
+    # Rimuovi tag HTML comuni
+    text = re.sub(r'<br\s*/?>', '\n', text, flags=re.IGNORECASE)
+    text = re.sub(r'</?[a-z][^>]*>', '', text, flags=re.IGNORECASE)
+
+    # Rimuovi categorie e interwiki
+    text = re.sub(r'\[\[(?:Category|Categoria):[^\]]+\]\]', '', text, flags=re.IGNORECASE)
+    text = re.sub(r'\[\[[a-z]{2,3}:[^\]]+\]\]', '', text)
+
+    # Normalizza whitespace
+    text = re.sub(r'\n{3,}', '\n\n', text)
+    text = re.sub(r' {2,}', ' ', text)
+
+    return text.strip()
+
+
+def is_excluded_title(title: str, exclude_pages: List[str]) -> bool:
+    """
+    True se il titolo è tra le pagine escluse (titolo esatto o pattern
+    con wildcard *).
+    """
+    if title in exclude_pages:
+        return True
+    for pattern in exclude_pages:
+        if "*" in pattern:
+            regex = pattern.replace("*", ".*")
+            if re.match(regex, title):
+                return True
+    return False
+
+
+class _ApiPage:
+    """
+    Pagina costruita da una risposta prop=info, con gli stessi attributi
+    delle pagine mwclient usati dall'adapter (evita una richiesta per titolo).
+    """
+    
+    def __init__(self, site, info: Dict[str, Any]):
+        self.site = site
+        self.name = info.get("title", "")
+        self.namespace = info.get("ns", 0)
+        self.exists = "missing" not in info and "invalid" not in info
+        self.redirect = "redirect" in info
+        self.revision = info.get("lastrevid", 0)
+        self.touched = info.get("touched")
 
 
 class MediaWikiAdapter(WikiAdapter):
@@ -30,7 +147,7 @@ class MediaWikiAdapter(WikiAdapter):
     - Connessione via mwclient a qualsiasi wiki MediaWiki
     - Download batch delle pagine
     - Parsing wikitext → testo pulito
-    - Cache locale per sync incrementali
+    - Cache locale per sync incrementali (recentchanges + revisioni)
     - Supporto autenticazione
     
     Richiede: mwclient (pip install mwclient)
@@ -74,6 +191,9 @@ class MediaWikiAdapter(WikiAdapter):
         self.request_delay = config.get("request_delay", MEDIAWIKI_DEFAULT_REQUEST_DELAY) if config else MEDIAWIKI_DEFAULT_REQUEST_DELAY
         self.batch_size = config.get("batch_size", MEDIAWIKI_DEFAULT_BATCH_SIZE) if config else MEDIAWIKI_DEFAULT_BATCH_SIZE
         self.strip_wiki_markup = config.get("strip_wiki_markup", True) if config else True
+        self.workers = config.get("workers", WIKI_FETCH_WORKERS) if config else WIKI_FETCH_WORKERS
+        # Ritmo massimo 1/request_delay richieste al secondo, anche in parallelo
+        self.rate_limiter = TokenBucket.from_delay(self.request_delay)
         
         # Cache
         self.cache_dir = Path(config.get("cache_dir", str(WIKI_CACHE_DIR))) if config else WIKI_CACHE_DIR
@@ -81,6 +201,9 @@ class MediaWikiAdapter(WikiAdapter):
         
         # Stato
         self.site = None
+        self._page_cache: Optional[WikiPageCache] = None
+        self._listing: Dict[str, str] = {}
+        self._excluded_titles: Optional[set] = None
         self.last_sync = None
         self.sync_stats = {}
         
@@ -145,6 +268,10 @@ class MediaWikiAdapter(WikiAdapter):
             print(f"❌ Errore connessione a {self.wiki_url}: {e}")
             return False
     
+    def get_source_id(self) -> str:
+        """L'URL della wiki identifica la sorgente."""
+        return f"mediawiki://{self.wiki_url}"
+    
     def load_documents(self, progress_callback=None) -> List[Document]:
         """
         Carica tutte le pagine dalla wiki.
@@ -156,44 +283,63 @@ class MediaWikiAdapter(WikiAdapter):
         Returns:
             Lista di Document caricati
         """
-        self.documents = []
+        self.documents = list(self.iter_documents(progress_callback))
+        return self.documents
+    
+    def iter_documents(self, progress_callback=None) -> Iterator[Document]:
+        """
+        Genera le pagine della wiki una alla volta, senza trattenerle in
+        memoria (indicizzazione in streaming).
         
-        if not self.connect():
-            return self.documents
+        Args:
+            progress_callback: Funzione opzionale (progress_fraction, status_text)
+                              per aggiornare la UI durante il caricamento
         
-        try:
-            pages_to_load = self._get_pages_list()
-            
-            if not pages_to_load:
-                print("⚠️ Nessuna pagina trovata con i filtri specificati")
-                return self.documents
+        Yields:
+            Document caricati
             
+        Raises:
+            SourceUnavailableError: Wiki non raggiungibile, listing fallito
+                o vuoto, caricamento interrotto o pagine non scaricate
+                (sollevata a fine iterazione: le pagine mancanti non sono
+                cancellate dalla wiki)
+        """
+        pages_to_load = self._list_pages_or_raise()
+        failed = 0
+        
+        try:
             total = len(pages_to_load)
-            
-            for i, page in enumerate(pages_to_load):
-                try:
-                    # Delay tra richieste
-                    if i > 0:
-                        time.sleep(self.request_delay)
-                    
-                    doc = self._load_page(page)
-                    if doc:
-                        self.documents.append(doc)
+            loaded = 0
+            done = 0
+            batch_size = max(1, min(self.batch_size or 1, MEDIAWIKI_MAX_TITLES_PER_REQUEST))
+            batches = [pages_to_load[s:s + batch_size] for s in range(0, total, batch_size)]
+            
+            # Batch scaricati in parallelo (rate limit condiviso), in ordine
+            for batch, revisions, error in iter_ordered(
+                lambda pages: self._fetch_revisions([p.name for p in pages]),
+                batches,
+                self.workers,
+            ):
+                for doc, page_error in self._batch_documents(batch, revisions, error):
+                    done += 1
+                    if page_error is not None:
+                        failed += 1
                     
                     # Callback progress
                     if progress_callback:
-                        progress = (i + 1) / total
-                        status = f"📥 Caricamento: {i+1}/{total} pagine"
+                        progress = done / total
+                        status = f"📥 Caricamento: {done}/{total} pagine"
                         progress_callback(progress, status)
                     
-                except Exception as e:
-                    print(f"⚠️ Errore pagina '{page.name}': {e}")
+                    if doc:
+                        loaded += 1
+                        yield doc
             
             # Aggiorna statistiche sync
             self.last_sync = datetime.now().isoformat()
             self.sync_stats = {
                 "total_pages": total,
-                "loaded_pages": len(self.documents),
+                "loaded_pages": loaded,
                 "wiki_url": self.wiki_url,
                 "timestamp": self.last_sync
             }
@@ -201,11 +347,245 @@ class MediaWikiAdapter(WikiAdapter):
             # Salva statistiche sync
             self._save_sync_info()
             
-            return self.documents
-            
         except Exception as e:
             print(f"❌ Errore caricamento pagine: {e}")
-            return self.documents
+            raise SourceUnavailableError(f"Caricamento pagine interrotto: {e}") from e
+        
+        if failed:
+            raise SourceUnavailableError(f"{failed} pagine non scaricate (errori di rete)")
+    
+    def _list_pages_or_raise(self) -> list:
+        """
+        Connessione + listing completo (_get_pages_list).
+        
+        Raises:
+            SourceUnavailableError: Wiki non raggiungibile, listing fallito o
+                vuoto (non va scambiato per "tutte le pagine cancellate")
+        """
+        if not self.connect():
+            raise SourceUnavailableError(f"Wiki non raggiungibile: {self.wiki_url}")
+        try:
+            pages = self._get_pages_list()
+        except Exception as e:
+            print(f"❌ Errore recupero lista pagine: {e}")
+            raise SourceUnavailableError(f"Lista pagine non disponibile: {e}") from e
+        if not pages:
+            print("⚠️ Nessuna pagina trovata con i filtri specificati")
+            raise SourceUnavailableError("Nessuna pagina trovata con i filtri specificati")
+        return pages
+    
+    # ------------------------------------------------------------------
+    # Sync incrementale (v1.16.0)
+    # ------------------------------------------------------------------
+    
+    def _doc_path(self, title: str) -> str:
+        """Path del Document di una pagina (URL, per unicità)."""
+        return f"mediawiki://{self.wiki_url}/wiki/{title}"
+    
+    def _title_from_path(self, doc_path: str) -> str:
+        return doc_path[len(self._doc_path("")):]
+    
+    def _get_page_cache(self) -> WikiPageCache:
+        """Cache delle pagine di questa wiki (testo pulito o wikitext grezzo)."""
+        if self._page_cache is None:
+            wiki_id = hashlib.md5(self.wiki_url.encode()).hexdigest()[:12]
+            suffix = "" if self.strip_wiki_markup else "_raw"
+            self._page_cache = WikiPageCache(self.cache_dir / f"pages_{wiki_id}{suffix}.sqlite")
+        return self._page_cache
+    
+    def _listing_filters(self) -> Dict[str, Any]:
+        """Configurazione che determina quali pagine entrano nel listing."""
+        return {
+            "namespaces": self.namespaces,
+            "categories": self.categories,
+            "exclude_categories": self.exclude_categories,
+            "exclude_pages": self.exclude_pages,
+            "include_redirects": self.include_redirects,
+            "max_pages": self.max_pages,
+        }
+    
+    def list_document_stamps(self) -> Optional[Dict[str, Dict[str, Any]]]:
+        """
+        Elenca le pagine della wiki con la revisione corrente come stamp.
+        
+        Dopo la prima sync il listing completo (allpages/categorie) è
+        sostituito da list=recentchanges a partire dall'ultima sync: si
+        ricontrollano solo le pagine modificate, create, cancellate o
+        spostate. Il listing completo viene rifatto se i filtri cambiano,
+        dopo cache_ttl_hours, e sempre con filtri per categoria o max_pages
+        (l'appartenenza non si ricava dalle modifiche recenti).
+        
+        Returns:
+            {doc_path: {"rev": revisione}}
+            
+        Raises:
+            SourceUnavailableError: Wiki non raggiungibile, listing fallito o
+                vuoto: il manager annulla la sync senza toccare l'indice
+        """
+        if not self.connect():
+            raise SourceUnavailableError(f"Wiki non raggiungibile: {self.wiki_url}")
+        
+        cache = self._get_page_cache()
+        filters = self._listing_filters()
+        started_at = time.time()
+        since = cache.changes_since(filters, self.cache_ttl_hours)
+        if self.categories or self.max_pages:
+            since = None
+        
+        changed = None
+        if since is not None:
+            try:
+                changed, removed = self._recent_changes(since)
+                cache.update_listing(changed, removed)
+            except Exception as e:
+                print(f"⚠️ recentchanges non disponibile ({e}): listing completo")
+                changed = None
+        
+        if changed is None:
+            pages = self._list_pages_or_raise()
+            cache.replace_listing({self._doc_path(p.name): str(p.revision) for p in pages})
+        
+        cache.mark_synced(started_at, full=changed is None, filters=filters)
+        self._listing = cache.listing()
+        
+        # Aggiorna statistiche sync
+        self.last_sync = datetime.now().isoformat()
+        self.sync_stats = {
+            "total_pages": len(self._listing),
+            "loaded_pages": len(self._listing),
+            "changed_pages": len(self._listing) if changed is None else len(changed),
+            "sync_mode": "full" if changed is None else "incremental",
+            "wiki_url": self.wiki_url,
+            "timestamp": self.last_sync
+        }
+        self._save_sync_info()
+        
+        return {doc_path: {"rev": rev} for doc_path, rev in self._listing.items()}
+    
+    def _recent_changes(self, since: float) -> Tuple[Dict[str, str], List[str]]:
+        """
+        Pagine toccate da list=recentchanges dopo il timestamp since.
+        
+        Ogni titolo coinvolto (per gli spostamenti anche la destinazione)
+        viene ricontrollato con prop=info: le pagine esistenti che passano
+        i filtri entrano nel listing con la nuova revisione, le altre
+        (cancellate, spostate, diventate redirect...) ne escono.
+        
+        Args:
+            since: Timestamp Unix
+            
+        Returns:
+            ({doc_path: revisione} da aggiornare, doc_path da rimuovere)
+        """
+        start = datetime.fromtimestamp(since, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+        self._excluded_titles = None
+        titles = set()
+        for change in self.site.recentchanges(
+            start=start,
+            dir="newer",
+            namespace="|".join(str(ns) for ns in self.namespaces),
+            prop="title|loginfo",
+            type="edit|new|log",
+        ):
+            titles.add(change.get("title"))
+            titles.add((change.get("logparams") or {}).get("target_title"))
+        titles.discard(None)
+        
+        changed: Dict[str, str] = {}
+        removed: List[str] = []
+        for page in self._page_infos(sorted(titles)):
+            doc_path = self._doc_path(page.name)
+            if (
+                page.exists
+                and page.namespace in self.namespaces
+                and self._should_include_page(page)
+            ):
+                changed[doc_path] = str(page.revision)
+            else:
+                removed.append(doc_path)
+        return changed, removed
+    
+    def _api(self, *args, **kwargs) -> Dict[str, Any]:
+        """site.api() con rate limit condiviso e retry su 429/5xx/errori di rete."""
+        return call_with_retry(self.site.api, *args, limiter=self.rate_limiter, **kwargs)
+    
+    def _page_infos(self, titles: List[str]) -> Iterator[_ApiPage]:
+        """Stato attuale (prop=info) dei titoli, fino a 50 per richiesta."""
+        for start in range(0, len(titles), MEDIAWIKI_MAX_TITLES_PER_REQUEST):
+            response = self._api(
+                "query",
+                prop="info",
+                titles="|".join(titles[start:start + MEDIAWIKI_MAX_TITLES_PER_REQUEST]),
+            )
+            for info in response.get("query", {}).get("pages", {}).values():
+                yield _ApiPage(self.site, info)
+    
+    def load_document(self, doc_path: str) -> Optional[Document]:
+        """Carica una pagina (path da list_document_stamps())."""
+        _, doc, error = next(self.iter_load_documents([doc_path]))
+        if error is not None:
+            raise error
+        return doc
+    
+    def iter_load_documents(
+        self, doc_paths: Iterable[str]
+    ) -> Iterator[Tuple[str, Optional[Document], Optional[Exception]]]:
+        """
+        Carica le pagine indicate (path da list_document_stamps()) nell'ordine.
+        
+        Le pagine il cui testo è in cache per la revisione del listing non
+        vengono scaricate; le altre sono scaricate a batch (_fetch_revisions),
+        più batch in parallelo, e salvate in cache.
+        
+        Args:
+            doc_paths: Path delle pagine
+            
+        Yields:
+            (doc_path, Document oppure None se vuota/cancellata, errore se
+            il download del batch è fallito)
+        """
+        if not self._listing:
+            self._listing = self._get_page_cache().listing()
+        doc_paths = list(doc_paths)
+        batch_size = max(1, min(self.batch_size or 1, MEDIAWIKI_MAX_TITLES_PER_REQUEST))
+        batches = [doc_paths[s:s + batch_size] for s in range(0, len(doc_paths), batch_size)]
+        
+        for batch, loaded, error in iter_ordered(self._load_paths, batches, self.workers):
+            if error is not None:
+                # Pagine non scaricate, non cancellate: restano nell'indice
+                print(f"⚠️ Errore download batch ({len(batch)} pagine): {error}")
+                loaded = [(doc_path, None, error) for doc_path in batch]
+            yield from loaded
+    
+    def _load_paths(
+        self, doc_paths: List[str]
+    ) -> List[Tuple[str, Optional[Document], Optional[Exception]]]:
+        """
+        Carica un batch di pagine: dalla cache se possibile, altrimenti con
+        una richiesta prop=revisions (eseguito nei thread di iter_ordered).
+        """
+        cache = self._get_page_cache()
+        hits = {p: cache.get_text(p, self._listing.get(p, "")) for p in doc_paths}
+        missing = [self._title_from_path(p) for p, hit in hits.items() if hit is None]
+        revisions = self._fetch_revisions(missing) if missing else {}
+        
+        loaded = []
+        for doc_path in doc_paths:
+            hit = hits[doc_path]
+            if hit is None:
+                title = self._title_from_path(doc_path)
+                revision = revisions.get(title)
+                doc = revision and self._build_document(
+                    title, revision["namespace"], revision["timestamp"], revision["content"]
+                )
+                # Anche le pagine vuote vanno in cache: non si riscaricano
+                # finché la revisione non cambia
+                hit = (doc.content, doc.metadata) if doc else ("", {})
+                if doc_path in self._listing:
+                    cache.put_text(doc_path, self._listing[doc_path], *hit)
+            text, metadata = hit
+            loaded.append((doc_path, Document(doc_path, text, metadata) if text else None, None))
+        return loaded
     
     def _get_pages_list(self) -> list:
         """
@@ -215,36 +595,32 @@ class MediaWikiAdapter(WikiAdapter):
         
         Returns:
             Lista di oggetti pagina mwclient
+            
+        Raises:
+            Errori di rete/API: un listing parziale non è affidabile
         """
         pages = []
-        
-        try:
-            if self.categories:
-                # Filtra per categorie specifiche
-                for cat_name in self.categories:
-                    try:
-                        category = self.site.categories[cat_name]
-                        for page in category:
-                            if self._should_include_page(page):
-                                pages.append(page)
-                                if self.max_pages and len(pages) >= self.max_pages:
-                                    return pages
-                    except Exception as e:
-                        print(f"⚠️ Categoria '{cat_name}' non trovata: {e}")
-            else:
-                # Tutte le pagine nei namespace specificati
-                for ns in self.namespaces:
-                    for page in self.site.allpages(namespace=ns):
-                        if self._should_include_page(page):
-                            pages.append(page)
-                            if self.max_pages and len(pages) >= self.max_pages:
-                                return pages
-            
-            return pages
-            
-        except Exception as e:
-            print(f"❌ Errore recupero lista pagine: {e}")
-            return []
+        self._excluded_titles = None
+        
+        if self.categories:
+            # Filtra per categorie specifiche
+            for cat_name in self.categories:
+                category = self.site.categories[cat_name]
+                for page in category:
+                    if self._should_include_page(page):
+                        pages.append(page)
+                        if self.max_pages and len(pages) >= self.max_pages:
+                            return pages
+        else:
+            # Tutte le pagine nei namespace specificati
+            for ns in self.namespaces:
+                for page in self.site.allpages(namespace=ns):
+                    if self._should_include_page(page):
+                        pages.append(page)
+                        if self.max_pages and len(pages) >= self.max_pages:
+                            return pages
+        
+        return pages
     
     def _should_include_page(self, page) -> bool:
         """
@@ -261,34 +637,149 @@ class MediaWikiAdapter(WikiAdapter):
             if not self.include_redirects and page.redirect:
                 return False
             
-            # Escludi pagine per titolo esatto
-            if page.name in self.exclude_pages:
+            # Escludi pagine per titolo esatto o pattern (supporta wildcard *)
+            if is_excluded_title(page.name, self.exclude_pages):
                 return False
             
-            # Pattern matching per esclusioni (supporta wildcard *)
-            for pattern in self.exclude_pages:
-                if "*" in pattern:
-                    regex = pattern.replace("*", ".*")
-                    if re.match(regex, page.name):
-                        return False
-            
-            # Escludi per categoria
-            if self.exclude_categories:
-                try:
-                    page_cats = [
-                        cat.name.replace("Category:", "").replace("Categoria:", "") 
-                        for cat in page.categories()
-                    ]
-                    if any(ec in page_cats for ec in self.exclude_categories):
-                        return False
-                except:
-                    pass
+            # Escludi per categoria (membri letti una volta per sync)
+            if self.exclude_categories and page.name in self._excluded_category_members():
+                return False
             
             return True
             
         except Exception:
             return False
     
+    def _excluded_category_members(self) -> set:
+        """
+        Titoli delle pagine nelle categorie escluse.
+        
+        Costruito con list=categorymembers (fino a 500 titoli per richiesta)
+        al primo uso di ogni sync, invece di chiedere le categorie di ogni
+        pagina candidata: poche richieste invece di una per pagina.
+        
+        Returns:
+            Set dei titoli da escludere
+        """
+        if self._excluded_titles is not None:
+            return self._excluded_titles
+        
+        excluded = set()
+        for cat_name in self.exclude_categories:
+            name = cat_name.replace("Category:", "").replace("Categoria:", "")
+            params = {
+                "list": "categorymembers",
+                "cmtitle": f"Category:{name}",
+                "cmprop": "title",
+                "cmlimit": "max",
+            }
+            continuation: Dict[str, Any] = {}
+            try:
+                while True:
+                    response = self._api("query", **params, **continuation)
+                    excluded.update(
+                        m["title"] for m in response.get("query", {}).get("categorymembers", [])
+                    )
+                    if "continue" not in response:
+                        break
+                    continuation = response["continue"]
+            except Exception as e:
+                print(f"⚠️ Categoria esclusa '{cat_name}' non leggibile: {e}")
+        
+        self._excluded_titles = excluded
+        return excluded
+    
+    def _batch_documents(
+        self,
+        pages: list,
+        revisions: Optional[Dict[str, Dict[str, Any]]],
+        error: Optional[Exception],
+    ) -> Iterator[Tuple[Optional[Document], Optional[Exception]]]:
+        """
+        Document di un batch di pagine scaricato con _fetch_revisions().
+        
+        Se la richiesta batch è fallita, ricade sul caricamento pagina per
+        pagina (sempre con rate limit).
+        
+        Args:
+            pages: Oggetti pagina mwclient (al massimo 50)
+            revisions: Risultato di _fetch_revisions() per il batch
+            error: Eccezione della richiesta batch, se fallita
+            
+        Yields:
+            (Document oppure None se vuota, errore se non scaricata) per
+            ogni pagina
+        """
+        if error is not None:
+            print(f"⚠️ Errore download batch ({len(pages)} pagine): {error}. "
+                  "Caricamento pagina per pagina.")
+            for page in pages:
+                try:
+                    yield self._load_page(page), None
+                except Exception as e:
+                    print(f"⚠️ Errore caricamento pagina {page.name}: {e}")
+                    yield None, e
+            return
+        
+        for page in pages:
+            revision = revisions.get(page.name)
+            if not revision:
+                yield None, None
+                continue
+            yield self._build_document(
+                page.name, page.namespace, str(page.touched), revision["content"]
+            ), None
+    
+    def _fetch_revisions(self, titles: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Wikitext dell'ultima revisione di più pagine
+        (action=query&prop=revisions&titles=A|B|...).
+        
+        Segue la continuazione dell'API: con pagine molto grandi MediaWiki
+        può restituire il contenuto su più risposte.
+        
+        Args:
+            titles: Titoli delle pagine
+            
+        Returns:
+            {titolo: {"content", "namespace", "timestamp"}} per le pagine trovate
+        """
+        params = {
+            "prop": "revisions",
+            "rvprop": "content|timestamp",
+            "rvslots": "main",
+            "titles": "|".join(titles),
+        }
+        contents: Dict[str, Dict[str, Any]] = {}
+        continuation: Dict[str, Any] = {}
+        
+        while True:
+            response = self._api("query", **params, **continuation)
+            query = response.get("query", {})
+            
+            # Titoli normalizzati dall'API (es. "pagina_x" → "Pagina x")
+            aliases = {n["to"]: n["from"] for n in query.get("normalized", [])}
+            
+            for page in query.get("pages", {}).values():
+                revisions = page.get("revisions")
+                if not revisions:
+                    continue
+                revision = revisions[0]
+                # MediaWiki ≥ 1.32: contenuto negli slot; prima in "*"
+                content = revision.get("slots", {}).get("main", {}).get("*", revision.get("*"))
+                if content is None:
+                    continue
+                title = aliases.get(page["title"], page["title"])
+                contents[title] = {
+                    "content": content,
+                    "namespace": page.get("ns", 0),
+                    "timestamp": revision.get("timestamp"),
+                }
+            
+            if "continue" not in response:
+                return contents
+            continuation = response["continue"]
+    
     def _load_page(self, page) -> Optional[Document]:
         """
         Carica una singola pagina wiki.
@@ -297,12 +788,31 @@ class MediaWikiAdapter(WikiAdapter):
             page: Oggetto pagina mwclient
             
         Returns:
-            Document se caricato con successo
+            Document, o None se la pagina è vuota
+            
+        Raises:
+            Errori di rete/API (dopo i retry)
         """
-        try:
-            # Ottieni contenuto
-            content = page.text()
+        touched = str(page.touched) if hasattr(page, 'touched') else None
+        content = call_with_retry(page.text, limiter=self.rate_limiter)
+        return self._build_document(page.name, page.namespace, touched, content)
+    
+    def _build_document(
+        self, title: str, namespace: int, last_modified: Optional[str], content: str
+    ) -> Optional[Document]:
+        """
+        Crea il Document di una pagina dal suo wikitext.
+        
+        Args:
+            title: Titolo della pagina
+            namespace: Namespace della pagina
+            last_modified: Data dell'ultima modifica
+            content: Wikitext della pagina
             
+        Returns:
+            Document, o None se la pagina è vuota
+        """
+        try:
             if not content:
                 return None
             
@@ -315,90 +825,22 @@ class MediaWikiAdapter(WikiAdapter):
             
             # Crea documento
             metadata = {
-                "title": page.name,
+                "title": title,
                 "wiki_url": self.wiki_url,
-                "page_url": f"{self.wiki_url}/wiki/{page.name.replace(' ', '_')}",
-                "namespace": page.namespace,
-                "last_modified": str(page.touched) if hasattr(page, 'touched') else None,
+                "page_url": f"{self.wiki_url}/wiki/{title.replace(' ', '_')}",
+                "namespace": namespace,
+                "last_modified": last_modified,
             }
             
-            # Usa URL come path per unicità
-            doc_path = f"mediawiki://{self.wiki_url}/wiki/{page.name}"
-            
-            return Document(doc_path, content, metadata)
+            return Document(self._doc_path(title), content, metadata)
             
         except Exception as e:
             print(f"⚠️ Errore caricamento pagina: {e}")
             return None
     
     def _strip_wikitext(self, text: str) -> str:
-        """
-        Converte wikitext in testo pulito.
-        
-        Rimuove markup wiki, template, riferimenti e converte
-        la formattazione in equivalenti leggibili.
-        
-        Args:
-            text: Wikitext originale
-            
-        Returns:
-            Testo pulito
-        """
-        if not text:
-            return ""
-        
-        # Rimuovi commenti HTML
-        text = re.sub(r'<!--.*?-->', '', text, flags=re.DOTALL)
-        
-        # Rimuovi tag nowiki
-        text = re.sub(r'<nowiki>.*?</nowiki>', '', text, flags=re.DOTALL)
-        
-        # Rimuovi template semplici ({{ ... }})
-        # Iterativo per template annidati
-        for _ in range(5):
-            prev = text
-            text = re.sub(r'\{\{[^{}]*\}\}', '', text)
-            if prev == text:
-                break
-        
-        # Rimuovi tag ref
-        text = re.sub(r'<ref[^>]*>.*?</ref>', '', text, flags=re.DOTALL)
-        text = re.sub(r'<ref[^>]*/>', '', text)
-        
-        # Converti wikilink [[link|testo]] → testo (o link se no testo)
-        text = re.sub(r'\[\[(?:[^|\]]*\|)?([^\]]+)\]\]', r'\1', text)
-        
-        # Converti link esterni [url testo] → testo
-        text = re.sub(r'\[https?://[^\s\]]+\s+([^\]]+)\]', r'\1', text)
-        text = re.sub(r'\[https?://[^\s\]]+\]', '', text)
-        
-        # Rimuovi bold/italic wiki
-        text = re.sub(r"'{2,5}", '', text)
-        
-        # Converti titoli wiki in markdown
-        text = re.sub(r'^======\s*(.+?)\s*======', r'###### \1', text, flags=re.MULTILINE)
-        text = re.sub(r'^=====\s*(.+?)\s*=====', r'##### \1', text, flags=re.MULTILINE)
-        text = re.sub(r'^====\s*(.+?)\s*====', r'#### \1', text, flags=re.MULTILINE)
-        text = re.sub(r'^===\s*(.+?)\s*===', r'### \1', text, flags=re.MULTILINE)
-        text = re.sub(r'^==\s*(.+?)\s*==', r'## \1', text, flags=re.MULTILINE)
-        text = re.sub(r'^=\s*(.+?)\s*=', r'# \1', text, flags=re.MULTILINE)
-        
-        # Rimuovi liste con * e # (converti in testo)
-        text = re.sub(r'^[*#]+\s*', '• ', text, flags=re.MULTILINE)
-        
-        # Rimuovi tag HTML comuni
-        text = re.sub(r'<br\s*/?>', '\n', text, flags=re.IGNORECASE)
-        text = re.sub(r'</?[a-z][^>]*>', '', text, flags=re.IGNORECASE)
-        
-        # Rimuovi categorie e interwiki
-        text = re.sub(r'\[\[(?:Category|Categoria):[^\]]+\]\]', '', text, flags=re.IGNORECASE)
-        text = re.sub(r'\[\[[a-z]{2,3}:[^\]]+\]\]', '', text)
-        
-        # Normalizza whitespace
-        text = re.sub(r'\n{3,}', '\n\n', text)
-        text = re.sub(r' {2,}', ' ', text)
-        
-        return text.strip()
+        """Converte wikitext in testo pulito (vedi strip_wikitext)."""
+        return strip_wikitext(text)
     
     def _save_sync_info(self):
         """Salva informazioni dell'ultimo sync su disco."""
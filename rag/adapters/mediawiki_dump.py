@@ -0,0 +1,318 @@
+# rag/adapters/mediawiki_dump.py
+# DeepAiUG v1.16.0 - Adapter per dump XML MediaWiki (offline)
+# ============================================================================
+# Per wiki grandi un dump pages-articles.xml(.bz2/.gz) si scarica molto
+# prima di quanto serva per leggere tutte le pagine via API. Il dump viene
+# letto in streaming con ElementTree.iterparse: ogni <page> è elaborata e
+# poi rimossa dall'albero, così la memoria resta costante anche con dump
+# di più GB. Nessun accesso alla rete.
+#
+# Filtri e pulizia del testo sono quelli di MediaWikiAdapter (namespace,
+# esclusioni, redirect, strip_wikitext). Se il dump indica l'URL della wiki
+# (<siteinfo><base>), i path dei documenti coincidono con quelli di
+# MediaWikiAdapter.
+# ============================================================================
+
+import bz2
+import gzip
+import re
+import xml.etree.ElementTree as ET
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, Iterator, List, Optional, Set
+from urllib.parse import urlparse
+
+from .base import WikiAdapter, SourceUnavailableError
+from .mediawiki import is_excluded_title, strip_wikitext
+from ..models import Document
+
+# Namespace delle categorie (nome canonico "Category", localizzato nel dump)
+CATEGORY_NAMESPACE = "14"
+
+# Ogni quante pagine lette aggiornare la progress bar
+_PROGRESS_EVERY = 200
+
+
+class MediaWikiDumpAdapter(WikiAdapter):
+    """
+    Adapter per dump XML MediaWiki (Special:Export, dumps.wikimedia.org).
+
+    Supporta file .xml, .xml.bz2 e .xml.gz, letti in streaming. Con più
+    revisioni per pagina (dump con cronologia) usa l'ultima.
+
+    Attributes:
+        dump_path: Percorso del file di dump
+        wiki_url: URL base della wiki (default: da <siteinfo><base>)
+        namespaces: Lista namespace da includere
+        exclude_categories: Categorie da escludere (solo [[Categoria:...]]
+                            scritte nel wikitext, non quelle dei template)
+        exclude_pages: Pagine da escludere (supporta wildcard *)
+        max_pages: Limite pagine (0 = tutte)
+    """
+
+    name = "MediaWiki Dump"
+    description = "Indicizza un dump XML MediaWiki senza accesso alla rete"
+
+    def __init__(self, config: Dict[str, Any] = None):
+        super().__init__(config)
+
+        self.dump_path = config.get("dump_path", "") if config else ""
+        self.wiki_url = config.get("url", "") if config else ""
+
+        # Filtri contenuto (come MediaWikiAdapter)
+        self.namespaces = config.get("namespaces", [0]) if config else [0]
+        self.exclude_categories = config.get("exclude_categories", []) if config else []
+        self.exclude_pages = config.get("exclude_pages", []) if config else []
+        self.max_pages = config.get("max_pages", 0) if config else 0
+        self.include_redirects = config.get("include_redirects", False) if config else False
+        self.strip_wiki_markup = config.get("strip_wiki_markup", True) if config else True
+
+        # Stato
+        self.last_sync = None
+        self.sync_stats = {}
+
+    def connect(self) -> bool:
+        """
+        Verifica che il file di dump esista.
+
+        Returns:
+            True se il dump è leggibile
+        """
+        if not self.dump_path:
+            print("❌ Percorso dump non specificato")
+            return False
+        if not Path(self.dump_path).is_file():
+            print(f"❌ Dump non trovato: {self.dump_path}")
+            return False
+        return True
+
+    def get_source_id(self) -> str:
+        """Il percorso assoluto del dump identifica la sorgente."""
+        try:
+            return f"mediawiki-dump://{Path(self.dump_path).resolve()}"
+        except Exception:
+            return f"mediawiki-dump://{self.dump_path}"
+
+    def load_documents(self, progress_callback=None) -> List[Document]:
+        """
+        Carica tutte le pagine del dump.
+
+        Args:
+            progress_callback: Funzione opzionale (progress_fraction, status_text)
+
+        Returns:
+            Lista di Document caricati
+        """
+        self.documents = list(self.iter_documents(progress_callback))
+        return self.documents
+
+    def iter_documents(self, progress_callback=None) -> Iterator[Document]:
+        """
+        Genera le pagine del dump una alla volta (streaming, memoria costante).
+
+        Args:
+            progress_callback: Funzione opzionale (progress_fraction, status_text);
+                              il progresso è la frazione del file già letta
+
+        Yields:
+            Document caricati
+
+        Raises:
+            SourceUnavailableError: Dump mancante, troncato o corrotto: le
+                pagine dopo il punto di errore non sono state lette, non
+                vanno tolte dall'indice
+        """
+        if not self.connect():
+            raise SourceUnavailableError(f"Dump non trovato: {self.dump_path}")
+
+        total_bytes = Path(self.dump_path).stat().st_size or 1
+        pages_read = 0
+        loaded = 0
+
+        try:
+            with _open_dump(self.dump_path) as (raw, stream):
+                for page in self._iter_pages(stream):
+                    pages_read += 1
+
+                    # Callback progress
+                    if progress_callback and pages_read % _PROGRESS_EVERY == 0:
+                        progress = min(raw.tell() / total_bytes, 1.0)
+                        status = f"📥 Lettura dump: {pages_read} pagine ({progress:.0%})"
+                        progress_callback(progress, status)
+
+                    doc = self._build_document(page)
+                    if doc:
+                        loaded += 1
+                        yield doc
+                        if self.max_pages and loaded >= self.max_pages:
+                            break
+        except (ET.ParseError, OSError, EOFError) as e:
+            print(f"❌ Errore lettura dump {self.dump_path}: {e}")
+            raise SourceUnavailableError(
+                f"Dump {Path(self.dump_path).name} illeggibile dopo {pages_read} pagine: {e}"
+            ) from e
+
+        if progress_callback:
+            progress_callback(1.0, f"📥 Lettura dump: {pages_read} pagine")
+
+        # Aggiorna statistiche sync
+        self.last_sync = datetime.now().isoformat()
+        self.sync_stats = {
+            "total_pages": pages_read,
+            "loaded_pages": loaded,
+            "wiki_url": self.wiki_url,
+            "dump_path": self.dump_path,
+            "timestamp": self.last_sync
+        }
+
+    def _iter_pages(self, stream) -> Iterator[Dict[str, Any]]:
+        """
+        Legge il dump con iterparse e genera le pagine che passano i filtri.
+
+        Dopo ogni <page> l'elemento radice viene svuotato: l'albero non
+        cresce con il numero di pagine. Di ogni <revision> si tiene solo
+        testo e timestamp dell'ultima.
+
+        Yields:
+            {"title", "namespace", "timestamp", "text"}
+        """
+        category_names: Set[str] = {"category"}
+        root = None
+        ns = ""
+        revision: Dict[str, Optional[str]] = {}
+
+        for event, elem in ET.iterparse(stream, events=("start", "end")):
+            if event == "start":
+                if root is None:
+                    root = elem
+                    # Namespace XML dello schema di export (varia per versione)
+                    ns = elem.tag[:elem.tag.index("}") + 1] if elem.tag.startswith("{") else ""
+                continue
+
+            tag = elem.tag[len(ns):]
+            if tag == "revision":
+                revision = {
+                    "text": elem.findtext(f"{ns}text") or "",
+                    "timestamp": elem.findtext(f"{ns}timestamp"),
+                }
+                elem.clear()
+            elif tag == "namespace" and elem.get("key") == CATEGORY_NAMESPACE and elem.text:
+                category_names.add(elem.text.strip().lower())
+            elif tag == "base" and not self.wiki_url and elem.text:
+                parsed = urlparse(elem.text.strip())
+                if parsed.scheme and parsed.netloc:
+                    self.wiki_url = f"{parsed.scheme}://{parsed.netloc}"
+            elif tag == "page":
+                page = {
+                    "title": elem.findtext(f"{ns}title") or "",
+                    "namespace": int(elem.findtext(f"{ns}ns") or 0),
+                    "redirect": elem.find(f"{ns}redirect") is not None,
+                    **revision,
+                }
+                revision = {}
+                root.clear()
+                if self._should_include_page(page, category_names):
+                    yield page
+
+    def _should_include_page(self, page: Dict[str, Any], category_names: Set[str]) -> bool:
+        """
+        Verifica se una pagina del dump deve essere inclusa.
+
+        Args:
+            page: Pagina letta dal dump
+            category_names: Nomi (minuscoli) del namespace categoria nel dump
+
+        Returns:
+            True se la pagina passa tutti i filtri
+        """
+        if not page["title"] or page["namespace"] not in self.namespaces:
+            return False
+        if not self.include_redirects and page["redirect"]:
+            return False
+        if is_excluded_title(page["title"], self.exclude_pages):
+            return False
+        if self.exclude_categories:
+            excluded = {c.replace("Category:", "").replace("Categoria:", "").strip()
+                        for c in self.exclude_categories}
+            if excluded & _page_categories(page.get("text") or "", category_names):
+                return False
+        return True
+
+    def _build_document(self, page: Dict[str, Any]) -> Optional[Document]:
+        """
+        Crea il Document di una pagina del dump.
+
+        Returns:
+            Document, o None se la pagina è vuota
+        """
+        content = page.get("text") or ""
+        if self.strip_wiki_markup:
+            content = strip_wikitext(content)
+        if not content.strip():
+            return None
+
+        title = page["title"]
+        wiki = self.wiki_url or f"dump:{Path(self.dump_path).name}"
+        metadata = {
+            "title": title,
+            "wiki_url": self.wiki_url,
+            "page_url": f"{self.wiki_url}/wiki/{title.replace(' ', '_')}" if self.wiki_url else "",
+            "namespace": page["namespace"],
+            "last_modified": page.get("timestamp"),
+        }
+
+        # Stesso path di MediaWikiAdapter quando l'URL della wiki è noto
+        return Document(f"mediawiki://{wiki}/wiki/{title}", content, metadata)
+
+    def get_last_sync_info(self) -> Optional[Dict[str, Any]]:
+        """Statistiche dell'ultima lettura del dump (in memoria)."""
+        return self.sync_stats or None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Ritorna statistiche dell'adapter.
+
+        Returns:
+            Dizionario con statistiche complete
+        """
+        stats = super().get_stats()
+        stats["dump_path"] = self.dump_path
+        stats["wiki_url"] = self.wiki_url
+        stats["wiki_type"] = "mediawiki_dump"
+        stats["last_sync"] = self.last_sync
+        if self.sync_stats:
+            stats["last_sync_info"] = self.sync_stats
+        return stats
+
+
+@contextmanager
+def _open_dump(path: str):
+    """
+    Apre il dump (anche compresso bz2/gz) in streaming.
+
+    Yields:
+        (file grezzo, stream decompresso): la posizione del file grezzo
+        indica quanta parte del dump è stata letta
+    """
+    raw = open(path, "rb")
+    try:
+        suffix = Path(path).suffix.lower()
+        if suffix == ".bz2":
+            stream = bz2.BZ2File(raw)
+        elif suffix == ".gz":
+            stream = gzip.GzipFile(fileobj=raw)
+        else:
+            stream = raw
+        yield raw, stream
+    finally:
+        raw.close()
+
+
+def _page_categories(wikitext: str, category_names: Set[str]) -> Set[str]:
+    """Categorie scritte nel wikitext ([[Category:Nome]], [[Categoria:Nome|chiave]])."""
+    found = set()
+    for prefix, name in re.findall(r'\[\[\s*([^:\]|]+?)\s*:\s*([^\]|]+)', wikitext):
+        if prefix.lower() in category_names:
+            found.add(name.strip().replace("_", " "))
+    return found
@@ -0,0 +1,194 @@
+# rag/adapters/wiki_cache.py
+# DeepAiUG v1.16.0 - Cache locale delle pagine wiki per sync incrementali
+# ============================================================================
+# Per ogni wiki un file SQLite in wiki_cache/ con:
+# - il listing delle pagine (doc_path → revisione) dell'ultima sync
+# - il testo già pulito di ogni pagina, legato alla revisione scaricata
+# - lo stato della sync (timestamp, filtri usati, ultimo listing completo)
+#
+# Alla sync successiva l'adapter chiede alla wiki solo le modifiche recenti
+# (recentchanges / getRecentChanges) e aggiorna il listing; il manager
+# confronta le revisioni con il manifest e carica solo le pagine cambiate,
+# che vengono scaricate solo se la cache non ha già il testo di quella
+# revisione.
+# ============================================================================
+
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+# Sovrapposizione tra una sync e la successiva: le modifiche registrate a
+# cavallo del timestamp (o con orologi non allineati) vengono riviste.
+# Rivedere una pagina non cambiata costa solo il controllo della revisione.
+RECENT_CHANGES_OVERLAP_SECONDS = 300
+
+# Limite variabili per query SQLite (default conservativo 999)
+_SQL_BATCH = 900
+
+
+class WikiPageCache:
+    """
+    Listing e testo pulito delle pagine di una wiki, su SQLite.
+
+    Attributes:
+        path: File SQLite della cache
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS pages ("
+            " doc_path TEXT PRIMARY KEY,"
+            " rev TEXT NOT NULL,"
+            " text_rev TEXT,"
+            " text TEXT,"
+            " metadata TEXT)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)"
+        )
+        self._conn.commit()
+
+    # ------------------------------------------------------------------
+    # Listing
+    # ------------------------------------------------------------------
+
+    def listing(self) -> Dict[str, str]:
+        """Pagine dell'ultima sync: {doc_path: revisione}."""
+        with self._lock:
+            return dict(self._conn.execute("SELECT doc_path, rev FROM pages"))
+
+    def replace_listing(self, listing: Dict[str, str]):
+        """
+        Sostituisce il listing con quello di una sync completa.
+
+        Le pagine non più presenti vengono rimosse insieme al loro testo.
+        """
+        with self._lock:
+            current = {row[0] for row in self._conn.execute("SELECT doc_path FROM pages")}
+            self._delete(current - set(listing))
+            self._upsert_revs(listing)
+            self._conn.commit()
+
+    def update_listing(self, changed: Dict[str, str], removed: Iterable[str]):
+        """
+        Applica le modifiche recenti al listing.
+
+        Args:
+            changed: {doc_path: revisione} delle pagine nuove/modificate
+            removed: Pagine cancellate, spostate o non più incluse dai filtri
+        """
+        with self._lock:
+            self._delete(removed)
+            self._upsert_revs(changed)
+            self._conn.commit()
+
+    def _upsert_revs(self, revs: Dict[str, str]):
+        self._conn.executemany(
+            "INSERT INTO pages (doc_path, rev) VALUES (?, ?)"
+            " ON CONFLICT(doc_path) DO UPDATE SET rev = excluded.rev",
+            revs.items(),
+        )
+
+    def _delete(self, doc_paths: Iterable[str]):
+        doc_paths = list(doc_paths)
+        for b in range(0, len(doc_paths), _SQL_BATCH):
+            batch = doc_paths[b:b + _SQL_BATCH]
+            self._conn.execute(
+                f"DELETE FROM pages WHERE doc_path IN ({','.join('?' * len(batch))})", batch
+            )
+
+    # ------------------------------------------------------------------
+    # Testo delle pagine
+    # ------------------------------------------------------------------
+
+    def get_text(self, doc_path: str, rev: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """
+        Testo pulito e metadata della pagina, se in cache per questa revisione.
+
+        Returns:
+            (testo, metadata) — testo vuoto per le pagine senza contenuto —
+            oppure None se la pagina va scaricata
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT text, metadata FROM pages WHERE doc_path = ? AND text_rev = ?",
+                (doc_path, rev),
+            ).fetchone()
+        if row is None:
+            return None
+        return row[0], json.loads(row[1])
+
+    def put_text(self, doc_path: str, rev: str, text: str, metadata: Dict[str, Any]):
+        """Salva il testo pulito della pagina scaricata alla revisione rev."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO pages (doc_path, rev, text_rev, text, metadata) VALUES (?, ?, ?, ?, ?)"
+                " ON CONFLICT(doc_path) DO UPDATE SET"
+                " text_rev = excluded.text_rev, text = excluded.text, metadata = excluded.metadata",
+                (doc_path, rev, rev, text, json.dumps(metadata, ensure_ascii=False)),
+            )
+            self._conn.commit()
+
+    # ------------------------------------------------------------------
+    # Stato della sync
+    # ------------------------------------------------------------------
+
+    def _get_meta(self, key: str) -> Optional[str]:
+        row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def changes_since(self, filters: Dict[str, Any], ttl_hours: float) -> Optional[float]:
+        """
+        Da quando chiedere le modifiche recenti alla wiki.
+
+        Args:
+            filters: Filtri dell'adapter (namespace, esclusioni, ...)
+            ttl_hours: Età massima dell'ultimo listing completo
+
+        Returns:
+            Timestamp Unix da cui leggere le modifiche, oppure None se serve
+            un listing completo (prima sync, filtri cambiati, listing
+            completo più vecchio di ttl_hours)
+        """
+        with self._lock:
+            last_sync = self._get_meta("last_sync")
+            last_full = self._get_meta("last_full_sync")
+            same_filters = self._get_meta("filters") == json.dumps(filters, sort_keys=True)
+        if last_sync is None or last_full is None or not same_filters:
+            return None
+        if time.time() - float(last_full) > ttl_hours * 3600:
+            return None
+        return float(last_sync) - RECENT_CHANGES_OVERLAP_SECONDS
+
+    def mark_synced(self, started_at: float, full: bool, filters: Dict[str, Any]):
+        """
+        Registra una sync riuscita.
+
+        Args:
+            started_at: Timestamp Unix di inizio della sync
+            full: True se il listing è stato completo
+            filters: Filtri dell'adapter usati per il listing
+        """
+        values = {
+            "last_sync": str(started_at),
+            "filters": json.dumps(filters, sort_keys=True),
+        }
+        if full:
+            values["last_full_sync"] = str(started_at)
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", values.items()
+            )
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,309 @@
+# rag/bm25.py
+# DeepAiUG v1.16.0 - Indice invertito BM25 per la ricerca keyword
+# ============================================================================
+# Tokenizzazione una sola volta all'inserimento dei chunk; le query toccano
+# solo le posting list dei propri termini (niente scansione di tutti i
+# chunk). Funziona senza sentence-transformers/torch ed è persistito come
+# JSON accanto al vectorstore.
+#
+# I chunk rimossi diventano "tombstone" (esclusi dai risultati); l'indice
+# viene compattato quando i tombstone superano una certa quota.
+# ============================================================================
+
+import heapq
+import json
+import math
+import os
+import re
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+BM25_INDEX_VERSION = 1
+
+# Parametri BM25 standard (Robertson/Zaragoza)
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+# Compatta quando più di questa quota di documenti è stata rimossa
+_COMPACT_RATIO = 0.25
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+# Parole funzionali IT/EN: posting list enormi e nessun valore discriminante.
+# Escluderle tiene la ricerca sotto i 10ms anche su decine di migliaia di chunk.
+STOPWORDS = frozenset("""
+a ad al alla alle allo agli ai anche che chi ci con da dal dalla dalle dei del
+della delle dello degli di e ed gli ha hanno ho i il in la le lo ma mi ne nei
+nel nella nelle negli non o per più se si sono su sua sue suo sul sulla tra
+un una uno è
+an and are as at be by for from in is it of on or that the this to was with
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    """Tokenizza il testo: parole alfanumeriche minuscole, senza stopword."""
+    return [t for t in _TOKEN_RE.findall(text.lower()) if t not in STOPWORDS]
+
+
+class BM25Index:
+    """
+    Indice invertito con scoring BM25.
+
+    Attributes:
+        path: File JSON di persistenza (None = solo in memoria)
+        postings: termine → {indice documento: term frequency}
+        doc_ids: ID chunk per indice documento (None = rimosso)
+        doc_sources: Documento di origine di ogni chunk (per delete_sources)
+        doc_lengths: Numero di token di ogni chunk
+    """
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = Path(path) if path else None
+        self.postings: Dict[str, Dict[int, int]] = {}
+        self.doc_ids: List[Optional[str]] = []
+        self.doc_sources: List[Optional[str]] = []
+        self.doc_lengths: List[int] = []
+        self._id_to_doc: Dict[str, int] = {}
+        self._total_length = 0
+        self._norms: Optional[List[float]] = None
+        if self.path:
+            self._load()
+
+    def __len__(self):
+        return len(self._id_to_doc)
+
+    # ------------------------------------------------------------------
+    # Scrittura
+    # ------------------------------------------------------------------
+
+    def add(self, ids: Sequence[str], texts: Sequence[str], sources: Sequence[str]):
+        """
+        Indicizza un batch di chunk (un id già presente viene sostituito).
+
+        Args:
+            ids: ID dei chunk
+            texts: Testi dei chunk
+            sources: Documento di origine di ogni chunk
+        """
+        for chunk_id, text, source in zip(ids, texts, sources):
+            if chunk_id in self._id_to_doc:
+                self._remove_doc(self._id_to_doc[chunk_id])
+
+            doc = len(self.doc_ids)
+            tokens = tokenize(text)
+            tf: Dict[str, int] = {}
+            for token in tokens:
+                tf[token] = tf.get(token, 0) + 1
+            for term, count in tf.items():
+                self.postings.setdefault(term, {})[doc] = count
+
+            self.doc_ids.append(chunk_id)
+            self.doc_sources.append(source)
+            self.doc_lengths.append(len(tokens))
+            self._id_to_doc[chunk_id] = doc
+            self._total_length += len(tokens)
+        self._norms = None
+
+    def delete_sources(self, sources: Iterable[str]) -> int:
+        """Rimuove i chunk dei documenti indicati. Ritorna quanti ne ha rimossi."""
+        to_remove = set(sources)
+        removed = 0
+        for doc, source in enumerate(self.doc_sources):
+            if source in to_remove and self.doc_ids[doc] is not None:
+                self._remove_doc(doc)
+                removed += 1
+        self._maybe_compact()
+        return removed
+
+    def delete_ids(self, ids: Iterable[str]) -> int:
+        """Rimuove i chunk con gli ID indicati. Ritorna quanti ne ha rimossi."""
+        removed = 0
+        for chunk_id in ids:
+            doc = self._id_to_doc.get(chunk_id)
+            if doc is not None:
+                self._remove_doc(doc)
+                removed += 1
+        self._maybe_compact()
+        return removed
+
+    def clear(self):
+        """Svuota l'indice e rimuove il file persistito."""
+        self.postings = {}
+        self.doc_ids, self.doc_sources, self.doc_lengths = [], [], []
+        self._id_to_doc = {}
+        self._total_length = 0
+        self._norms = None
+        if self.path:
+            try:
+                self.path.unlink()
+            except FileNotFoundError:
+                pass
+
+    def _remove_doc(self, doc: int):
+        """Marca il documento come rimosso (tombstone)."""
+        self._id_to_doc.pop(self.doc_ids[doc], None)
+        self._total_length -= self.doc_lengths[doc]
+        self.doc_ids[doc] = None
+        self.doc_sources[doc] = None
+        self._norms = None
+
+    def _maybe_compact(self):
+        removed = len(self.doc_ids) - len(self._id_to_doc)
+        if removed and removed > _COMPACT_RATIO * len(self.doc_ids):
+            self._compact()
+
+    def _compact(self):
+        """Elimina i tombstone e rinumera i documenti."""
+        remap: Dict[int, int] = {}
+        doc_ids, doc_sources, doc_lengths = [], [], []
+        for old, chunk_id in enumerate(self.doc_ids):
+            if chunk_id is None:
+                continue
+            remap[old] = len(doc_ids)
+            doc_ids.append(chunk_id)
+            doc_sources.append(self.doc_sources[old])
+            doc_lengths.append(self.doc_lengths[old])
+
+        postings: Dict[str, Dict[int, int]] = {}
+        for term, plist in self.postings.items():
+            kept = {remap[d]: tf for d, tf in plist.items() if d in remap}
+            if kept:
+                postings[term] = kept
+
+        self.postings = postings
+        self.doc_ids, self.doc_sources, self.doc_lengths = doc_ids, doc_sources, doc_lengths
+        self._id_to_doc = {chunk_id: i for i, chunk_id in enumerate(doc_ids)}
+        self._norms = None
+
+    # ------------------------------------------------------------------
+    # Ricerca
+    # ------------------------------------------------------------------
+
+    def search(self, query: str, top_k: int) -> List[Tuple[str, float]]:
+        """
+        Top-k chunk per score BM25.
+
+        Returns:
+            Lista di (chunk_id, score) ordinata per score decrescente
+        """
+        n_docs = len(self._id_to_doc)
+        if not n_docs or top_k <= 0:
+            return []
+
+        norms = self._length_norms()
+        factor = BM25_K1 + 1.0
+
+        # Peso massimo di ogni termine: idf·(k1+1) (tf/(tf+norm) è sempre < 1)
+        terms = []
+        for term in set(tokenize(query)):
+            plist = self.postings.get(term)
+            if plist:
+                df = len(plist)
+                weight = math.log(1.0 + (n_docs - df + 0.5) / (df + 0.5)) * factor
+                terms.append((weight, plist))
+        terms.sort(key=lambda item: item[0], reverse=True)
+
+        # MaxScore: i termini sono processati dal più raro. Quando la somma dei
+        # pesi massimi dei termini rimanenti non supera il k-esimo score
+        # corrente, nessun documento nuovo può entrare nel top-k: per i
+        # termini frequenti (posting list lunghe) si aggiornano solo i
+        # candidati già trovati.
+        remaining = sum(weight for weight, _ in terms)
+        scores: Dict[int, float] = {}
+        get = scores.get
+
+        for weight, plist in terms:
+            if len(scores) >= top_k and remaining <= heapq.nlargest(top_k, scores.values())[-1]:
+                for doc in scores:
+                    tf = plist.get(doc)
+                    if tf:
+                        scores[doc] += weight * tf / (tf + norms[doc])
+            else:
+                for doc, tf in plist.items():
+                    scores[doc] = get(doc, 0.0) + weight * tf / (tf + norms[doc])
+            remaining -= weight
+
+        ids = self.doc_ids
+        # I tombstone hanno norma infinita (score 0) e vengono scartati qui
+        best = heapq.nlargest(
+            top_k,
+            ((doc, score) for doc, score in scores.items() if ids[doc] is not None),
+            key=lambda item: item[1],
+        )
+        return [(ids[doc], score) for doc, score in best]
+
+    def _length_norms(self) -> List[float]:
+        """
+        Termine di normalizzazione per lunghezza k1·(1 − b + b·len/avg_len)
+        di ogni documento, ricalcolato solo quando l'indice cambia.
+        """
+        if self._norms is None:
+            n_docs = len(self._id_to_doc)
+            avg_len = (self._total_length / n_docs if n_docs else 0.0) or 1.0
+            k1, b = BM25_K1, BM25_B
+            self._norms = [
+                k1 * (1.0 - b + b * length / avg_len) if chunk_id is not None else math.inf
+                for length, chunk_id in zip(self.doc_lengths, self.doc_ids)
+            ]
+        return self._norms
+
+    # ------------------------------------------------------------------
+    # Persistenza
+    # ------------------------------------------------------------------
+
+    def save(self):
+        """Salva l'indice in modo atomico (file temporaneo + replace)."""
+        if not self.path:
+            return
+        if len(self.doc_ids) != len(self._id_to_doc):
+            self._compact()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "version": BM25_INDEX_VERSION,
+                    "doc_ids": self.doc_ids,
+                    "doc_sources": self.doc_sources,
+                    "doc_lengths": self.doc_lengths,
+                    # Posting list appiattite: [doc, tf, doc, tf, ...]
+                    "postings": {
+                        term: [x for pair in plist.items() for x in pair]
+                        for term, plist in self.postings.items()
+                    },
+                },
+                f,
+                ensure_ascii=False,
+                separators=(",", ":"),
+            )
+        os.replace(tmp, self.path)
+
+    def _load(self):
+        """Carica l'indice persistito; resta vuoto se assente o corrotto."""
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                raw = json.load(f)
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            print(f"⚠️ Indice BM25 non leggibile ({e}). Verrà ricostruito.")
+            return
+
+        if raw.get("version") != BM25_INDEX_VERSION:
+            return
+
+        self.doc_ids = raw["doc_ids"]
+        self.doc_sources = raw["doc_sources"]
+        self.doc_lengths = raw["doc_lengths"]
+        self.postings = {
+            term: dict(zip(flat[::2], flat[1::2]))
+            for term, flat in raw["postings"].items()
+        }
+        self._id_to_doc = {
+            chunk_id: i for i, chunk_id in enumerate(self.doc_ids) if chunk_id is not None
+        }
+        self._total_length = sum(
+            length for length, chunk_id in zip(self.doc_lengths, self.doc_ids)
+            if chunk_id is not None
+        )
@@ -1,9 +1,12 @@
 # rag/chunker.py
 # DeepAiUG v1.4.0 - Text Chunking intelligente
+# v1.16.0 - Ricerca dei punti di split su offset (tempo lineare)
+# v1.16.0 - iter_chunks() per l'indicizzazione in streaming
+# v1.16.0 - Occorrenza dei testi ripetuti per ID di chunk stabili
 # ============================================================================
 
 import re
-from typing import List
+from typing import Dict, Iterable, Iterator, List
 
 from .models import Document, Chunk
 from config import DEFAULT_CHUNK_SIZE, DEFAULT_CHUNK_OVERLAP
@@ -45,37 +48,40 @@ class TextChunker:
             " ",          # Spazio (ultima risorsa)
         ]
     
-    def _find_best_split_point(self, text: str, max_pos: int) -> int:
+    def _find_best_split_point(self, text: str, start: int) -> int:
         """
-        Trova il miglior punto di divisione nel testo.
-        
-        Cerca il separatore più forte possibile entro la posizione massima,
-        evitando chunk troppo piccoli.
-        
+        Trova il miglior punto di divisione per il chunk che inizia a start.
+
+        Cerca il separatore più forte possibile entro start + chunk_size,
+        evitando chunk troppo piccoli (almeno 1/3 di chunk_size).
+
+        v1.16.0: lavora su offset nel testo originale con rfind(sep, lo, hi),
+        senza copiare sottostringhe (prima: text[start:] + una slice per
+        separatore a ogni chunk → costo quadratico sui documenti grandi).
+
         Args:
-            text: Testo da dividere
-            max_pos: Posizione massima per lo split
-            
+            text: Testo completo del documento
+            start: Offset di inizio del chunk corrente
+
         Returns:
-            Indice ottimale per la divisione
+            Offset assoluto (in text) per la divisione
         """
+        max_pos = start + self.chunk_size
         if max_pos >= len(text):
             return len(text)
-        
-        # Cerca il separatore più forte possibile
+
+        # Cerca l'ultima occorrenza del separatore prima di max_pos
+        # ma dopo almeno 1/3 del chunk (per evitare chunk troppo piccoli).
+        # Un separatore esattamente a lo non è accettato (come in passato).
+        lo = start + max(0, self.chunk_size // 3)
         for sep in self.separators:
-            # Cerca l'ultima occorrenza del separatore prima di max_pos
-            # ma dopo almeno 1/3 del chunk (per evitare chunk troppo piccoli)
-            search_start = max(0, self.chunk_size // 3)
-            search_text = text[search_start:max_pos]
-            last_sep = search_text.rfind(sep)
-            
-            if last_sep > 0:
-                return search_start + last_sep + len(sep)
-        
+            last_sep = text.rfind(sep, lo, max_pos)
+            if last_sep > lo:
+                return last_sep + len(sep)
+
         # Nessun separatore trovato, usa max_pos
         return max_pos
-    
+
     def chunk_document(self, document: Document) -> List[Chunk]:
         """
         Divide un documento in chunks con chunking intelligente.
@@ -95,15 +101,17 @@ class TextChunker:
         # Preprocessa: normalizza whitespace eccessivo
         text = re.sub(r'\n{4,}', '\n\n\n', text)  # Max 3 newline consecutive
         text = re.sub(r' {3,}', '  ', text)       # Max 2 spazi consecutivi
+        text_len = len(text)
         
         start = 0
         chunk_index = 0
+        occurrences: Dict[str, int] = {}  # testi ripetuti → ID distinti
         
-        while start < len(text):
+        while start < text_len:
             # Calcola la fine ideale del chunk
             ideal_end = start + self.chunk_size
             
-            if ideal_end >= len(text):
+            if ideal_end >= text_len:
                 # Ultimo chunk: prendi tutto il resto
                 chunk_text = text[start:].strip()
                 if chunk_text:
@@ -112,14 +120,14 @@ class TextChunker:
                         document=document,
                         chunk_index=chunk_index,
                         start_char=start,
-                        end_char=len(text)
+                        end_char=text_len,
+                        occurrence=occurrences.get(chunk_text, 0)
                     )
                     chunks.append(chunk)
                 break
             
-            # Trova il miglior punto di split
-            end = self._find_best_split_point(text[start:], self.chunk_size)
-            end = start + end
+            # Trova il miglior punto di split (offset assoluto)
+            end = self._find_best_split_point(text, start)
             
             chunk_text = text[start:end].strip()
             
@@ -129,8 +137,10 @@ class TextChunker:
                     document=document,
                     chunk_index=chunk_index,
                     start_char=start,
-                    end_char=end
+                    end_char=end,
+                    occurrence=occurrences.get(chunk_text, 0)
                 )
+                occurrences[chunk_text] = chunk.occurrence + 1
                 chunks.append(chunk)
                 chunk_index += 1
             
@@ -138,7 +148,7 @@ class TextChunker:
             start = max(start + 1, end - self.chunk_overlap)
             
             # Safety check per evitare loop infiniti
-            if start >= len(text) or (end == start + self.chunk_size and end < len(text)):
+            if start >= text_len or (end == start + self.chunk_size and end < text_len):
                 break
         
         return chunks
@@ -153,11 +163,21 @@ class TextChunker:
         Returns:
             Lista di tutti i Chunk
         """
-        all_chunks = []
+        return list(self.iter_chunks(documents))
+    
+    def iter_chunks(self, documents: Iterable[Document]) -> Iterator[Chunk]:
+        """
+        Genera i chunk di una sequenza (anche lazy) di documenti, un
+        documento alla volta.
+        
+        Args:
+            documents: Iterabile di Document (es. adapter.iter_documents())
+            
+        Yields:
+            Chunk nell'ordine dei documenti
+        """
         for doc in documents:
-            chunks = self.chunk_document(doc)
-            all_chunks.extend(chunks)
-        return all_chunks
+            yield from self.chunk_document(doc)
     
     def get_stats(self) -> dict:
         """Ritorna statistiche della configurazione chunker."""
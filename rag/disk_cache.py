@@ -0,0 +1,170 @@
+# rag/disk_cache.py
+# DeepAiUG v1.16.0 - Cache persistente chiave → bytes con eviction LRU
+# ============================================================================
+# Piccolo key-value store su SQLite (stdlib) con limite di dimensione su
+# disco: quando la somma dei valori supera max_bytes vengono rimosse le
+# voci usate meno di recente. Thread-safe (un lock per istanza), così può
+# essere usato anche dai thread di background dell'indicizzazione.
+# ============================================================================
+
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+# Percentuale di max_bytes a cui scendere dopo un'eviction (isteresi:
+# evita di rimuovere poche voci a ogni singolo inserimento)
+_EVICT_TARGET_RATIO = 0.9
+
+# Limite variabili per query SQLite (default conservativo 999)
+_SQL_BATCH = 900
+
+
+class DiskLRUCache:
+    """
+    Cache persistente chiave (str) → valore (bytes) con eviction LRU.
+
+    Attributes:
+        path: File SQLite della cache
+        max_bytes: Dimensione massima totale dei valori (0 = illimitata)
+    """
+
+    def __init__(self, path: Path, max_bytes: int = 0):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " key TEXT PRIMARY KEY,"
+            " value BLOB NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " last_access REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_entries_access ON entries(last_access)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Ritorna il valore associato a key, None se assente."""
+        return self.get_many([key]).get(key)
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, bytes]:
+        """
+        Legge più chiavi in una sola transazione e ne aggiorna l'ultimo accesso.
+
+        Args:
+            keys: Chiavi da cercare
+
+        Returns:
+            Dizionario {key: value} delle sole chiavi presenti
+        """
+        keys = list(dict.fromkeys(keys))
+        found: Dict[str, bytes] = {}
+        if not keys:
+            return found
+
+        with self._lock:
+            for b in range(0, len(keys), _SQL_BATCH):
+                batch = keys[b:b + _SQL_BATCH]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, value FROM entries WHERE key IN ({placeholders})",
+                    batch,
+                ).fetchall()
+                found.update(rows)
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE entries SET last_access = ? WHERE key = ?",
+                    [(now, k) for k in found],
+                )
+                self._conn.commit()
+        return found
+
+    def put(self, key: str, value: bytes):
+        """Inserisce/aggiorna una singola voce."""
+        self.put_many({key: value})
+
+    def put_many(self, items: Dict[str, bytes]):
+        """
+        Inserisce/aggiorna più voci e applica l'eviction se necessario.
+
+        Args:
+            items: Dizionario {key: value}
+        """
+        if not items:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO entries (key, value, size, last_access) "
+                "VALUES (?, ?, ?, ?)",
+                [(k, sqlite3.Binary(v), len(v), now) for k, v in items.items()],
+            )
+            self._conn.commit()
+            self._evict_locked()
+
+    def delete_many(self, keys: Iterable[str]):
+        """Rimuove le chiavi indicate (ignorando quelle assenti)."""
+        keys = list(keys)
+        with self._lock:
+            for b in range(0, len(keys), _SQL_BATCH):
+                batch = keys[b:b + _SQL_BATCH]
+                placeholders = ",".join("?" * len(batch))
+                self._conn.execute(
+                    f"DELETE FROM entries WHERE key IN ({placeholders})", batch
+                )
+            self._conn.commit()
+
+    def _evict_locked(self):
+        """Rimuove le voci meno usate finché la cache rientra nel limite."""
+        if not self.max_bytes:
+            return
+        total = self._total_bytes_locked()
+        if total <= self.max_bytes:
+            return
+
+        target = int(self.max_bytes * _EVICT_TARGET_RATIO)
+        to_free = total - target
+        freed = 0
+        victims = []
+        for key, size in self._conn.execute(
+            "SELECT key, size FROM entries ORDER BY last_access ASC"
+        ):
+            victims.append((key,))
+            freed += size
+            if freed >= to_free:
+                break
+        self._conn.executemany("DELETE FROM entries WHERE key = ?", victims)
+        self._conn.commit()
+
+    def _total_bytes_locked(self) -> int:
+        row = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()
+        return int(row[0])
+
+    def clear(self):
+        """Svuota completamente la cache."""
+        with self._lock:
+            self._conn.execute("DELETE FROM entries")
+            self._conn.commit()
+
+    def get_stats(self) -> Dict[str, int]:
+        """Ritorna numero voci e byte occupati."""
+        with self._lock:
+            count = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+            total = self._total_bytes_locked()
+        return {"entries": int(count), "total_bytes": total, "max_bytes": self.max_bytes}
+
+    def close(self):
+        """Chiude la connessione SQLite."""
+        with self._lock:
+            self._conn.close()
+
+    def __len__(self):
+        return self.get_stats()["entries"]
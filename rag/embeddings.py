@@ -11,9 +11,14 @@
 # nello spazio vettoriale.
 # ============================================================================
 
+import hashlib
 import os
+from array import array
 from typing import List, Optional
 
+from config.constants import KNOWLEDGE_BASE_DIR, EMBEDDING_CACHE_MAX_MB
+from .disk_cache import DiskLRUCache
+
 # Default: e5-small è il miglior compromesso qualità/velocità per IT.
 # 117M params, 384 dim (drop-in con MiniLM-L6 in termini di dimensionalità),
 # multilingua nativo, ~118 MB download al primo uso (cached).
@@ -34,6 +39,10 @@ EMBEDDING_MODEL_TAG = EMBEDDING_MODEL_NAME
 QUERY_PREFIX = "query: "
 PASSAGE_PREFIX = "passage: "
 
+# v1.16.0 — Cache persistente content-addressed degli embedding dei passage,
+# condivisa da KB wiki (vector_store) e KB chat (kb_chat_indexer).
+EMBEDDING_CACHE_FILE = KNOWLEDGE_BASE_DIR / "embedding_cache.sqlite"
+
 
 class _EmbeddingsHelper:
     """
@@ -49,16 +58,52 @@ class _EmbeddingsHelper:
         self.model = SentenceTransformer(model_name)
 
     def encode_query(self, texts: List[str]) -> List[List[float]]:
-        prefixed = [QUERY_PREFIX + t for t in texts]
-        embeddings = self.model.encode(
-            prefixed,
-            convert_to_numpy=True,
-            normalize_embeddings=True,
-        )
-        return embeddings.tolist()
+        return self._encode(texts, QUERY_PREFIX)
 
     def encode_passages(self, texts: List[str]) -> List[List[float]]:
-        prefixed = [PASSAGE_PREFIX + t for t in texts]
+        """
+        Encode dei passage con prefix "passage:".
+
+        v1.16.0 — consulta prima la cache persistente degli embedding:
+        il modello viene chiamato solo per i testi mai visti (o evicted),
+        quindi una re-indicizzazione di contenuti invariati non ricalcola
+        nulla.
+        """
+        cache = get_embedding_cache()
+        if cache is None:
+            return self._encode(texts, PASSAGE_PREFIX)
+
+        keys = [_embedding_cache_key(self.model_name, PASSAGE_PREFIX, t) for t in texts]
+        try:
+            cached = cache.get_many(keys)
+        except Exception as e:
+            # Cache illeggibile (es. file bloccato): tutto da calcolare
+            print(f"⚠️ Lettura cache embedding fallita ({e}). Embedding ricalcolati.")
+            cached = {}
+
+        # Testi da calcolare (deduplicati: lo stesso passage può ripetersi)
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in cached and key not in missing:
+                missing[key] = text
+
+        if missing:
+            vectors = self._encode(list(missing.values()), PASSAGE_PREFIX)
+            computed = dict(zip(missing.keys(), vectors))
+            try:
+                cache.put_many({k: _pack_vector(v) for k, v in computed.items()})
+            except Exception as e:
+                print(f"⚠️ Scrittura cache embedding fallita ({e})")
+        else:
+            computed = {}
+
+        return [
+            computed[k] if k in computed else _unpack_vector(cached[k])
+            for k in keys
+        ]
+
+    def _encode(self, texts: List[str], prefix: str) -> List[List[float]]:
+        prefixed = [prefix + t for t in texts]
         embeddings = self.model.encode(
             prefixed,
             convert_to_numpy=True,
@@ -67,6 +112,52 @@ class _EmbeddingsHelper:
         return embeddings.tolist()
 
 
+def _embedding_cache_key(model_name: str, prefix: str, text: str) -> str:
+    """Chiave cache: (modello, prefix, hash del testo)."""
+    digest = hashlib.sha256(text.encode("utf-8", "surrogatepass")).hexdigest()
+    return f"{model_name}|{prefix}|{digest}"
+
+
+def _pack_vector(vector: List[float]) -> bytes:
+    """Serializza un vettore come float32 (i modelli producono float32)."""
+    return array("f", vector).tobytes()
+
+
+def _unpack_vector(blob: bytes) -> List[float]:
+    vector = array("f")
+    vector.frombytes(blob)
+    return vector.tolist()
+
+
+_embedding_cache_singleton: Optional[DiskLRUCache] = None
+_embedding_cache_init_failed: bool = False
+
+
+def get_embedding_cache() -> Optional[DiskLRUCache]:
+    """
+    Singleton della cache persistente degli embedding. Ritorna None se
+    disattivata (EMBEDDING_CACHE_MAX_MB = 0) o non inizializzabile: in quel
+    caso gli embedding vengono semplicemente ricalcolati.
+    """
+    global _embedding_cache_singleton, _embedding_cache_init_failed
+
+    if _embedding_cache_singleton is not None:
+        return _embedding_cache_singleton
+    if _embedding_cache_init_failed or EMBEDDING_CACHE_MAX_MB <= 0:
+        return None
+
+    try:
+        _embedding_cache_singleton = DiskLRUCache(
+            EMBEDDING_CACHE_FILE,
+            max_bytes=EMBEDDING_CACHE_MAX_MB * 1024 * 1024,
+        )
+        return _embedding_cache_singleton
+    except Exception as e:
+        print(f"⚠️ Cache embedding non disponibile ({e}). Embedding ricalcolati.")
+        _embedding_cache_init_failed = True
+        return None
+
+
 _helper_singleton: Optional[_EmbeddingsHelper] = None
 _helper_init_failed: bool = False
 
@@ -0,0 +1,142 @@
+# rag/index_registry.py
+# DeepAiUG v1.16.0 - Registro degli indici persistenti (uno per sorgente)
+# ============================================================================
+# Ogni combinazione sorgente + parametri di chunking ha la propria
+# collection (kb_<hash>), con manifest/BM25/NumPy dedicati. Il registro
+# ricorda per ciascuna l'ultimo utilizzo e la dimensione stimata su disco:
+# quando il totale supera il budget configurato vengono rimossi gli indici
+# usati meno di recente.
+# ============================================================================
+
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+INDEX_REGISTRY_VERSION = 1
+INDEX_REGISTRY_FILENAME = "_indexes.json"
+
+
+def index_collection_name(source_id: str, chunk_size: int, chunk_overlap: int) -> str:
+    """Nome della collection per sorgente + chunking (valido per ChromaDB)."""
+    key = json.dumps([source_id, chunk_size, chunk_overlap], ensure_ascii=False)
+    return "kb_" + hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+
+
+class IndexRegistry:
+    """
+    Registro JSON degli indici persistenti.
+
+    Attributes:
+        path: File JSON del registro
+        entries: {collection_name: {"source_id", "chunk_size",
+            "chunk_overlap", "last_used", "size_bytes"}}
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self._load()
+
+    def lookup(self, source_id: str, chunk_size: int, chunk_overlap: int) -> Optional[str]:
+        """Collection registrata per sorgente + chunking, se esiste."""
+        for name, entry in self.entries.items():
+            if (entry.get("source_id") == source_id
+                    and entry.get("chunk_size") == chunk_size
+                    and entry.get("chunk_overlap") == chunk_overlap):
+                return name
+        return None
+
+    def most_recent(self) -> Optional[str]:
+        """Collection usata più di recente (None se il registro è vuoto)."""
+        if not self.entries:
+            return None
+        return max(self.entries, key=lambda name: self.entries[name].get("last_used", 0))
+
+    def touch(
+        self,
+        name: str,
+        source_id: Optional[str] = None,
+        chunk_size: Optional[int] = None,
+        chunk_overlap: Optional[int] = None,
+        size_bytes: Optional[int] = None,
+    ):
+        """
+        Registra l'uso di una collection (creandone la voce se serve).
+
+        Args:
+            name: Nome della collection
+            source_id, chunk_size, chunk_overlap: Parametri dell'indice
+            size_bytes: Dimensione stimata su disco (None = invariata)
+        """
+        entry = self.entries.setdefault(name, {"size_bytes": 0})
+        for key, value in (("source_id", source_id), ("chunk_size", chunk_size),
+                           ("chunk_overlap", chunk_overlap), ("size_bytes", size_bytes)):
+            if value is not None:
+                entry[key] = value
+        entry["last_used"] = time.time()
+        self.save()
+
+    def remove(self, name: str):
+        """Rimuove la voce di una collection."""
+        if self.entries.pop(name, None) is not None:
+            self.save()
+
+    def total_bytes(self) -> int:
+        """Dimensione stimata di tutti gli indici registrati."""
+        return sum(e.get("size_bytes", 0) for e in self.entries.values())
+
+    def lru_victims(self, budget_bytes: int, keep: Iterable[str] = ()) -> List[str]:
+        """
+        Collection da rimuovere (dalla meno recente) per rientrare nel budget.
+
+        Args:
+            budget_bytes: Budget su disco (0 = illimitato)
+            keep: Collection da non rimuovere mai (es. quella attiva)
+
+        Returns:
+            Nomi delle collection da rimuovere
+        """
+        if budget_bytes <= 0:
+            return []
+        keep = set(keep)
+        total = self.total_bytes()
+        victims = []
+        for name in sorted(self.entries, key=lambda n: self.entries[n].get("last_used", 0)):
+            if total <= budget_bytes:
+                break
+            if name in keep:
+                continue
+            victims.append(name)
+            total -= self.entries[name].get("size_bytes", 0)
+        return victims
+
+    def save(self):
+        """Salva il registro in modo atomico (file temporaneo + replace)."""
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(
+                    {"version": INDEX_REGISTRY_VERSION, "indexes": self.entries},
+                    f,
+                    ensure_ascii=False,
+                )
+            os.replace(tmp, self.path)
+        except Exception as e:
+            print(f"⚠️ Errore salvataggio registro indici: {e}")
+
+    def _load(self):
+        """Carica il registro; resta vuoto se assente o corrotto."""
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                raw = json.load(f)
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            print(f"⚠️ Registro indici non leggibile ({e}). Verrà ricreato.")
+            return
+        if raw.get("version") == INDEX_REGISTRY_VERSION:
+            self.entries = dict(raw.get("indexes", {}))
@@ -1,43 +1,132 @@
 # rag/manager.py
 # DeepAiUG v1.4.0 - Knowledge Base Manager
+# v1.16.0 - Ricerca ibrida densa + BM25 (Reciprocal Rank Fusion)
+# v1.16.0 - Indicizzazione in streaming (memoria limitata)
+# v1.16.0 - Riuso di un indice esistente (impronta manifest nella collection)
+# v1.16.0 - Un indice persistente per sorgente, eviction LRU su budget disco
+# v1.16.0 - Documenti modificati: riscritti solo i chunk cambiati
+# v1.16.0 - Query come RetrievalRequest (embedding condiviso con la KB chat)
+# v1.16.0 - Cache LRU dei risultati, invalidata dalla generazione dell'indice
+# v1.16.0 - Sorgente non leggibile: sync annullata, indice esistente intatto
+# v1.16.0 - Documenti non caricati (errori) restano nell'indice e vengono ritentati
 # ============================================================================
 
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Dict, Any, List, Optional, Tuple, Callable
+from pathlib import Path
+from typing import Dict, Any, Iterable, List, Optional, Tuple, Callable, Union
 
 from .models import Document, Chunk
-from .adapters import WikiAdapter
+from .adapters import WikiAdapter, SourceUnavailableError
 from .chunker import TextChunker
-from .vector_store import SimpleVectorStore
-from config import DEFAULT_TOP_K_RESULTS
+from .vector_store import SimpleVectorStore, CHROMA_BATCH_SIZE, COLLECTION_NAME
+from .manifest import IndexManifest
+from .index_registry import IndexRegistry, INDEX_REGISTRY_FILENAME, index_collection_name
+from .embeddings import get_active_model_tag
+from .retrieval import RetrievalRequest, cached_search
+from config import DEFAULT_TOP_K_RESULTS, DEFAULT_SEARCH_MODE, RRF_K
+from config.constants import KB_INDEX_DISK_BUDGET_MB
+
+# v1.16.0 — Ricerca ibrida: candidati richiesti a ciascun retriever per
+# ogni risultato finale (la fusione lavora su liste più lunghe del top_k)
+HYBRID_CANDIDATES_FACTOR = 4
+
+# v1.16.0 — Indicizzazione in streaming: chunk accumulati prima di ogni
+# scrittura nel vector store. add_chunks li divide in batch da
+# CHROMA_BATCH_SIZE (encode in pipeline), qui si limita il picco di memoria
+# indipendentemente dalla dimensione della sorgente.
+STREAM_BATCH_CHUNKS = CHROMA_BATCH_SIZE * 8
+
+# v1.16.0 — Store (uno per sorgente) tenuti aperti per il cambio istantaneo
+# di sorgente; gli altri restano su disco e vengono riaperti su richiesta.
+MAX_OPEN_INDEXES = 3
+
+# Pool condiviso per eseguire ricerca densa e BM25 in parallelo
+_search_executor: Optional[ThreadPoolExecutor] = None
+
+
+def _get_search_executor() -> ThreadPoolExecutor:
+    global _search_executor
+    if _search_executor is None:
+        _search_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="kb-search")
+    return _search_executor
+
+
+def reciprocal_rank_fusion(
+    result_lists: List[List[Dict[str, Any]]],
+    top_k: int,
+    k: int = RRF_K,
+) -> List[Dict[str, Any]]:
+    """
+    Fonde più classifiche con Reciprocal Rank Fusion.
+
+    Ogni risultato riceve Σ 1 / (k + rank) sulle liste in cui compare:
+    conta solo la posizione, quindi distanze e score BM25 (scale diverse)
+    non vanno normalizzati.
+
+    Args:
+        result_lists: Liste di risultati (dict con id/text/metadata), in ordine
+        top_k: Numero di risultati da restituire
+        k: Costante RRF (60 = valore standard)
+
+    Returns:
+        Risultati fusi, con "rrf_score", ordinati per score decrescente
+    """
+    fused: Dict[Any, Dict[str, Any]] = {}
+    for results in result_lists:
+        for rank, result in enumerate(results, 1):
+            meta = result.get("metadata") or {}
+            key = result.get("id") or (meta.get("source"), result.get("text"))
+            entry = fused.get(key)
+            if entry is None:
+                # Prima occorrenza: le liste precedenti hanno priorità
+                # per text/metadata/distance
+                entry = fused[key] = dict(result, rrf_score=0.0)
+            entry["rrf_score"] += 1.0 / (k + rank)
+
+    ranked = sorted(fused.values(), key=lambda r: r["rrf_score"], reverse=True)
+    return ranked[:top_k]
 
 
 class KnowledgeBaseManager:
     """
     Gestisce l'intera knowledge base: adapter, chunking, indicizzazione e ricerca.
     
-    Orchestrazione:
+    Orchestrazione (in streaming, un documento alla volta):
     1. Adapter carica documenti dalla sorgente
     2. Chunker divide i documenti in chunks
-    3. VectorStore indicizza i chunks
+    3. VectorStore indicizza i chunks a blocchi di STREAM_BATCH_CHUNKS
     4. Search trova chunks rilevanti per una query
     
     Attributes:
         adapter: WikiAdapter per caricare documenti
         chunker: TextChunker per dividere documenti
-        vector_store: SimpleVectorStore per indicizzazione
-        documents: Lista documenti caricati
-        chunks: Lista chunks creati
+        vector_store: SimpleVectorStore dell'indice attivo
+        manifest: IndexManifest dei documenti presenti nel vector store
+        index_registry: IndexRegistry degli indici persistenti (uno per
+            sorgente + parametri di chunking)
         last_indexed: Timestamp ultima indicizzazione
+        last_index_report: Esito dell'ultima indicizzazione (documenti
+            ri-indicizzati, documenti rimossi, documenti non caricati,
+            chunk scritti, chunk invariati riusati senza re-embedding,
+            eventuale errore della sorgente)
+        search_mode: "dense", "keyword" o "hybrid" (vedi config.SEARCH_MODES)
     """
     
     def __init__(self):
         self.adapter: Optional[WikiAdapter] = None
         self.chunker = TextChunker()
-        self.vector_store = SimpleVectorStore()
-        self.documents: List[Document] = []
-        self.chunks: List[Chunk] = []
+        self.persist_path = SimpleVectorStore.default_persist_path()
+        self.index_registry = IndexRegistry(Path(self.persist_path) / INDEX_REGISTRY_FILENAME)
+        self._open_stores: "OrderedDict[str, SimpleVectorStore]" = OrderedDict()
+        self.vector_store: Optional[SimpleVectorStore] = None
+        self.manifest: Optional[IndexManifest] = None
         self.last_indexed: Optional[str] = None
+        self.last_index_report: Dict[str, Any] = {}
+        self.search_mode = DEFAULT_SEARCH_MODE
+        # Al riavvio si riparte dall'ultimo indice usato
+        self._activate_index(self.index_registry.most_recent() or COLLECTION_NAME)
     
     def set_adapter(self, adapter: WikiAdapter):
         """
@@ -47,6 +136,7 @@ class KnowledgeBaseManager:
             adapter: WikiAdapter configurato
         """
         self.adapter = adapter
+        self._select_index()
     
     def set_chunker(self, chunker: TextChunker):
         """
@@ -56,21 +146,99 @@ class KnowledgeBaseManager:
             chunker: TextChunker configurato
         """
         self.chunker = chunker
+        self._select_index()
+    
+    # ------------------------------------------------------------------
+    # Indici per sorgente
+    # ------------------------------------------------------------------
+    
+    def _select_index(self):
+        """Attiva l'indice di sorgente + chunking correnti (se c'è un adapter)."""
+        if not self.adapter:
+            return
+        self._activate_index(self._collection_name_for(
+            self.adapter.get_source_id(),
+            self.chunker.chunk_size,
+            self.chunker.chunk_overlap,
+        ))
+    
+    def _collection_name_for(self, source_id: str, chunk_size: int, chunk_overlap: int) -> str:
+        """Collection dell'indice per sorgente + chunking (registrata o nuova)."""
+        name = self.index_registry.lookup(source_id, chunk_size, chunk_overlap)
+        if name:
+            return name
+        # Indice unico pre-v1.16.0: adottato dalla sorgente che l'ha costruito
+        if COLLECTION_NAME not in self.index_registry.entries:
+            legacy = IndexManifest.load(Path(self.persist_path) / f"{COLLECTION_NAME}_manifest.json")
+            if legacy.entries and (
+                legacy.source_id, legacy.chunk_size, legacy.chunk_overlap
+            ) == (source_id, chunk_size, chunk_overlap):
+                return COLLECTION_NAME
+        return index_collection_name(source_id, chunk_size, chunk_overlap)
+    
+    def _open_store(self, name: str) -> SimpleVectorStore:
+        """Store della collection indicata (dagli store aperti o da disco)."""
+        store = self._open_stores.pop(name, None)
+        if store is None:
+            store = SimpleVectorStore(self.persist_path, collection_name=name)
+        self._open_stores[name] = store
+
+        # Chiude i meno recenti, mai quello attivo
+        for old_name in list(self._open_stores):
+            if len(self._open_stores) <= MAX_OPEN_INDEXES:
+                break
+            if self._open_stores[old_name] is not self.vector_store:
+                del self._open_stores[old_name]
+        return store
+    
+    def _activate_index(self, name: str):
+        """Rende attivo l'indice indicato, con il suo manifest."""
+        if self.vector_store is not None and self.vector_store.collection_name == name:
+            return
+        self.vector_store = self._open_store(name)
+        self.manifest = IndexManifest.load(self.vector_store.manifest_path)
+        self.last_indexed = self.manifest.updated_at
+        if name in self.index_registry.entries:
+            self.index_registry.touch(name)
+    
+    def _enforce_disk_budget(self):
+        """Rimuove gli indici usati meno di recente oltre KB_INDEX_DISK_BUDGET_MB."""
+        budget = KB_INDEX_DISK_BUDGET_MB * 1024 * 1024
+        victims = self.index_registry.lru_victims(budget, keep={self.vector_store.collection_name})
+        for name in victims:
+            self._open_stores.pop(name, None)
+            SimpleVectorStore.delete_persisted(self.persist_path, name)
+            self.index_registry.remove(name)
+            print(f"ℹ️ Indice KB '{name}' rimosso (budget disco di {KB_INDEX_DISK_BUDGET_MB} MB superato)")
     
     def index_documents(
         self, 
-        progress_callback: Callable[[str, float], None] = None
+        progress_callback: Callable[[str, float], None] = None,
+        incremental: bool = False
     ) -> bool:
         """
         Indicizza tutti i documenti dalla sorgente.
         
-        Processo:
-        1. Carica documenti via adapter
-        2. Divide in chunks via chunker
-        3. Indicizza in vector_store
+        Processo in streaming (documenti e chunk non vengono mai tenuti
+        tutti in memoria):
+        1. Carica i documenti uno alla volta via adapter
+        2. Divide ogni documento in chunks via chunker
+        3. Scrive nel vector_store a blocchi di STREAM_BATCH_CHUNKS chunk,
+           aggiornando il manifest dopo ogni blocco
+        
+        Con incremental=True confronta la sorgente con il manifest della
+        collection e ri-chunka/ri-embedda solo i documenti nuovi o
+        modificati, rimuovendo i chunk dei documenti eliminati. Se la
+        sorgente, i parametri di chunking o il modello di embedding sono
+        cambiati ricade automaticamente su una re-indicizzazione completa.
+        
+        Se la sorgente non è leggibile (SourceUnavailableError) la sync è
+        annullata: l'indice esistente resta com'è e l'errore finisce in
+        last_index_report["error"].
         
         Args:
             progress_callback: Funzione (status_text, progress_fraction) per UI
+            incremental: Se True, aggiorna solo i documenti cambiati
             
         Returns:
             True se indicizzazione completata con successo
@@ -79,68 +247,375 @@ class KnowledgeBaseManager:
             print("❌ Nessun adapter configurato")
             return False
         
-        # 1. Carica documenti
-        if progress_callback:
-            progress_callback("📂 Caricamento documenti...", 0.1)
-        
-        self.documents = self.adapter.load_documents()
-        
-        if not self.documents:
-            print("⚠️ Nessun documento trovato")
-            return False
-        
-        if progress_callback:
-            progress_callback(f"📄 Trovati {len(self.documents)} documenti", 0.3)
-        
-        # 2. Chunking
-        if progress_callback:
-            progress_callback("✂️ Suddivisione in chunks...", 0.5)
-        
-        self.chunks = self.chunker.chunk_documents(self.documents)
-        
-        if progress_callback:
-            progress_callback(f"📦 Creati {len(self.chunks)} chunks", 0.7)
-        
-        # 3. Indicizzazione (con batching ChromaDB)
+        self._select_index()
+        params = self._index_params()
+
+        # Manifest non valido per questa sorgente/configurazione, indice
+        # vuoto (es. collection ricreata per cambio modello o store in
+        # memoria dopo un riavvio) o non allineato al manifest → si riparte
+        # da zero. L'indice viene svuotato solo al primo documento ottenuto:
+        # con la sorgente non raggiungibile resta quello di prima.
+        rebuild = not incremental or not self._index_reusable(params)
+
+        # 1. Confronto sorgente ↔ manifest
         if progress_callback:
-            progress_callback("🔍 Indicizzazione in corso...", 0.8)
+            progress_callback("📂 Analisi sorgente...", 0.0)
 
-        self.vector_store.clear()
+        report = self.last_index_report = {
+            "indexed": [], "removed": [], "failed": [], "chunks": 0, "reused": 0
+        }
+        try:
+            stamps = self.adapter.list_document_stamps()
+        except SourceUnavailableError as e:
+            return self._abort_index(e)
+
+        progress = {"load": 0.0}
+        if stamps is not None:
+            # Adapter con stamp economici: si leggono solo i documenti cambiati
+            to_load, removed = (list(stamps), []) if rebuild else self.manifest.diff(stamps)
+            documents = self._load_each(to_load, removed)
+            total: Optional[int] = len(to_load)
+        else:
+            # Adapter senza stamp: scorre tutto e confronta l'hash del contenuto
+            stamps, removed, total = {}, [], None
+            documents = self.adapter.iter_documents(
+                progress_callback=lambda frac, status: progress.update(load=frac)
+            )
+
+        had_entries = bool(self.manifest.entries) and not rebuild
+        seen = set()
+        n_docs = 0
+        pending_chunks: List[Chunk] = []
+        pending_docs: List[Tuple[str, Dict[str, Any]]] = []
+        stale: List[str] = []
 
-        # Callback interno: mappa progresso batching nel range 0.8 → 1.0
-        def _batch_cb(status: str, frac: float):
+        def _report(status: str):
             if progress_callback:
-                progress_callback(status, 0.8 + frac * 0.2)
+                frac = n_docs / total if total else progress["load"]
+                docs = f"{n_docs}/{total}" if total else str(n_docs)
+                progress_callback(
+                    f"{status} — 📄 {docs} documenti, 📦 {report['chunks']} chunks",
+                    min(frac, 1.0) * 0.95
+                )
+
+        def _flush() -> bool:
+            ok = self._write_batch(
+                pending_chunks, pending_docs, stale,
+                lambda status, frac: _report(f"🔍 {status}")
+            )
+            if ok:
+                report["indexed"].extend(path for path, _ in pending_docs)
+                report["chunks"] += len(pending_chunks)
+            pending_chunks.clear()
+            pending_docs.clear()
+            stale.clear()
+            return ok
+
+        # 2-3. Caricamento → chunking → scrittura a blocchi
+        try:
+            for doc in documents:
+                if rebuild:
+                    self.vector_store.clear()
+                    self.manifest.reset(*params)
+                    rebuild = False
+                n_docs += 1
+                seen.add(doc.path)
+                stamp = stamps.get(doc.path, {})
+
+                # Documenti con stamp cambiato ma contenuto identico (es. solo
+                # "touch") → aggiorna solo il manifest, niente re-embedding
+                entry = self.manifest.entries.get(doc.path)
+                if entry and entry.get("hash") == doc.content_hash:
+                    entry.update(stamp)
+                    continue
+                if entry:
+                    stale.append(doc.path)
+
+                chunks = self.chunker.chunk_document(doc)
+                pending_chunks.extend(chunks)
+                pending_docs.append((doc.path, {
+                    **stamp,
+                    "hash": doc.content_hash,
+                    "chunks": len(chunks),
+                    "chars": len(doc.content),
+                }))
+                _report("📥 Caricamento e chunking")
+
+                if len(pending_chunks) >= STREAM_BATCH_CHUNKS and not _flush():
+                    return False
+        except SourceUnavailableError as e:
+            # Lettura interrotta: i documenti già letti entrano nell'indice,
+            # quelli non visti non sono "eliminati" → nessuna rimozione
+            if pending_docs or stale:
+                _flush()
+            return self._abort_index(e)
+
+        if (pending_docs or stale) and not _flush():
+            return False
+
+        if not seen and not had_entries:
+            print("⚠️ Nessun documento trovato")
+            return False
 
-        self.vector_store.add_chunks(self.chunks, progress_callback=_batch_cb)
+        # 4. Rimozione dei documenti eliminati dalla sorgente (listing o
+        # iterazione completi: le interruzioni sono uscite sopra)
+        if total is None:
+            removed = [p for p in self.manifest.entries if p not in seen]
+        removed = [p for p in removed if p in self.manifest.entries]
+        if removed:
+            if not self.vector_store.delete_sources(removed):
+                return False
+            for doc_path in removed:
+                self.manifest.entries.pop(doc_path, None)
+            report["removed"] = removed
+        self._save_manifest()
+        self._enforce_disk_budget()
 
         self.last_indexed = datetime.now().isoformat()
 
+        if report["failed"]:
+            print(f"⚠️ {len(report['failed'])} documenti non caricati: "
+                  "chunk precedenti mantenuti, ritentati alla prossima sync")
+
         if progress_callback:
-            progress_callback("✅ Indicizzazione completata!", 1.0)
+            failed = f", {len(report['failed'])} non caricati" if report["failed"] else ""
+            if report["indexed"] or removed:
+                progress_callback(
+                    f"✅ Indicizzazione completata: {len(report['indexed'])} documenti "
+                    f"({report['chunks']} chunks), {len(removed)} rimossi{failed}",
+                    1.0
+                )
+            else:
+                progress_callback(f"✅ Knowledge Base già aggiornata{failed}", 1.0)
+
+        return True
+    
+    def _abort_index(self, error: Exception) -> bool:
+        """Sync annullata per sorgente non leggibile: l'indice resta com'è."""
+        print(f"❌ Sorgente non disponibile, indice invariato: {error}")
+        self.last_index_report["error"] = str(error)
+        return False
+    
+    def _load_each(self, doc_paths: List[str], removed: List[str]) -> Iterable[Document]:
+        """
+        Carica uno alla volta i documenti indicati (adapter con stamp).
         
+        I documenti vuoti o non più presenti nella sorgente, se già nel
+        manifest, vengono aggiunti a removed, così i loro chunk escono
+        dall'indice. Quelli il cui caricamento è fallito (rete, timeout...)
+        finiscono in last_index_report["failed"]: chunk e voce di manifest
+        restano com'erano, quindi lo stamp diverso li ripropone alla sync
+        successiva.
+        """
+        for doc_path, doc, error in self.adapter.iter_load_documents(doc_paths):
+            if doc:
+                yield doc
+            elif error is not None:
+                self.last_index_report["failed"].append(doc_path)
+            elif doc_path in self.manifest.entries:
+                removed.append(doc_path)
+    
+    def _write_batch(
+        self,
+        chunks: List[Chunk],
+        docs: List[Tuple[str, Dict[str, Any]]],
+        stale: List[str],
+        progress_callback: Callable[[str, float], None] = None
+    ) -> bool:
+        """
+        Scrive un blocco di chunk nel vector store e aggiorna il manifest.
+        
+        Per i documenti modificati gli ID dei chunk (derivati dal testo)
+        sono confrontati con quelli già indicizzati: i chunk invariati
+        ricevono solo i metadata aggiornati (niente re-embedding), quelli
+        non più presenti vengono rimossi. Il manifest è salvato dopo ogni blocco: se
+        l'indicizzazione si interrompe, la sync successiva riparte dai
+        documenti mancanti.
+        
+        Args:
+            chunks: Chunk da indicizzare
+            docs: (path, voce di manifest) dei documenti del blocco
+            stale: Documenti già indicizzati i cui chunk vanno confrontati
+            progress_callback: Funzione (status_text, progress_fraction) per UI
+            
+        Returns:
+            True se il blocco è stato scritto
+        """
+        unchanged: List[Chunk] = []
+        if stale:
+            existing = self.vector_store.get_ids_by_source(stale)
+            if existing is None:
+                return False
+            indexed_ids = set().union(*existing.values())
+            unchanged = [c for c in chunks if c.id in indexed_ids]
+            kept = {c.id for c in unchanged}
+            chunks = [c for c in chunks if c.id not in kept]
+            if not self.vector_store.delete_ids(sorted(indexed_ids - kept)):
+                return False
+            for doc_path in stale:
+                self.manifest.entries.pop(doc_path, None)
+
+        if (
+            chunks and not self.vector_store.add_chunks(chunks, progress_callback=progress_callback)
+        ) or not self.vector_store.update_metadata(unchanged):
+            # I documenti del blocco non sono nell'indice: restano fuori
+            # dal manifest così verranno ritentati alla prossima sync
+            self._save_manifest()
+            return False
+        self.last_index_report["reused"] = self.last_index_report.get("reused", 0) + len(unchanged)
+
+        for doc_path, entry in docs:
+            self.manifest.entries[doc_path] = entry
+        self._save_manifest()
         return True
     
+    def _index_params(self) -> Tuple[str, int, int, str]:
+        """Parametri che identificano un indice: sorgente, chunking, modello."""
+        return (
+            self.adapter.get_source_id() if self.adapter else "",
+            self.chunker.chunk_size,
+            self.chunker.chunk_overlap,
+            self._embedding_model(),
+        )
+    
+    def _embedding_model(self, store: Optional[SimpleVectorStore] = None) -> str:
+        """Modello di embedding della collection (o quello attivo)."""
+        store = store or self.vector_store
+        return store.get_stats().get("embedding_model") or get_active_model_tag()
+    
+    def has_index_for(self, source_id: str, chunk_size: int, chunk_overlap: int) -> bool:
+        """
+        Verifica se la KB contiene già un indice costruito da questa
+        sorgente con questi parametri di chunking: in quel caso basta una
+        sync incrementale (index_documents(incremental=True)) invece di
+        una re-indicizzazione completa.
+        
+        Args:
+            source_id: Identificativo sorgente (adapter.get_source_id())
+            chunk_size: Dimensione chunk
+            chunk_overlap: Overlap chunk
+            
+        Returns:
+            True se l'indice esistente è riusabile
+        """
+        name = self._collection_name_for(source_id, chunk_size, chunk_overlap)
+        if name not in self.index_registry.entries and name != COLLECTION_NAME:
+            return False  # mai indicizzata: evita di creare una collection vuota
+        store = self._open_store(name)
+        manifest = (
+            self.manifest if store is self.vector_store
+            else IndexManifest.load(store.manifest_path)
+        )
+        return self._index_reusable(
+            (source_id, chunk_size, chunk_overlap, self._embedding_model(store)),
+            store,
+            manifest,
+        )
+    
+    def _index_reusable(
+        self,
+        params: Tuple[str, int, int, str],
+        store: Optional[SimpleVectorStore] = None,
+        manifest: Optional[IndexManifest] = None,
+    ) -> bool:
+        """
+        True se manifest e vector store (default: quelli attivi) descrivono
+        lo stesso indice, costruito con questi parametri.
+        """
+        store = store or self.vector_store
+        manifest = manifest or self.manifest
+        if not manifest.matches(*params) or not manifest.entries:
+            return False
+        if store.is_empty():
+            return False
+        info = store.get_index_info()
+        if not info.get("manifest_fingerprint"):
+            # Collection costruita prima della v1.16.0: ci si fida del manifest
+            return True
+        return (
+            info.get("manifest_fingerprint") == manifest.fingerprint()
+            and info.get("source_id") == params[0]
+            and info.get("chunk_size") == params[1]
+            and info.get("chunk_overlap") == params[2]
+        )
+    
+    def _save_manifest(self):
+        """
+        Salva il manifest, ne registra l'impronta nel vector store e
+        aggiorna l'indice nel registro (ultimo uso, spazio su disco).
+        """
+        self.manifest.save()
+        self.vector_store.set_index_info({
+            "source_id": self.manifest.source_id,
+            "chunk_size": self.manifest.chunk_size,
+            "chunk_overlap": self.manifest.chunk_overlap,
+            "manifest_fingerprint": self.manifest.fingerprint(),
+        })
+        self.index_registry.touch(
+            self.vector_store.collection_name,
+            source_id=self.manifest.source_id,
+            chunk_size=self.manifest.chunk_size,
+            chunk_overlap=self.manifest.chunk_overlap,
+            size_bytes=self.vector_store.disk_usage_bytes(),
+        )
+    
     def search(
         self, 
-        query: str, 
-        top_k: int = DEFAULT_TOP_K_RESULTS
+        query: Union[str, RetrievalRequest], 
+        top_k: int = DEFAULT_TOP_K_RESULTS,
+        mode: Optional[str] = None
     ) -> List[Dict[str, Any]]:
         """
         Cerca nella knowledge base.
         
+        In modalità "hybrid" la ricerca densa (ChromaDB/NumPy) e quella BM25
+        girano in parallelo e le classifiche sono fuse con RRF. Senza indice
+        denso (store in memoria) si usa la sola ricerca keyword.
+        
+        Le query ripetute sono servite dalla cache dei risultati finché
+        l'indice non cambia (vedi retrieval.cached_search).
+        
         Args:
-            query: Testo della query
+            query: Testo della query o RetrievalRequest del turno
             top_k: Numero massimo di risultati
+            mode: "dense", "keyword" o "hybrid" (default: self.search_mode)
             
         Returns:
             Lista di risultati dal vector store
         """
-        return self.vector_store.search(query, top_k)
+        mode = mode or self.search_mode
+        store = self.vector_store
+        return cached_search(
+            store.cache_key,
+            RetrievalRequest.of(query).query,
+            top_k,
+            mode,
+            lambda: self._search_store(store, query, top_k, mode),
+        )
+    
+    def _search_store(
+        self,
+        store: SimpleVectorStore,
+        query: Union[str, RetrievalRequest],
+        top_k: int,
+        mode: str
+    ) -> List[Dict[str, Any]]:
+        """Ricerca effettiva sul vector store (senza cache)."""
+        if mode == "keyword":
+            return store.keyword_search(query, top_k)
+        if mode != "hybrid" or not store.has_dense_index:
+            return store.search(query, top_k)
+
+        n_candidates = top_k * HYBRID_CANDIDATES_FACTOR
+        dense_future = _get_search_executor().submit(store.search, query, n_candidates)
+        keyword_results = store.keyword_search(query, n_candidates)
+        dense_results = dense_future.result()
+
+        return reciprocal_rank_fusion([dense_results, keyword_results], top_k)
     
     def get_context_for_prompt(
         self, 
-        query: str, 
+        query: Union[str, RetrievalRequest], 
         top_k: int = DEFAULT_TOP_K_RESULTS
     ) -> Tuple[str, List[str]]:
         """
@@ -150,7 +625,8 @@ class KnowledgeBaseManager:
         nel prompt del modello.
         
         Args:
-            query: Domanda dell'utente
+            query: Domanda dell'utente, o RetrievalRequest condivisa con
+                le altre collection interrogate nel turno
             top_k: Numero documenti da includere
             
         Returns:
@@ -187,13 +663,14 @@ class KnowledgeBaseManager:
         vs_stats = self.vector_store.get_stats()
         
         return {
-            "document_count": len(self.documents),
-            "chunk_count": vs_stats.get("chunk_count", len(self.chunks)),
-            "total_chars": sum(len(d.content) for d in self.documents),
+            "document_count": self.manifest.document_count(),
+            "chunk_count": vs_stats.get("chunk_count", 0),
+            "total_chars": self.manifest.total_chars(),
             "using_chromadb": vs_stats.get("using_chromadb", False),
             "last_indexed": self.last_indexed,
             "persist_path": vs_stats.get("persist_path"),
             "embedding_model": vs_stats.get("embedding_model"),
+            "index_name": self.vector_store.collection_name,
         }
     
     def is_indexed(self) -> bool:
@@ -207,8 +684,9 @@ class KnowledgeBaseManager:
         return stats.get("chunk_count", 0) > 0
     
     def clear(self):
-        """Svuota completamente la knowledge base."""
-        self.documents = []
-        self.chunks = []
+        """Svuota l'indice attivo della knowledge base."""
+        self.last_index_report = {}
         self.vector_store.clear()
+        self.manifest.delete()
+        self.index_registry.remove(self.vector_store.collection_name)
         self.last_indexed = None
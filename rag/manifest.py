@@ -0,0 +1,184 @@
+# rag/manifest.py
+# DeepAiUG v1.16.0 - Manifest per indicizzazione incrementale
+# ============================================================================
+# Tiene traccia, per ogni documento indicizzato, di uno "stamp" economico
+# (size + mtime per i file locali) e dell'hash del contenuto. Alla sync
+# successiva il manager confronta lo stato attuale della sorgente con il
+# manifest e ri-chunka/ri-embedda solo i documenti nuovi o modificati,
+# rimuovendo dal vector store i chunk dei documenti spariti.
+#
+# v1.16.0 - fingerprint(): impronta del manifest registrata anche nella
+# collection, per verificare che indice e manifest siano allineati.
+# ============================================================================
+
+import hashlib
+import json
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+
+MANIFEST_VERSION = 1
+
+
+class IndexManifest:
+    """
+    Manifest persistente dei documenti presenti in una collection.
+
+    Attributes:
+        path: File JSON su cui è persistito il manifest
+        source_id: Identificativo della sorgente (cartella o URL wiki)
+        chunk_size: Dimensione chunk usata per costruire l'indice
+        chunk_overlap: Overlap usato per costruire l'indice
+        embedding_model: Tag del modello di embedding della collection
+        entries: {doc_path: {stamp..., "hash", "chunks", "chars"}}
+        updated_at: Timestamp ultimo aggiornamento
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.source_id: Optional[str] = None
+        self.chunk_size: Optional[int] = None
+        self.chunk_overlap: Optional[int] = None
+        self.embedding_model: Optional[str] = None
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self.updated_at: Optional[str] = None
+
+    @classmethod
+    def load(cls, path: Path) -> "IndexManifest":
+        """Carica il manifest da disco (manifest vuoto se assente o corrotto)."""
+        manifest = cls(path)
+        try:
+            if manifest.path.exists():
+                with open(manifest.path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                if data.get("version") == MANIFEST_VERSION:
+                    manifest.source_id = data.get("source_id")
+                    manifest.chunk_size = data.get("chunk_size")
+                    manifest.chunk_overlap = data.get("chunk_overlap")
+                    manifest.embedding_model = data.get("embedding_model")
+                    manifest.entries = data.get("entries", {})
+                    manifest.updated_at = data.get("updated_at")
+        except Exception as e:
+            print(f"⚠️ Manifest indice non leggibile ({e}): verrà ricostruito")
+        return manifest
+
+    def save(self):
+        """Salva il manifest su disco (scrittura atomica via file temporaneo)."""
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self.updated_at = datetime.now().isoformat()
+            data = {
+                "version": MANIFEST_VERSION,
+                "source_id": self.source_id,
+                "chunk_size": self.chunk_size,
+                "chunk_overlap": self.chunk_overlap,
+                "embedding_model": self.embedding_model,
+                "updated_at": self.updated_at,
+                "entries": self.entries,
+            }
+            tmp_path = self.path.with_suffix(".tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False)
+            tmp_path.replace(self.path)
+        except Exception as e:
+            print(f"⚠️ Impossibile salvare manifest indice: {e}")
+
+    def delete(self):
+        """Rimuove il manifest da disco e svuota lo stato in memoria."""
+        self.source_id = None
+        self.chunk_size = None
+        self.chunk_overlap = None
+        self.embedding_model = None
+        self.entries = {}
+        try:
+            if self.path.exists():
+                self.path.unlink()
+        except Exception as e:
+            print(f"⚠️ Impossibile rimuovere manifest indice: {e}")
+
+    def matches(
+        self,
+        source_id: str,
+        chunk_size: int,
+        chunk_overlap: int,
+        embedding_model: str,
+    ) -> bool:
+        """True se il manifest descrive un indice costruito con questi parametri."""
+        return (
+            self.source_id == source_id
+            and self.chunk_size == chunk_size
+            and self.chunk_overlap == chunk_overlap
+            and self.embedding_model == embedding_model
+        )
+
+    def reset(
+        self,
+        source_id: str,
+        chunk_size: int,
+        chunk_overlap: int,
+        embedding_model: str,
+    ):
+        """Riparte da un manifest vuoto per una nuova sorgente/configurazione."""
+        self.source_id = source_id
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.embedding_model = embedding_model
+        self.entries = {}
+
+    def is_unchanged(self, doc_path: str, stamp: Dict[str, Any]) -> bool:
+        """
+        True se il documento è nel manifest con lo stesso stamp.
+
+        Lo stamp è un dizionario economico da calcolare senza leggere il
+        contenuto (es. {"size", "mtime_ns"} per i file locali).
+        """
+        entry = self.entries.get(doc_path)
+        if entry is None or not stamp:
+            return False
+        return all(entry.get(k) == v for k, v in stamp.items())
+
+    def diff(
+        self, stamps: Dict[str, Dict[str, Any]]
+    ) -> Tuple[List[str], List[str]]:
+        """
+        Confronta lo stato attuale della sorgente con il manifest.
+
+        Args:
+            stamps: {doc_path: stamp} dei documenti presenti ora nella sorgente
+
+        Returns:
+            Tupla (da_caricare, rimossi): documenti nuovi/modificati e
+            documenti presenti nel manifest ma spariti dalla sorgente
+        """
+        to_load = [p for p, s in stamps.items() if not self.is_unchanged(p, s)]
+        removed = [p for p in self.entries if p not in stamps]
+        return to_load, removed
+
+    def fingerprint(self) -> str:
+        """
+        Impronta del contenuto dell'indice: parametri + (path, hash, chunk)
+        di ogni documento. Non dipende dagli stamp né da updated_at.
+        """
+        digest = hashlib.sha1()
+        digest.update(json.dumps(
+            [self.source_id, self.chunk_size, self.chunk_overlap, self.embedding_model]
+        ).encode("utf-8"))
+        for doc_path in sorted(self.entries):
+            entry = self.entries[doc_path]
+            digest.update(
+                f"\n{doc_path}\0{entry.get('hash')}\0{entry.get('chunks')}".encode(
+                    "utf-8", "surrogatepass"
+                )
+            )
+        return digest.hexdigest()
+
+    def document_count(self) -> int:
+        """Numero di documenti presenti nell'indice."""
+        return len(self.entries)
+
+    def total_chars(self) -> int:
+        """Caratteri totali dei documenti presenti nell'indice."""
+        return sum(e.get("chars", 0) for e in self.entries.values())
+
+    def __len__(self):
+        return len(self.entries)
@@ -1,5 +1,7 @@
 # rag/models.py
 # DeepAiUG v1.4.0 - Modelli dati RAG
+# v1.16.0 - Metadata snelli dei chunk per lo storage (testo non duplicato)
+# v1.16.0 - ID dei chunk stabili, derivati da documento + contenuto
 # ============================================================================
 
 from pathlib import Path
@@ -26,6 +28,7 @@ class Document:
         self.path = path
         self.content = content
         self.metadata = metadata or {}
+        self._hash_cache = None  # (content, hash): calcolato una volta per contenuto
         
         # Auto-populate metadata base
         self.metadata["source"] = path
@@ -38,6 +41,14 @@ class Document:
     def __len__(self):
         return len(self.content)
     
+    @property
+    def content_hash(self) -> str:
+        """Hash SHA-1 del contenuto (usato dal manifest per i sync incrementali)."""
+        if self._hash_cache is None or self._hash_cache[0] is not self.content:
+            digest = hashlib.sha1(self.content.encode("utf-8", "surrogatepass")).hexdigest()
+            self._hash_cache = (self.content, digest)
+        return self._hash_cache[1]
+    
     def to_dict(self) -> Dict[str, Any]:
         """Converte il documento in dizionario."""
         return {
@@ -60,6 +71,7 @@ class Chunk:
         chunk_index: Indice del chunk nel documento
         start_char: Posizione iniziale nel documento originale
         end_char: Posizione finale nel documento originale
+        occurrence: Occorrenze precedenti dello stesso testo nel documento
         id: ID univoco generato automaticamente
     """
     
@@ -69,22 +81,32 @@ class Chunk:
         document: Document, 
         chunk_index: int, 
         start_char: int, 
-        end_char: int
+        end_char: int,
+        occurrence: int = 0
     ):
         self.text = text
         self.document = document
         self.chunk_index = chunk_index
         self.start_char = start_char
         self.end_char = end_char
+        self.occurrence = occurrence
         self.id = self._generate_id()
     
     def _generate_id(self) -> str:
-        """Genera ID univoco per il chunk basato su contenuto e posizione."""
-        content = f"{self.document.path}_{self.chunk_index}_{self.text[:50]}"
-        return hashlib.md5(content.encode()).hexdigest()
+        """
+        Genera l'ID del chunk da documento + hash dell'intero testo.
+        
+        v1.16.0 — non dipende dalla posizione: inserire un paragrafo in un
+        documento non cambia l'ID dei chunk rimasti identici, e la sync
+        incrementale riscrive solo quelli cambiati. occurrence distingue
+        testi ripetuti nello stesso documento.
+        """
+        text_hash = hashlib.sha1(self.text.encode("utf-8", "surrogatepass")).hexdigest()
+        content = f"{self.document.path}\0{text_hash}\0{self.occurrence}"
+        return hashlib.md5(content.encode("utf-8", "surrogatepass")).hexdigest()
     
     def to_dict(self) -> Dict[str, Any]:
-        """Converte il chunk in dizionario per storage."""
+        """Converte il chunk in dizionario (con id e testo)."""
         return {
             "id": self.id,
             "text": self.text,
@@ -95,6 +117,22 @@ class Chunk:
             "end_char": self.end_char,
         }
     
+    def to_metadata(self) -> Dict[str, Any]:
+        """
+        Metadata del chunk per il vector store.
+        
+        Senza id e testo: il vector store li salva già come id e document,
+        ripeterli nei metadata raddoppierebbe spazio e I/O di ogni query.
+        """
+        return {
+            "source": self.document.path,
+            "filename": self.document.metadata.get("filename"),
+            "chunk_index": self.chunk_index,
+            "start_char": self.start_char,
+            "end_char": self.end_char,
+            "doc_hash": self.document.content_hash,
+        }
+    
     def __repr__(self):
         return f"Chunk({self.document.metadata.get('filename')}[{self.chunk_index}])"
     
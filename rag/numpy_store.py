@@ -0,0 +1,267 @@
+# rag/numpy_store.py
+# DeepAiUG v1.16.0 - Indice vettoriale NumPy (fallback senza ChromaDB)
+# ============================================================================
+# Usato da SimpleVectorStore quando ChromaDB non è disponibile ma il modello
+# di embedding (sentence-transformers) sì: i vettori normalizzati stanno in
+# un'unica matrice float32 contigua e ogni query è un prodotto
+# matrice-vettore + argpartition per il top-k.
+#
+# Persistenza: <nome>.npy (matrice) + <nome>.json (id, testi, metadata).
+# ============================================================================
+
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+NUMPY_INDEX_VERSION = 1
+
+# Capacità iniziale della matrice (righe); raddoppia quando si riempie
+_INITIAL_CAPACITY = 1024
+
+
+class NumpyVectorIndex:
+    """
+    Indice denso in memoria con similarità coseno.
+
+    Attributes:
+        base_path: Percorso base dei file (senza estensione)
+        model_tag: Modello di embedding con cui sono stati calcolati i vettori
+        ids: ID dei chunk, allineati alle righe della matrice
+        texts: Testi dei chunk
+        metadatas: Metadata dei chunk
+    """
+
+    def __init__(self, base_path: Path, model_tag: str):
+        self.base_path = Path(base_path)
+        self.model_tag = model_tag
+        self.ids: List[str] = []
+        self.texts: List[str] = []
+        self.metadatas: List[Dict[str, Any]] = []
+        self._matrix: Optional[np.ndarray] = None
+        self._rows: Optional[Dict[str, int]] = None  # id → riga, costruito su richiesta
+        self._load()
+
+    @property
+    def vectors_path(self) -> Path:
+        return self.base_path.parent / f"{self.base_path.name}.npy"
+
+    @property
+    def records_path(self) -> Path:
+        return self.base_path.parent / f"{self.base_path.name}.json"
+
+    def __len__(self):
+        return len(self.ids)
+
+    # ------------------------------------------------------------------
+    # Scrittura
+    # ------------------------------------------------------------------
+
+    def add(
+        self,
+        ids: Sequence[str],
+        vectors: Sequence[Sequence[float]],
+        texts: Sequence[str],
+        metadatas: Sequence[Dict[str, Any]],
+    ):
+        """
+        Aggiunge (o sostituisce, a parità di id) un batch di vettori.
+
+        I vettori vengono normalizzati: il prodotto scalare in search()
+        corrisponde così alla similarità coseno.
+        """
+        if not ids:
+            return
+
+        existing = set(self.ids).intersection(ids)
+        if existing:
+            self._delete_mask([i in existing for i in self.ids])
+
+        batch = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(batch, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        batch /= norms
+
+        n = len(self.ids)
+        self._reserve(n + len(batch), batch.shape[1])
+        self._matrix[n:n + len(batch)] = batch
+
+        self.ids.extend(ids)
+        self.texts.extend(texts)
+        self.metadatas.extend(metadatas)
+        self._rows = None
+
+    def delete_sources(self, sources: Sequence[str]) -> int:
+        """Rimuove i vettori dei documenti indicati (metadata "source")."""
+        to_remove = set(sources)
+        mask = [m.get("source") in to_remove for m in self.metadatas]
+        return self._delete_mask(mask)
+
+    def delete_ids(self, ids: Sequence[str]) -> int:
+        """Rimuove i vettori con gli ID indicati."""
+        to_remove = set(ids)
+        return self._delete_mask([i in to_remove for i in self.ids])
+
+    def update_metadatas(self, ids: Sequence[str], metadatas: Sequence[Dict[str, Any]]) -> int:
+        """Sostituisce i metadata dei vettori indicati (vettori e testi invariati)."""
+        rows = self._row_map()
+        updated = 0
+        for chunk_id, meta in zip(ids, metadatas):
+            row = rows.get(chunk_id)
+            if row is not None:
+                self.metadatas[row] = meta
+                updated += 1
+        return updated
+
+    def clear(self):
+        """Svuota l'indice e rimuove i file persistiti."""
+        self.ids, self.texts, self.metadatas = [], [], []
+        self._matrix = None
+        self._rows = None
+        for path in (self.vectors_path, self.records_path):
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+
+    def _reserve(self, rows: int, dim: int):
+        """Garantisce capacità per `rows` righe (crescita geometrica)."""
+        if self._matrix is None or self._matrix.shape[1] != dim:
+            if self.ids:
+                raise ValueError(
+                    f"Dimensione embedding diversa ({dim}) da quella dell'indice"
+                )
+            self._matrix = np.empty((max(rows, _INITIAL_CAPACITY), dim), dtype=np.float32)
+            return
+        if rows > self._matrix.shape[0]:
+            grown = np.empty((max(rows, 2 * self._matrix.shape[0]), dim), dtype=np.float32)
+            grown[:len(self.ids)] = self._matrix[:len(self.ids)]
+            self._matrix = grown
+
+    def _delete_mask(self, mask: List[bool]) -> int:
+        removed = sum(mask)
+        if not removed:
+            return 0
+        keep = np.logical_not(np.asarray(mask, dtype=bool))
+        kept_rows = self._matrix[:len(self.ids)][keep]
+        self._matrix[:len(kept_rows)] = kept_rows
+        self.ids = [v for v, k in zip(self.ids, keep) if k]
+        self.texts = [v for v, k in zip(self.texts, keep) if k]
+        self.metadatas = [v for v, k in zip(self.metadatas, keep) if k]
+        self._rows = None
+        return removed
+
+    # ------------------------------------------------------------------
+    # Ricerca
+    # ------------------------------------------------------------------
+
+    def get_records(self, ids: Sequence[str]) -> Dict[str, tuple]:
+        """Ritorna {id: (text, metadata)} per gli id presenti nell'indice."""
+        rows = self._row_map()
+        found = {}
+        for chunk_id in ids:
+            row = rows.get(chunk_id)
+            if row is not None:
+                found[chunk_id] = (self.texts[row], self.metadatas[row])
+        return found
+
+    def _row_map(self) -> Dict[str, int]:
+        if self._rows is None:
+            self._rows = {chunk_id: row for row, chunk_id in enumerate(self.ids)}
+        return self._rows
+
+    def search(self, query_vector: Sequence[float], top_k: int) -> List[Dict[str, Any]]:
+        """
+        Top-k per similarità coseno.
+
+        Returns:
+            Lista di risultati con text, metadata, distance (1 - coseno)
+        """
+        n = len(self.ids)
+        if n == 0 or top_k <= 0:
+            return []
+
+        query = np.asarray(query_vector, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm > 0:
+            query = query / norm
+
+        scores = self._matrix[:n] @ query
+        k = min(top_k, n)
+        if k < n:
+            top = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top = np.arange(n)
+        top = top[np.argsort(-scores[top], kind="stable")]
+
+        return [
+            {
+                "id": self.ids[i],
+                "text": self.texts[i],
+                "metadata": self.metadatas[i],
+                "distance": float(1.0 - scores[i]),
+            }
+            for i in top
+        ]
+
+    # ------------------------------------------------------------------
+    # Persistenza
+    # ------------------------------------------------------------------
+
+    def save(self):
+        """Salva matrice e record in modo atomico (file temporaneo + replace)."""
+        self.base_path.parent.mkdir(parents=True, exist_ok=True)
+        n = len(self.ids)
+
+        tmp_vectors = self.vectors_path.with_name(self.vectors_path.name + ".tmp")
+        with open(tmp_vectors, "wb") as f:
+            matrix = self._matrix[:n] if self._matrix is not None else np.empty((0, 0), np.float32)
+            np.save(f, matrix)
+
+        tmp_records = self.records_path.with_name(self.records_path.name + ".tmp")
+        with open(tmp_records, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "version": NUMPY_INDEX_VERSION,
+                    "embedding_model": self.model_tag,
+                    "ids": self.ids,
+                    "texts": self.texts,
+                    "metadatas": self.metadatas,
+                },
+                f,
+                ensure_ascii=False,
+            )
+
+        os.replace(tmp_vectors, self.vectors_path)
+        os.replace(tmp_records, self.records_path)
+
+    def _load(self):
+        """Carica l'indice persistito; riparte vuoto se assente o incompatibile."""
+        if not self.vectors_path.exists() or not self.records_path.exists():
+            return
+        try:
+            with open(self.records_path, "r", encoding="utf-8") as f:
+                records = json.load(f)
+            matrix = np.load(self.vectors_path)
+        except Exception as e:
+            print(f"⚠️ Indice NumPy non leggibile ({e}). Re-indicizzazione richiesta.")
+            return
+
+        if records.get("version") != NUMPY_INDEX_VERSION:
+            return
+        if records.get("embedding_model") != self.model_tag:
+            print(
+                f"⚠️ Embedding model cambiato ({records.get('embedding_model')} → "
+                f"{self.model_tag}). Indice NumPy ignorato — re-indicizzazione richiesta."
+            )
+            return
+        if len(records.get("ids", [])) != len(matrix):
+            print("⚠️ Indice NumPy incoerente. Re-indicizzazione richiesta.")
+            return
+
+        self.ids = list(records["ids"])
+        self.texts = list(records["texts"])
+        self.metadatas = list(records["metadatas"])
+        self._matrix = np.ascontiguousarray(matrix, dtype=np.float32) if len(matrix) else None
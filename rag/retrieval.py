@@ -0,0 +1,166 @@
+# rag/retrieval.py
+# DeepAiUG v1.16.0 - Richiesta di retrieval condivisa tra collection
+# ============================================================================
+# Con KB wiki e KB chat attive, ogni collection interrogata calcolava da sé
+# l'embedding della stessa domanda (embedding function ChromaDB). Una
+# RetrievalRequest calcola l'embedding "query: " una sola volta, al primo
+# uso, e lo passa come query_embeddings a tutte le collection del turno.
+#
+# Domande ripetute (rigenera, follow-up socratici) sono servite da due cache
+# LRU in-process: testo normalizzato → embedding, e (collection, generazione
+# dell'indice, query, top_k, filtri) → risultati. Ogni scrittura su una
+# collection ne incrementa la generazione: i risultati in cache diventano
+# irraggiungibili senza bisogno di invalidarli uno a uno.
+# ============================================================================
+
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Union
+
+from .embeddings import get_embeddings_helper
+
+QUERY_EMBEDDING_CACHE_SIZE = 256
+SEARCH_RESULTS_CACHE_SIZE = 256
+
+
+class LRUCache:
+    """Cache LRU thread-safe con numero massimo di voci."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key: Hashable) -> Any:
+        """Valore in cache (None se assente), marcato come usato di recente."""
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def put(self, key: Hashable, value: Any):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+_query_embeddings = LRUCache(QUERY_EMBEDDING_CACHE_SIZE)
+_search_results = LRUCache(SEARCH_RESULTS_CACHE_SIZE)
+
+_generations: Dict[str, int] = {}
+_generations_lock = threading.Lock()
+
+
+def normalize_query(text: str) -> str:
+    """Testo della query senza spazi iniziali/finali e con spazi compattati."""
+    return " ".join(text.split())
+
+
+def index_generation(collection_key: str) -> int:
+    """Generazione corrente della collection (0 = mai modificata in questo processo)."""
+    return _generations.get(collection_key, 0)
+
+
+def bump_index_generation(collection_key: str):
+    """Da chiamare dopo ogni scrittura sulla collection: invalida i risultati in cache."""
+    with _generations_lock:
+        _generations[collection_key] = _generations.get(collection_key, 0) + 1
+
+
+def cached_search(
+    collection_key: str,
+    query: str,
+    top_k: int,
+    filters: Hashable,
+    search_fn: Callable[[], List[Dict[str, Any]]],
+) -> List[Dict[str, Any]]:
+    """
+    Risultati di search_fn() per la query, dalla cache se la collection non
+    è cambiata dall'ultima ricerca identica.
+
+    Le liste vuote non vengono salvate (gli errori di ricerca ritornano []).
+
+    Args:
+        collection_key: Identificativo della collection
+        query: Testo della query
+        top_k: Numero di risultati
+        filters: Altri parametri che influenzano i risultati (modo, filtri)
+        search_fn: Ricerca effettiva, eseguita solo in caso di miss
+
+    Returns:
+        Copia dei risultati (i chiamanti possono modificarli)
+    """
+    key = (collection_key, index_generation(collection_key), normalize_query(query), top_k, filters)
+    results = _search_results.get(key)
+    if results is None:
+        results = search_fn()
+        if results:
+            _search_results.put(key, _copy_results(results))
+    return _copy_results(results)
+
+
+def _copy_results(results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Copia dei risultati, metadata inclusi (i chiamanti li arricchiscono)."""
+    return [
+        {**r, "metadata": dict(r["metadata"])} if isinstance(r.get("metadata"), dict) else dict(r)
+        for r in results
+    ]
+
+
+class RetrievalRequest:
+    """
+    Query di un turno utente con embedding calcolato al più una volta.
+
+    Attributes:
+        query: Testo della query
+    """
+
+    def __init__(self, query: str):
+        self.query = query
+        self._embedding: Optional[List[float]] = None
+        self._computed = False
+        # La ricerca ibrida interroga l'indice denso da un thread del pool
+        self._lock = threading.Lock()
+
+    @classmethod
+    def of(cls, query: Union[str, "RetrievalRequest"]) -> "RetrievalRequest":
+        """Accetta sia una stringa sia una RetrievalRequest già creata."""
+        return query if isinstance(query, RetrievalRequest) else cls(query)
+
+    @property
+    def query_embedding(self) -> Optional[List[float]]:
+        """
+        Embedding della query con prefix "query: ".
+
+        None se sentence-transformers non è disponibile: le collection
+        usano allora la propria embedding function (default ChromaDB).
+        """
+        with self._lock:
+            if not self._computed:
+                helper = get_embeddings_helper()
+                if helper is not None:
+                    text = normalize_query(self.query)
+                    key = (helper.model_name, text)
+                    self._embedding = _query_embeddings.get(key)
+                    if self._embedding is None:
+                        self._embedding = helper.encode_query([text])[0]
+                        _query_embeddings.put(key, self._embedding)
+                self._computed = True
+        return self._embedding
+
+    def chroma_query_kwargs(self) -> Dict[str, Any]:
+        """Argomenti di collection.query(): embedding condiviso o testo."""
+        embedding = self.query_embedding
+        if embedding is None:
+            return {"query_texts": [self.query]}
+        return {"query_embeddings": [embedding]}
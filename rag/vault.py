@@ -1,14 +1,28 @@
 # rag/vault.py
 # DeepAiUG v1.13.0 - F3 Vault Support
+# v1.16.0 - walk_files(): scansione in un solo passaggio con pruning
+# v1.16.0 - get_vault_summary(): riepilogo in cache (mtime delle cartelle)
 # ============================================================================
 # Riconoscimento automatico vault Obsidian, LogSeq, Notion Export.
 # Filtro file per tipo vault, parser .canvas, aggiornamento incrementale.
 # ============================================================================
 
 import json
+import os
+import threading
 from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 
-from config.constants import VAULT_TYPES
+from config.constants import KNOWLEDGE_BASE_DIR, VAULT_TYPES
+
+# v1.16.0 — Cache dei riepiloghi vault (numero file, dimensione, tipo).
+# Valida finché nessuna cartella scansionata cambia mtime: aggiungere,
+# rimuovere o rinominare un file aggiorna l'mtime della sua cartella.
+VAULT_SUMMARY_CACHE_FILE = KNOWLEDGE_BASE_DIR / "vault_summary_cache.json"
+VAULT_SUMMARY_CACHE_VERSION = 1
+
+_summary_lock = threading.Lock()
+_summary_cache: Optional[Dict[str, dict]] = None
 
 
 def detect_vault_type(folder_path: str) -> dict:
@@ -31,19 +45,86 @@ def detect_vault_type(folder_path: str) -> dict:
     return {**VAULT_TYPES['folder'], 'type': 'folder'}
 
 
+def walk_files(root,
+               extensions: Iterable[str],
+               exclude_patterns: Iterable[str] = (),
+               recursive: bool = True) -> List[Path]:
+    """
+    Elenca i file sotto root con una delle estensioni indicate.
+
+    Un solo passaggio os.scandir per tutte le estensioni (invece di un
+    rglob per estensione). I pattern di esclusione restano sottostringhe
+    del path completo, ma le cartelle escluse non vengono nemmeno aperte:
+    se un pattern compare nel path della cartella compare anche in quello
+    di tutti i suoi file. I link simbolici a cartelle non vengono seguiti.
+
+    Returns:
+        Lista ordinata di Path
+    """
+    return sorted(
+        Path(entry.path)
+        for _, entries in _walk(root, extensions, exclude_patterns, recursive)
+        for entry in entries
+    )
+
+
+def _walk(root,
+          extensions: Iterable[str],
+          exclude_patterns: Iterable[str] = (),
+          recursive: bool = True,
+          dir_mtimes: Optional[Dict[str, int]] = None
+          ) -> Iterator[Tuple[str, List[os.DirEntry]]]:
+    """
+    Visita le cartelle non escluse (vedi walk_files).
+
+    Args:
+        dir_mtimes: Se indicato, riceve {cartella: mtime_ns} di ogni
+            cartella visitata (letto prima di elencarne il contenuto)
+
+    Yields:
+        (cartella, file della cartella con estensione ammessa)
+    """
+    suffixes = tuple(extensions)
+    patterns = [pat for pat in exclude_patterns if pat]
+    if not suffixes:
+        return
+
+    def _excluded(path_str: str) -> bool:
+        return any(pat in path_str for pat in patterns)
+
+    stack = [str(Path(root))]
+    while stack:
+        current = stack.pop()
+        try:
+            if dir_mtimes is not None:
+                dir_mtimes[current] = os.stat(current).st_mtime_ns
+            with os.scandir(current) as it:
+                entries = list(it)
+        except OSError:
+            continue
+        files = []
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    if recursive and not _excluded(entry.path + os.sep):
+                        stack.append(entry.path)
+                elif entry.name.endswith(suffixes) and not _excluded(entry.path):
+                    files.append(entry)
+            except OSError:
+                continue
+        yield current, files
+
+
 def scan_vault_files(folder_path: str, vault_info: dict) -> list:
     """
     Restituisce la lista dei Path da indicizzare,
     filtrata per estensione e pattern di esclusione.
     """
-    path = Path(folder_path)
-    files = []
-    for ext in vault_info['include_ext']:
-        for f in path.rglob(f'*{ext}'):
-            escluso = any(pat in str(f) for pat in vault_info['exclude_patterns'])
-            if not escluso:
-                files.append(f)
-    return sorted(files)
+    return walk_files(
+        folder_path,
+        vault_info['include_ext'],
+        vault_info['exclude_patterns'],
+    )
 
 
 def parse_canvas_file(filepath: Path) -> str:
@@ -73,3 +154,109 @@ def get_files_to_update(folder_path: str,
     """
     tutti = scan_vault_files(folder_path, vault_info)
     return [f for f in tutti if f.stat().st_mtime > last_index_time]
+
+
+# ============================================================================
+# RIEPILOGO VAULT IN CACHE - v1.16.0
+# ============================================================================
+
+def get_vault_summary(folder_path: str) -> Optional[dict]:
+    """
+    Riepilogo di una cartella/vault: tipo, numero di file indicizzabili e
+    dimensione totale.
+
+    Il risultato è in cache (in memoria + JSON in knowledge_base/) finché
+    nessuna delle cartelle scansionate cambia mtime: la verifica costa uno
+    stat per cartella, senza elencare i file. Le modifiche al contenuto di
+    un file esistente non invalidano la cache (total_bytes può essere
+    leggermente datato), aggiunte/rimozioni sì.
+
+    Returns:
+        {"type", "label", "icon", "file_count", "total_bytes"} oppure None
+        se la cartella non esiste
+    """
+    global _summary_cache
+
+    if not folder_path:
+        return None
+    try:
+        key = str(Path(folder_path).resolve())
+    except Exception:
+        return None
+    if not os.path.isdir(key):
+        return None
+
+    with _summary_lock:
+        if _summary_cache is None:
+            _summary_cache = _load_summary_cache()
+        entry = _summary_cache.get(key)
+        if entry and _dirs_unchanged(entry["dirs"]):
+            return dict(entry["summary"])
+
+    summary, dir_mtimes = _scan_vault_summary(key)
+
+    with _summary_lock:
+        _summary_cache[key] = {"dirs": dir_mtimes, "summary": summary}
+        _save_summary_cache(_summary_cache)
+    return dict(summary)
+
+
+def _scan_vault_summary(folder_path: str) -> Tuple[dict, Dict[str, int]]:
+    """Scansione completa: riepilogo + mtime delle cartelle visitate."""
+    vault_info = detect_vault_type(folder_path)
+    dir_mtimes: Dict[str, int] = {}
+    file_count = 0
+    total_bytes = 0
+    for _, entries in _walk(folder_path, vault_info['include_ext'],
+                            vault_info['exclude_patterns'], dir_mtimes=dir_mtimes):
+        for entry in entries:
+            file_count += 1
+            try:
+                total_bytes += entry.stat().st_size
+            except OSError:
+                pass
+    summary = {
+        "type": vault_info['type'],
+        "label": vault_info['label'],
+        "icon": vault_info['icon'],
+        "file_count": file_count,
+        "total_bytes": total_bytes,
+    }
+    return summary, dir_mtimes
+
+
+def _dirs_unchanged(dir_mtimes: Dict[str, int]) -> bool:
+    """True se tutte le cartelle hanno ancora l'mtime registrato."""
+    try:
+        return all(os.stat(d).st_mtime_ns == mtime for d, mtime in dir_mtimes.items())
+    except OSError:
+        return False
+
+
+def _load_summary_cache() -> Dict[str, dict]:
+    """Carica la cache dei riepiloghi; vuota se assente/corrotta."""
+    try:
+        with open(VAULT_SUMMARY_CACHE_FILE, "r", encoding="utf-8") as f:
+            raw = json.load(f)
+        if raw.get("version") != VAULT_SUMMARY_CACHE_VERSION:
+            return {}
+        return dict(raw.get("entries", {}))
+    except Exception:
+        return {}
+
+
+def _save_summary_cache(entries: Dict[str, dict]):
+    """Scrive la cache dei riepiloghi in modo atomico."""
+    path = Path(VAULT_SUMMARY_CACHE_FILE)
+    tmp = path.with_suffix(".json.tmp")
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(
+                {"version": VAULT_SUMMARY_CACHE_VERSION, "entries": entries},
+                f,
+                ensure_ascii=False,
+            )
+        os.replace(tmp, path)
+    except Exception as e:
+        print(f"⚠️ Errore salvataggio cache riepilogo vault: {e}")
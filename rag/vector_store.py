@@ -1,12 +1,30 @@
 # rag/vector_store.py
 # DeepAiUG v1.15.0 - Vector Store per RAG (embedding multilingua)
+# v1.16.0 - Fallback con indice NumPy quando ChromaDB non è disponibile,
+#           indice BM25 per la ricerca keyword
+# v1.16.0 - Parametri di costruzione dell'indice registrati nella collection
+# v1.16.0 - Nome della collection configurabile (un indice per sorgente)
+# v1.16.0 - Metadata snelli dei chunk (testo non più duplicato) + migrazione
+# v1.16.0 - Scritture idempotenti (upsert) e aggiornamenti per singolo chunk
+# v1.16.0 - Ricerca con RetrievalRequest (embedding della query condiviso)
+# v1.16.0 - Generazione dell'indice incrementata a ogni scrittura (cache risultati)
+# v1.16.0 - Collection ChromaDB creata alla prima scrittura, non all'apertura
 # ============================================================================
 
+import itertools
+import json
 import math
+import os
+import queue
+import threading
+from contextlib import closing
+from functools import wraps
 from pathlib import Path
-from typing import List, Dict, Any, Optional, Callable
+from typing import List, Dict, Any, Optional, Callable, Set, Union
 
 from .models import Chunk
+from .bm25 import BM25Index
+from .retrieval import RetrievalRequest, bump_index_generation
 from .embeddings import (
     get_embedding_function,
     get_embeddings_helper,
@@ -17,35 +35,170 @@ from config import KNOWLEDGE_BASE_DIR, DEFAULT_TOP_K_RESULTS
 CHROMA_BATCH_SIZE = 500
 COLLECTION_NAME = "wiki_knowledge_base"
 
+# v1.16.0 — Batch già calcolati in attesa di scrittura (pipeline encode/write).
+# 2 = il thread di encode lavora al batch N+1 mentre il N viene scritto,
+# con al massimo un batch extra in memoria.
+EMBED_QUEUE_DEPTH = 2
+
+_PIPELINE_DONE = object()
+
+# v1.16.0 — Parametri con cui è stato costruito l'indice (sorgente, chunking,
+# impronta del manifest): nei metadata della collection ChromaDB, in un JSON
+# accanto all'indice NumPy. Permettono di riusare un indice esistente.
+INDEX_INFO_KEYS = ("source_id", "chunk_size", "chunk_overlap", "manifest_fingerprint")
+
+# v1.16.0 — Stima dello spazio occupato da un chunk in ChromaDB (vettore,
+# testo, metadata, indice HNSW), per il budget su disco degli indici.
+CHROMA_BYTES_PER_CHUNK = 8 * 1024
+
+# v1.16.0 — Schema dei metadata dei chunk (vedi Chunk.to_metadata). Le
+# collection senza questo valore nei propri metadata (pre-v1.16.0) ripetevano
+# id e testo di ogni chunk: vengono migrate all'apertura.
+CHUNK_METADATA_SCHEMA = 2
+_LEGACY_METADATA_KEYS = ("text", "id")
+
+# File accessori di una collection, relativi a persist_path
+_SIDECAR_SUFFIXES = (".npy", ".json", "_bm25.json", "_manifest.json", "_index_info.json")
+
+
+# Store in memoria: chiave di cache univoca per istanza (id() può essere riusato)
+_memory_store_ids = itertools.count()
+
+
+def _collection_cache_key(persist_path: str, collection_name: str) -> str:
+    return f"{persist_path}::{collection_name}"
+
+
+def _invalidates_search_cache(method):
+    """Metodi che scrivono sulla collection: a fine chiamata (anche in
+    caso di errore, la scrittura può essere parziale) ne incrementano la
+    generazione, invalidando i risultati di ricerca in cache."""
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            bump_index_generation(self.cache_key)
+    return wrapper
+
 
 class SimpleVectorStore:
     """
     Vector store semplificato con ChromaDB e fallback in memoria.
     
     Usa ChromaDB se disponibile per persistenza e ricerca semantica,
-    altrimenti fallback a ricerca keyword-based in memoria.
+    altrimenti un indice denso NumPy (se il modello di embedding è
+    disponibile) o, come ultima risorsa, ricerca keyword (BM25) in memoria.
     
     Attributes:
         persist_path: Percorso per persistenza ChromaDB
         use_chromadb: Se True, usa ChromaDB
-        collection: Collezione ChromaDB
+        collection: Collezione ChromaDB (creata alla prima scrittura)
+        numpy_index: NumpyVectorIndex (fallback senza ChromaDB), o None
+        bm25: BM25Index per la ricerca keyword (sempre disponibile)
         chunks: Lista chunks (fallback in memoria)
     """
     
-    def __init__(self, persist_path: str = None):
+    def __init__(self, persist_path: str = None, collection_name: str = COLLECTION_NAME):
         """
         Inizializza il vector store.
         
         Args:
             persist_path: Percorso per persistenza (default: knowledge_base/vectorstore)
+            collection_name: Nome della collection (un indice per sorgente)
         """
-        self.persist_path = persist_path or str(KNOWLEDGE_BASE_DIR / "vectorstore")
+        self.persist_path = persist_path or self.default_persist_path()
+        self.collection_name = collection_name
+        self._memory_key = f"memory::{next(_memory_store_ids)}"
         self.chunks: List[Chunk] = []
-        self.embeddings: List[List[float]] = []
+        self._chunks_by_id: Dict[str, Chunk] = {}
+        self.numpy_index = None
+        self._index_info: Dict[str, Any] = {}
         self.use_chromadb = False
-        self.collection = None
+        self._collection = None
         self.client = None
         self._init_store()
+
+        # Indice BM25 persistito solo se lo è anche lo store (ChromaDB o
+        # NumPy): con lo store in memoria i chunk non sopravvivono al riavvio.
+        persistent = self.use_chromadb or self.numpy_index is not None
+        self.bm25 = BM25Index(self.bm25_path if persistent else None)
+    
+    @staticmethod
+    def default_persist_path() -> str:
+        """Percorso di persistenza predefinito (knowledge_base/vectorstore)."""
+        return str(KNOWLEDGE_BASE_DIR / "vectorstore")
+    
+    @staticmethod
+    def delete_persisted(persist_path: str, collection_name: str):
+        """
+        Elimina dal disco una collection e i suoi file accessori
+        (NumPy, BM25, manifest, parametri dell'indice).
+        
+        Args:
+            persist_path: Percorso di persistenza
+            collection_name: Nome della collection
+        """
+        try:
+            import chromadb
+
+            client = chromadb.PersistentClient(path=persist_path)
+            client.delete_collection(collection_name)
+        except Exception:
+            # ChromaDB assente o collection inesistente
+            pass
+
+        for suffix in _SIDECAR_SUFFIXES:
+            try:
+                (Path(persist_path) / f"{collection_name}{suffix}").unlink()
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                print(f"⚠️ Impossibile rimuovere {collection_name}{suffix}: {e}")
+        bump_index_generation(_collection_cache_key(persist_path, collection_name))
+    
+    @property
+    def cache_key(self) -> str:
+        """Identificativo della collection per la cache dei risultati di ricerca."""
+        if self.use_chromadb or self.numpy_index is not None:
+            return _collection_cache_key(self.persist_path, self.collection_name)
+        return self._memory_key  # store in memoria: contenuto per istanza
+    
+    @property
+    def manifest_path(self) -> Path:
+        """File del manifest per l'indicizzazione incrementale della collection."""
+        return Path(self.persist_path) / f"{self.collection_name}_manifest.json"
+    
+    @property
+    def index_info_path(self) -> Path:
+        """File dei parametri di costruzione dell'indice NumPy."""
+        return Path(self.persist_path) / f"{self.collection_name}_index_info.json"
+    
+    @property
+    def collection(self):
+        """
+        Collection ChromaDB, None finché non esiste. La creazione avviene
+        alla prima scrittura (_ensure_collection): selezionare una sorgente
+        mai indicizzata non lascia collection vuote. Finché manca viene
+        cercata a ogni accesso, perché un altro store può averla creata.
+        """
+        if self._collection is None and self.use_chromadb and self.client is not None:
+            self._collection = self._get_existing_collection()
+        return self._collection
+    
+    @collection.setter
+    def collection(self, value):
+        self._collection = value
+    
+    @property
+    def has_dense_index(self) -> bool:
+        """True se search() fa ricerca semantica (ChromaDB o indice NumPy)."""
+        return bool(self.use_chromadb and self.collection) or self.numpy_index is not None
+    
+    @property
+    def bm25_path(self) -> Path:
+        """File dell'indice BM25 della collection."""
+        return Path(self.persist_path) / f"{self.collection_name}_bm25.json"
     
     def _init_store(self):
         """
@@ -63,7 +216,6 @@ class SimpleVectorStore:
 
             self.client = chromadb.PersistentClient(path=self.persist_path)
 
-            embedding_fn = get_embedding_function()  # None se st non installato
             active_tag = get_active_model_tag()
 
             # Migrazione: se la collection esistente è stata costruita con un
@@ -72,127 +224,497 @@ class SimpleVectorStore:
             # i vettori sarebbero in spazi vettoriali diversi e il retrieval
             # restituirebbe risultati casuali.
             try:
-                existing = self.client.get_collection(name=COLLECTION_NAME)
+                existing = self.client.get_collection(name=self.collection_name)
                 stored_tag = (existing.metadata or {}).get("embedding_model")
                 if stored_tag != active_tag:
                     legacy_label = stored_tag or "<legacy/sconosciuto>"
                     print(
                         f"⚠️ Embedding model cambiato ({legacy_label} → {active_tag}). "
-                        f"Reset collection '{COLLECTION_NAME}' — re-indicizzazione richiesta."
+                        f"Reset collection '{self.collection_name}' — re-indicizzazione richiesta."
                     )
-                    self.client.delete_collection(COLLECTION_NAME)
+                    self.client.delete_collection(self.collection_name)
             except Exception:
-                # Collection non esistente: ok, verrà creata sotto
+                # Collection non esistente: ok, verrà creata alla prima scrittura
                 pass
 
-            collection_kwargs = {
-                "name": COLLECTION_NAME,
-                "metadata": {
-                    "description": "Knowledge Base for Wiki RAG",
-                    "embedding_model": active_tag,
-                },
-            }
-            if embedding_fn is not None:
-                collection_kwargs["embedding_function"] = embedding_fn
-
-            self.collection = self.client.get_or_create_collection(**collection_kwargs)
             self.use_chromadb = True
+            if self.collection is not None:
+                self._migrate_chroma_metadata()
 
         except ImportError:
             print("⚠️ ChromaDB non installato. Usando store in memoria. "
                   "Installa con: pip install chromadb")
             self.use_chromadb = False
+            self._init_numpy_index()
 
         except Exception as e:
             print(f"⚠️ Errore inizializzazione ChromaDB: {e}. "
                   "Usando store in memoria.")
             self.use_chromadb = False
+            self._init_numpy_index()
+    
+    def _get_existing_collection(self):
+        """Collection ChromaDB già presente su disco (None se non esiste)."""
+        kwargs = {"name": self.collection_name}
+        embedding_fn = get_embedding_function()
+        if embedding_fn is not None:
+            kwargs["embedding_function"] = embedding_fn
+        try:
+            return self.client.get_collection(**kwargs)
+        except Exception:
+            return None
+    
+    def _ensure_collection(self):
+        """Collection ChromaDB per una scrittura: la crea se non esiste ancora."""
+        if self.collection is None:
+            self.collection = self.client.get_or_create_collection(
+                **self._collection_kwargs(get_embedding_function(), get_active_model_tag())
+            )
+        return self.collection
+    
+    def _collection_kwargs(self, embedding_fn, active_tag: str) -> Dict[str, Any]:
+        """Argomenti per get_or_create_collection (nome, metadata, embedding)."""
+        collection_kwargs = {
+            "name": self.collection_name,
+            "metadata": {
+                "description": "Knowledge Base for Wiki RAG",
+                "embedding_model": active_tag,
+                "metadata_schema": CHUNK_METADATA_SCHEMA,
+            },
+        }
+        if embedding_fn is not None:
+            collection_kwargs["embedding_function"] = embedding_fn
+        return collection_kwargs
+    
+    def _migrate_chroma_metadata(self):
+        """
+        Toglie id e testo duplicati dai metadata dei chunk di una collection
+        pre-v1.16.0 (update con None rimuove la chiave; embedding e
+        documenti restano invariati, niente re-indicizzazione).
+        """
+        meta = self.collection.metadata or {}
+        if meta.get("metadata_schema") == CHUNK_METADATA_SCHEMA:
+            return
+        try:
+            total = self.collection.count()
+            if total:
+                print(f"ℹ️ Migrazione metadata di {total} chunk (testo non più duplicato)...")
+            for offset in range(0, total, CHROMA_BATCH_SIZE):
+                got = self.collection.get(
+                    include=["metadatas"], limit=CHROMA_BATCH_SIZE, offset=offset
+                )
+                ids, updates = [], []
+                for chunk_id, chunk_meta in zip(got["ids"], got["metadatas"]):
+                    legacy = [k for k in _LEGACY_METADATA_KEYS if k in (chunk_meta or {})]
+                    if legacy:
+                        ids.append(chunk_id)
+                        updates.append(dict.fromkeys(legacy))
+                if ids:
+                    self.collection.update(ids=ids, metadatas=updates)
+            self.collection.modify(metadata={**meta, "metadata_schema": CHUNK_METADATA_SCHEMA})
+        except Exception as e:
+            print(f"⚠️ Errore migrazione metadata collection: {e}")
+    
+    def _init_numpy_index(self):
+        """
+        Fallback senza ChromaDB: indice vettoriale NumPy persistito in
+        persist_path, se il modello di embedding è disponibile. Altrimenti
+        resta la ricerca keyword in memoria.
+        """
+        helper = get_embeddings_helper()
+        if helper is None:
+            return
+        try:
+            from .numpy_store import NumpyVectorIndex
+
+            self.numpy_index = NumpyVectorIndex(
+                Path(self.persist_path) / self.collection_name,
+                get_active_model_tag(),
+            )
+            self._migrate_numpy_metadata()
+            print(f"ℹ️ Ricerca semantica con indice NumPy ({len(self.numpy_index)} chunk).")
+        except ImportError:
+            print("⚠️ NumPy non installato. Ricerca keyword in memoria.")
+        except Exception as e:
+            print(f"⚠️ Errore inizializzazione indice NumPy: {e}. "
+                  "Ricerca keyword in memoria.")
+    
+    def _migrate_numpy_metadata(self):
+        """Come _migrate_chroma_metadata, per l'indice NumPy persistito."""
+        index = self.numpy_index
+        if not any(k in meta for meta in index.metadatas for k in _LEGACY_METADATA_KEYS):
+            return
+        index.metadatas = [
+            {k: v for k, v in meta.items() if k not in _LEGACY_METADATA_KEYS}
+            for meta in index.metadatas
+        ]
+        index.save()
     
+    @_invalidates_search_cache
     def add_chunks(
         self,
         chunks: List[Chunk],
         embeddings: List[List[float]] = None,
         progress_callback: Callable = None
-    ):
+    ) -> bool:
         """
         Aggiunge chunks al vector store con batching e progress callback.
 
+        v1.16.0 — scrittura in upsert: un chunk con ID già presente viene
+        sostituito (niente errori per ID duplicati, ri-esecuzioni idempotenti).
+
         Args:
             chunks: Lista di Chunk da aggiungere
             embeddings: Embeddings pre-calcolati (opzionale)
             progress_callback: Callback(status: str, progress: float) per aggiornamenti
+
+        Returns:
+            True se tutti i chunk sono stati scritti
         """
         if not chunks:
-            return
+            return True
 
-        if self.use_chromadb and self.collection:
+        # ID ripetuti nello stesso blocco: vince l'ultimo (come per upsert)
+        last = {chunk.id: i for i, chunk in enumerate(chunks)}
+        if len(last) < len(chunks):
+            keep = sorted(last.values())
+            chunks = [chunks[i] for i in keep]
+            if embeddings is not None:
+                embeddings = [embeddings[i] for i in keep]
+
+        if self.use_chromadb:
             try:
+                self._ensure_collection()
                 total = len(chunks)
                 n_batches = math.ceil(total / CHROMA_BATCH_SIZE)
-                helper = get_embeddings_helper()  # None se st non disponibile
+                batches = self._iter_embedded_batches(chunks, embeddings)
 
-                for b in range(n_batches):
-                    start = b * CHROMA_BATCH_SIZE
-                    end = min(start + CHROMA_BATCH_SIZE, total)
-                    batch = chunks[start:end]
+                with closing(batches):
+                    for b, (end, batch, documents, batch_emb) in enumerate(batches):
+                        ids = [chunk.id for chunk in batch]
+                        add_kwargs = {
+                            "ids": ids,
+                            "documents": documents,
+                            "metadatas": [chunk.to_metadata() for chunk in batch],
+                        }
+                        if batch_emb is not None:
+                            add_kwargs["embeddings"] = batch_emb
+
+                        self.collection.upsert(**add_kwargs)
+                        self.bm25.add(ids, documents, [chunk.document.path for chunk in batch])
+
+                        if progress_callback:
+                            progress_callback(
+                                f"ChromaDB: batch {b + 1}/{n_batches} ({end}/{total} chunks)",
+                                end / total
+                            )
+
+            except Exception as e:
+                print(f"❌ Errore aggiunta a ChromaDB: {e}")
+                return False
+            finally:
+                self._save_bm25()
+        elif self.numpy_index is not None:
+            return self._add_chunks_numpy(chunks, embeddings, progress_callback)
+        else:
+            # Fallback: store in memoria
+            new_ids = {chunk.id for chunk in chunks}
+            if not new_ids.isdisjoint(self._chunks_by_id):
+                self.chunks = [c for c in self.chunks if c.id not in new_ids]
+            self.chunks.extend(chunks)
+            self._chunks_by_id.update((chunk.id, chunk) for chunk in chunks)
+            self.bm25.add(
+                [chunk.id for chunk in chunks],
+                [chunk.text for chunk in chunks],
+                [chunk.document.path for chunk in chunks],
+            )
+        return True
+    
+    def _add_chunks_numpy(
+        self,
+        chunks: List[Chunk],
+        embeddings: Optional[List[List[float]]],
+        progress_callback: Optional[Callable],
+    ) -> bool:
+        """Aggiunge chunks all'indice NumPy (fallback senza ChromaDB)."""
+        try:
+            total = len(chunks)
+            n_batches = math.ceil(total / CHROMA_BATCH_SIZE)
+            batches = self._iter_embedded_batches(chunks, embeddings)
 
+            with closing(batches):
+                for b, (end, batch, documents, batch_emb) in enumerate(batches):
                     ids = [chunk.id for chunk in batch]
-                    documents = [chunk.text for chunk in batch]
-                    metadatas = [chunk.to_dict() for chunk in batch]
-
-                    # Determina gli embedding del batch:
-                    # 1. Espliciti (passati dal chiamante) → usa quelli
-                    # 2. Helper multilingua disponibile → pre-computa con prefix "passage:"
-                    # 3. Altrimenti → ChromaDB userà la sua embedding_function
-                    #    di default (no prefix, qualità inferiore su IT)
-                    if embeddings:
-                        batch_emb = embeddings[start:end]
-                    elif helper is not None:
-                        batch_emb = helper.encode_passages(documents)
-                    else:
-                        batch_emb = None
-
-                    add_kwargs = {
-                        "ids": ids,
-                        "documents": documents,
-                        "metadatas": metadatas,
-                    }
-                    if batch_emb is not None:
-                        add_kwargs["embeddings"] = batch_emb
-
-                    self.collection.add(**add_kwargs)
+                    self.numpy_index.add(
+                        ids,
+                        batch_emb,
+                        documents,
+                        [chunk.to_metadata() for chunk in batch],
+                    )
+                    self.bm25.add(ids, documents, [chunk.document.path for chunk in batch])
 
                     if progress_callback:
                         progress_callback(
-                            f"ChromaDB: batch {b + 1}/{n_batches} ({end}/{total} chunks)",
+                            f"Indice NumPy: batch {b + 1}/{n_batches} ({end}/{total} chunks)",
                             end / total
                         )
 
+            self.numpy_index.save()
+            return True
+        except Exception as e:
+            print(f"❌ Errore aggiunta a indice NumPy: {e}")
+            return False
+        finally:
+            self._save_bm25()
+    
+    def _iter_embedded_batches(
+        self,
+        chunks: List[Chunk],
+        embeddings: Optional[List[List[float]]] = None,
+    ):
+        """
+        Genera i batch da scrivere: (end, batch, documents, batch_emb).
+
+        Gli embedding di ogni batch sono:
+        1. Espliciti (passati dal chiamante) → usa quelli
+        2. Helper multilingua disponibile → pre-computa con prefix "passage:"
+        3. Altrimenti None → ChromaDB userà la sua embedding_function
+           di default (no prefix, qualità inferiore su IT)
+
+        v1.16.0 — nel caso 2 l'encode gira in un thread produttore: il batch
+        N+1 viene calcolato mentre il chiamante scrive il batch N (CPU e disco
+        lavorano in parallelo). La coda limitata (EMBED_QUEUE_DEPTH) tiene
+        bassa la memoria; l'ordine dei batch è preservato e gli errori di
+        encode vengono rilanciati nel thread chiamante.
+        """
+        total = len(chunks)
+        helper = None if embeddings else get_embeddings_helper()
+        starts = range(0, total, CHROMA_BATCH_SIZE)
+
+        def _prepare(start):
+            end = min(start + CHROMA_BATCH_SIZE, total)
+            batch = chunks[start:end]
+            documents = [chunk.text for chunk in batch]
+            if embeddings:
+                batch_emb = embeddings[start:end]
+            elif helper is not None:
+                batch_emb = helper.encode_passages(documents)
+            else:
+                batch_emb = None
+            return end, batch, documents, batch_emb
+
+        # Niente da calcolare in parallelo: generazione sequenziale
+        if helper is None or len(starts) < 2:
+            for start in starts:
+                yield _prepare(start)
+            return
+
+        ready: queue.Queue = queue.Queue(maxsize=EMBED_QUEUE_DEPTH)
+        stop = threading.Event()
+
+        def _put(item) -> bool:
+            while not stop.is_set():
+                try:
+                    ready.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def _producer():
+            try:
+                for start in starts:
+                    if not _put(_prepare(start)):
+                        return
             except Exception as e:
-                print(f"❌ Errore aggiunta a ChromaDB: {e}")
+                _put(e)
+                return
+            _put(_PIPELINE_DONE)
+
+        producer = threading.Thread(target=_producer, name="kb-embed", daemon=True)
+        producer.start()
+        try:
+            while True:
+                item = ready.get()
+                if item is _PIPELINE_DONE:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            # Scrittura interrotta (errore/close): ferma il produttore
+            stop.set()
+            producer.join()
+    
+    @_invalidates_search_cache
+    def delete_sources(self, sources: List[str]) -> bool:
+        """
+        Rimuove tutti i chunk appartenenti ai documenti indicati.
+
+        Usato dall'indicizzazione incrementale per i documenti modificati
+        (prima della re-indicizzazione) e per quelli rimossi dalla sorgente.
+
+        Args:
+            sources: Lista di path documento (campo "source" dei metadata)
+
+        Returns:
+            True se la rimozione è andata a buon fine
+        """
+        if not sources:
+            return True
+
+        if self.use_chromadb and self.collection:
+            try:
+                for b in range(0, len(sources), CHROMA_BATCH_SIZE):
+                    batch = sources[b:b + CHROMA_BATCH_SIZE]
+                    self.collection.delete(where={"source": {"$in": batch}})
+            except Exception as e:
+                print(f"❌ Errore rimozione chunk da ChromaDB: {e}")
+                return False
+        elif self.numpy_index is not None:
+            try:
+                if self.numpy_index.delete_sources(sources):
+                    self.numpy_index.save()
+            except Exception as e:
+                print(f"❌ Errore rimozione chunk da indice NumPy: {e}")
+                return False
         else:
-            # Fallback: store in memoria
-            self.chunks.extend(chunks)
+            to_remove = set(sources)
+            self.chunks = [c for c in self.chunks if c.document.path not in to_remove]
+            self._chunks_by_id = {c.id: c for c in self.chunks}
+
+        if self.bm25.delete_sources(sources):
+            self._save_bm25()
+        return True
+    
+    def get_ids_by_source(self, sources: List[str]) -> Optional[Dict[str, Set[str]]]:
+        """
+        ID dei chunk indicizzati per ciascuno dei documenti indicati.
+
+        Args:
+            sources: Lista di path documento
+
+        Returns:
+            {source: set di ID} (documenti senza chunk assenti), None in caso di errore
+        """
+        found: Dict[str, Set[str]] = {}
+        if self.use_chromadb and self.collection:
+            try:
+                for b in range(0, len(sources), CHROMA_BATCH_SIZE):
+                    got = self.collection.get(
+                        where={"source": {"$in": sources[b:b + CHROMA_BATCH_SIZE]}},
+                        include=["metadatas"],
+                    )
+                    for chunk_id, meta in zip(got["ids"], got["metadatas"]):
+                        found.setdefault((meta or {}).get("source"), set()).add(chunk_id)
+            except Exception as e:
+                print(f"❌ Errore lettura chunk da ChromaDB: {e}")
+                return None
+            return found
+
+        wanted = set(sources)
+        if self.numpy_index is not None:
+            pairs = zip(self.numpy_index.ids, (m.get("source") for m in self.numpy_index.metadatas))
+        else:
+            pairs = ((c.id, c.document.path) for c in self.chunks)
+        for chunk_id, source in pairs:
+            if source in wanted:
+                found.setdefault(source, set()).add(chunk_id)
+        return found
+    
+    @_invalidates_search_cache
+    def delete_ids(self, ids: List[str]) -> bool:
+        """
+        Rimuove i chunk con gli ID indicati.
+
+        Returns:
+            True se la rimozione è andata a buon fine
+        """
+        if not ids:
+            return True
+
+        if self.use_chromadb and self.collection:
+            try:
+                for b in range(0, len(ids), CHROMA_BATCH_SIZE):
+                    self.collection.delete(ids=ids[b:b + CHROMA_BATCH_SIZE])
+            except Exception as e:
+                print(f"❌ Errore rimozione chunk da ChromaDB: {e}")
+                return False
+        elif self.numpy_index is not None:
+            try:
+                if self.numpy_index.delete_ids(ids):
+                    self.numpy_index.save()
+            except Exception as e:
+                print(f"❌ Errore rimozione chunk da indice NumPy: {e}")
+                return False
+        else:
+            to_remove = set(ids)
+            self.chunks = [c for c in self.chunks if c.id not in to_remove]
+            self._chunks_by_id = {c.id: c for c in self.chunks}
+
+        if self.bm25.delete_ids(ids):
+            self._save_bm25()
+        return True
+    
+    @_invalidates_search_cache
+    def update_metadata(self, chunks: List[Chunk]) -> bool:
+        """
+        Aggiorna solo i metadata (offset, hash documento) di chunk già
+        indicizzati, senza ricalcolare gli embedding.
+
+        Returns:
+            True se l'aggiornamento è andato a buon fine
+        """
+        if not chunks:
+            return True
+
+        if self.use_chromadb and self.collection:
+            try:
+                for b in range(0, len(chunks), CHROMA_BATCH_SIZE):
+                    batch = chunks[b:b + CHROMA_BATCH_SIZE]
+                    self.collection.update(
+                        ids=[chunk.id for chunk in batch],
+                        metadatas=[chunk.to_metadata() for chunk in batch],
+                    )
+            except Exception as e:
+                print(f"❌ Errore aggiornamento metadata ChromaDB: {e}")
+                return False
+        elif self.numpy_index is not None:
+            try:
+                self.numpy_index.update_metadatas(
+                    [chunk.id for chunk in chunks], [chunk.to_metadata() for chunk in chunks]
+                )
+                self.numpy_index.save()
+            except Exception as e:
+                print(f"❌ Errore aggiornamento metadata indice NumPy: {e}")
+                return False
+        else:
+            updated = {chunk.id: chunk for chunk in chunks}
+            self.chunks = [updated.get(c.id, c) for c in self.chunks]
+            self._chunks_by_id.update(updated)
+        return True
     
     def search(
         self, 
-        query: str, 
+        query: Union[str, RetrievalRequest], 
         top_k: int = DEFAULT_TOP_K_RESULTS
     ) -> List[Dict[str, Any]]:
         """
         Cerca chunks simili alla query.
         
         Args:
-            query: Testo della query
+            query: Testo della query, o RetrievalRequest per riusare
+                l'embedding già calcolato per altre collection
             top_k: Numero massimo di risultati
             
         Returns:
             Lista di risultati con text, metadata, distance
         """
+        request = RetrievalRequest.of(query)
         if self.use_chromadb and self.collection:
             try:
                 results = self.collection.query(
-                    query_texts=[query],
+                    **request.chroma_query_kwargs(),
                     n_results=top_k,
                     include=["documents", "metadatas", "distances"]
                 )
@@ -201,6 +723,7 @@ class SimpleVectorStore:
                 if results and results["documents"] and results["documents"][0]:
                     for i, doc in enumerate(results["documents"][0]):
                         search_results.append({
+                            "id": results["ids"][0][i],
                             "text": doc,
                             "metadata": results["metadatas"][0][i] if results["metadatas"] else {},
                             "distance": results["distances"][0][i] if results["distances"] else 0,
@@ -210,49 +733,115 @@ class SimpleVectorStore:
             except Exception as e:
                 print(f"❌ Errore ricerca ChromaDB: {e}")
                 return []
+        elif self.numpy_index is not None:
+            try:
+                return self.numpy_index.search(request.query_embedding, top_k)
+            except Exception as e:
+                print(f"❌ Errore ricerca indice NumPy: {e}")
+                return []
         else:
-            # Fallback: ricerca semplice basata su keyword
-            return self._simple_search(query, top_k)
+            # Fallback: ricerca keyword (BM25)
+            return self.keyword_search(request, top_k)
     
-    def _simple_search(
-        self, 
-        query: str, 
-        top_k: int
+    def keyword_search(
+        self,
+        query: Union[str, RetrievalRequest],
+        top_k: int = DEFAULT_TOP_K_RESULTS
     ) -> List[Dict[str, Any]]:
         """
-        Ricerca semplice senza embeddings (fallback).
-        
-        Usa matching keyword-based: conta le occorrenze dei termini
-        della query in ogni chunk.
-        
+        Ricerca keyword con indice invertito BM25.
+
+        Disponibile con qualsiasi backend (anche senza modello di embedding):
+        il costo è proporzionale alle posting list dei termini della query.
+
         Args:
             query: Testo della query
             top_k: Numero massimo di risultati
-            
+
         Returns:
-            Lista di risultati ordinati per rilevanza
+            Lista di risultati ordinati per rilevanza (text, metadata, distance)
         """
-        query_terms = query.lower().split()
-        scored_chunks = []
-        
-        for chunk in self.chunks:
-            # Conta occorrenze dei termini
-            score = sum(1 for term in query_terms if term in chunk.text.lower())
-            if score > 0:
-                scored_chunks.append((chunk, score))
-        
-        # Ordina per score decrescente
-        scored_chunks.sort(key=lambda x: x[1], reverse=True)
-        
+        self._ensure_bm25()
+        hits = self.bm25.search(RetrievalRequest.of(query).query, top_k)
+        if not hits:
+            return []
+
+        records = self._get_by_ids([chunk_id for chunk_id, _ in hits])
         return [
             {
-                "text": chunk.text,
-                "metadata": chunk.to_dict(),
-                "distance": 1.0 / (score + 1)  # Converti score in "distanza"
+                "id": chunk_id,
+                "text": records[chunk_id][0],
+                "metadata": records[chunk_id][1],
+                "distance": 1.0 / (score + 1),  # Converti score in "distanza"
             }
-            for chunk, score in scored_chunks[:top_k]
+            for chunk_id, score in hits
+            if chunk_id in records
         ]
     
+    def _get_by_ids(self, ids: List[str]) -> Dict[str, tuple]:
+        """Ritorna {id: (text, metadata)} per i chunk indicati, dal backend attivo."""
+        if self.use_chromadb and self.collection:
+            try:
+                got = self.collection.get(ids=ids, include=["documents", "metadatas"])
+                return {
+                    chunk_id: (doc, meta or {})
+                    for chunk_id, doc, meta in zip(got["ids"], got["documents"], got["metadatas"])
+                }
+            except Exception as e:
+                print(f"❌ Errore lettura chunk da ChromaDB: {e}")
+                return {}
+        if self.numpy_index is not None:
+            return self.numpy_index.get_records(ids)
+        return {
+            chunk_id: (self._chunks_by_id[chunk_id].text, self._chunks_by_id[chunk_id].to_metadata())
+            for chunk_id in ids
+            if chunk_id in self._chunks_by_id
+        }
+    
+    def _ensure_bm25(self):
+        """
+        Ricostruisce l'indice BM25 dallo store persistito se manca
+        (es. collection creata prima della v1.16.0 o file rimosso).
+        """
+        if len(self.bm25):
+            return
+
+        if self.use_chromadb and self.collection:
+            try:
+                total = self.collection.count()
+                for offset in range(0, total, CHROMA_BATCH_SIZE):
+                    got = self.collection.get(
+                        include=["documents", "metadatas"],
+                        limit=CHROMA_BATCH_SIZE,
+                        offset=offset,
+                    )
+                    self.bm25.add(
+                        got["ids"],
+                        got["documents"],
+                        [(meta or {}).get("source") for meta in got["metadatas"]],
+                    )
+            except Exception as e:
+                print(f"⚠️ Errore ricostruzione indice BM25: {e}")
+                return
+        elif self.numpy_index is not None and len(self.numpy_index):
+            self.bm25.add(
+                self.numpy_index.ids,
+                self.numpy_index.texts,
+                [meta.get("source") for meta in self.numpy_index.metadatas],
+            )
+        else:
+            return
+
+        if len(self.bm25):
+            print(f"ℹ️ Indice BM25 ricostruito ({len(self.bm25)} chunk).")
+            self._save_bm25()
+    
+    def _save_bm25(self):
+        try:
+            self.bm25.save()
+        except Exception as e:
+            print(f"⚠️ Errore salvataggio indice BM25: {e}")
+    
     def get_stats(self) -> Dict[str, Any]:
         """
         Ritorna statistiche del vector store.
@@ -272,6 +861,22 @@ class SimpleVectorStore:
                 }
             except:
                 pass
+        elif self.use_chromadb:
+            # Collection non ancora creata: indice vuoto
+            return {
+                "chunk_count": 0,
+                "using_chromadb": True,
+                "persist_path": self.persist_path,
+                "embedding_model": None,
+            }
+
+        if self.numpy_index is not None:
+            return {
+                "chunk_count": len(self.numpy_index),
+                "using_chromadb": False,
+                "persist_path": self.persist_path,
+                "embedding_model": self.numpy_index.model_tag,
+            }
 
         return {
             "chunk_count": len(self.chunks),
@@ -280,31 +885,97 @@ class SimpleVectorStore:
             "embedding_model": None,
         }
     
+    @_invalidates_search_cache
     def clear(self):
-        """Svuota il vector store, preservando embedding_function e metadata."""
+        """
+        Svuota il vector store. La collection ChromaDB viene eliminata e
+        ricreata (con embedding_function e metadata) alla prima scrittura.
+        """
         if self.use_chromadb and self.collection:
             try:
-                self.client.delete_collection(COLLECTION_NAME)
-
-                embedding_fn = get_embedding_function()
-                active_tag = get_active_model_tag()
-
-                collection_kwargs = {
-                    "name": COLLECTION_NAME,
-                    "metadata": {
-                        "description": "Knowledge Base for Wiki RAG",
-                        "embedding_model": active_tag,
-                    },
-                }
-                if embedding_fn is not None:
-                    collection_kwargs["embedding_function"] = embedding_fn
-
-                self.collection = self.client.get_or_create_collection(**collection_kwargs)
+                self.client.delete_collection(self.collection_name)
+                self.collection = None
             except Exception as e:
                 print(f"❌ Errore clear ChromaDB: {e}")
 
+        if self.numpy_index is not None:
+            self.numpy_index.clear()
+            try:
+                self.index_info_path.unlink()
+            except FileNotFoundError:
+                pass
+
+        self._index_info = {}
+        self.bm25.clear()
         self.chunks = []
-        self.embeddings = []
+        self._chunks_by_id = {}
+    
+    def get_index_info(self) -> Dict[str, Any]:
+        """
+        Parametri con cui è stato costruito l'indice (vedi INDEX_INFO_KEYS).
+        
+        Returns:
+            Dizionario con le sole chiavi registrate (vuoto per indici
+            costruiti prima della v1.16.0)
+        """
+        if self.use_chromadb and self.collection:
+            try:
+                meta = self.collection.metadata or {}
+                return {k: meta[k] for k in INDEX_INFO_KEYS if k in meta}
+            except Exception:
+                return {}
+        if self.numpy_index is not None:
+            try:
+                with open(self.index_info_path, "r", encoding="utf-8") as f:
+                    return json.load(f)
+            except Exception:
+                return {}
+        return dict(self._index_info)
+    
+    def set_index_info(self, info: Dict[str, Any]):
+        """
+        Registra i parametri di costruzione dell'indice.
+        
+        Args:
+            info: Valori per le chiavi di INDEX_INFO_KEYS
+        """
+        info = {k: info[k] for k in INDEX_INFO_KEYS if info.get(k) is not None}
+        if self.use_chromadb:
+            try:
+                collection = self._ensure_collection()
+                # modify sostituisce i metadata: conserva embedding_model & co.
+                collection.modify(metadata={**(collection.metadata or {}), **info})
+            except Exception as e:
+                print(f"⚠️ Errore aggiornamento metadata collection: {e}")
+        elif self.numpy_index is not None:
+            tmp = self.index_info_path.with_name(self.index_info_path.name + ".tmp")
+            try:
+                with open(tmp, "w", encoding="utf-8") as f:
+                    json.dump(info, f, ensure_ascii=False)
+                os.replace(tmp, self.index_info_path)
+            except Exception as e:
+                print(f"⚠️ Errore salvataggio parametri indice: {e}")
+        else:
+            self._index_info = info
+    
+    def disk_usage_bytes(self) -> int:
+        """
+        Spazio stimato su disco dell'indice: file accessori più, per
+        ChromaDB, chunk × CHROMA_BYTES_PER_CHUNK (la collection condivide
+        il database SQLite con le altre e non ha un file proprio).
+        """
+        total = 0
+        for suffix in _SIDECAR_SUFFIXES:
+            try:
+                total += (Path(self.persist_path) / f"{self.collection_name}{suffix}").stat().st_size
+            except OSError:
+                pass
+        if self.use_chromadb and self.collection:
+            try:
+                total += self.collection.count() * CHROMA_BYTES_PER_CHUNK
+            except Exception:
+                pass
+        return total
     
     def is_empty(self) -> bool:
         """Verifica se il vector store è vuoto."""
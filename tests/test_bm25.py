@@ -0,0 +1,144 @@
+# tests/test_bm25.py
+# DeepAiUG v1.16.0 — Test per l'indice invertito BM25
+# ============================================================================
+
+import sys
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from rag.bm25 import BM25Index, tokenize
+
+
+# ---------------------------------------------------------------------------
+# Test: BM25Index
+# ---------------------------------------------------------------------------
+
+class TestBM25Index:
+    def test_tokenize_drops_stopwords(self):
+        assert tokenize("Il codice ABC-123 della stampante") == ["codice", "abc", "123", "stampante"]
+
+    def test_rare_term_ranks_first(self):
+        index = BM25Index()
+        index.add(
+            ["a", "b", "c"],
+            ["stampante ufficio rete", "stampante toner XR450", "rete ufficio backup"],
+            ["1.md", "2.md", "3.md"],
+        )
+        hits = index.search("toner stampante", top_k=3)
+        assert [chunk_id for chunk_id, _ in hits][:2] == ["b", "a"]
+        assert index.search("inesistente", top_k=3) == []
+
+    def test_delete_sources_and_compaction(self):
+        index = BM25Index()
+        index.add([f"id{i}" for i in range(10)], ["parola comune"] * 10,
+                  [f"doc{i % 2}.md" for i in range(10)])
+        assert index.delete_sources(["doc0.md"]) == 5
+        assert len(index) == 5
+        assert len(index.doc_ids) == 5  # compattato (oltre il 25% rimosso)
+        assert {chunk_id for chunk_id, _ in index.search("comune", 10)} == {
+            f"id{i}" for i in range(1, 10, 2)
+        }
+
+    def test_replace_same_id(self):
+        index = BM25Index()
+        index.add(["a"], ["vecchio testo"], ["1.md"])
+        index.add(["a"], ["nuovo testo"], ["1.md"])
+        assert len(index) == 1
+        assert index.search("vecchio", 5) == []
+        assert index.search("nuovo", 5)[0][0] == "a"
+
+    def test_persistence_roundtrip(self, tmp_path):
+        index = BM25Index(tmp_path / "bm25.json")
+        index.add(["a", "b"], ["gatto nero", "cane bianco"], ["1.md", "2.md"])
+        index.delete_ids(["b"])
+        index.save()
+
+        reloaded = BM25Index(tmp_path / "bm25.json")
+        assert len(reloaded) == 1
+        assert reloaded.search("gatto", 5) == index.search("gatto", 5)
+        assert reloaded.search("cane", 5) == []
+
+    def test_pruning_matches_exhaustive_scoring(self):
+        import math
+        import random
+
+        from rag.bm25 import BM25_B, BM25_K1
+
+        rng = random.Random(1)
+        vocab = [f"t{i}" for i in range(40)]
+        texts = [" ".join(vocab[min(int(rng.paretovariate(1.0)), 39)] for _ in range(30))
+                 for _ in range(300)]
+        index = BM25Index()
+        index.add([str(i) for i in range(300)], texts, ["doc.md"] * 300)
+
+        docs = [tokenize(t) for t in texts]
+        avg = sum(map(len, docs)) / len(docs)
+
+        def exhaustive(query):
+            scores = {}
+            for term in set(tokenize(query)):
+                df = sum(term in d for d in docs)
+                if not df:
+                    continue
+                idf = math.log(1 + (len(docs) - df + 0.5) / (df + 0.5))
+                for i, d in enumerate(docs):
+                    tf = d.count(term)
+                    if tf:
+                        norm = BM25_K1 * (1 - BM25_B + BM25_B * len(d) / avg)
+                        scores[str(i)] = scores.get(str(i), 0) + idf * tf * (BM25_K1 + 1) / (tf + norm)
+            return sorted(scores.values(), reverse=True)[:5]
+
+        for query in ("t1 t30", "t0 t1 t2", "t5 t39 t0", "t2"):
+            got = [score for _, score in index.search(query, 5)]
+            assert got == pytest.approx(exhaustive(query))
+
+    def test_query_time_on_50k_chunks(self):
+        import random
+
+        rng = random.Random(0)
+        vocab = [f"termine{i}" for i in range(20000)]
+        index = BM25Index()
+        index.add(
+            [str(i) for i in range(50000)],
+            [" ".join(rng.choices(vocab, k=40)) for _ in range(50000)],
+            ["doc.md"] * 50000,
+        )
+        start = time.perf_counter()
+        for _ in range(20):
+            index.search("termine17 termine1234 termine9999", top_k=5)
+        assert (time.perf_counter() - start) / 20 < 0.05  # margine per CI lente
+
+
+# ---------------------------------------------------------------------------
+# Test: ricerca keyword nello store in memoria
+# ---------------------------------------------------------------------------
+
+class TestStoreKeywordSearch:
+    def test_memory_store_uses_bm25(self, tmp_path):
+        from rag import Document, TextChunker
+        from rag.vector_store import SimpleVectorStore
+
+        def _memory_only(self):
+            self.use_chromadb = False
+
+        with patch.object(SimpleVectorStore, "_init_store", _memory_only):
+            store = SimpleVectorStore(persist_path=str(tmp_path / "vs"))
+
+        chunks = TextChunker().chunk_documents([
+            Document(path="a.md", content="procedura di backup del server NAS"),
+            Document(path="b.md", content="ricetta della pizza margherita"),
+        ])
+        store.add_chunks(chunks)
+
+        results = store.search("backup NAS", top_k=5)
+        assert [r["metadata"]["source"] for r in results] == ["a.md"]
+
+        store.delete_sources(["a.md"])
+        assert store.search("backup NAS", top_k=5) == []
+        assert not store.bm25_path.exists()  # store in memoria: niente file
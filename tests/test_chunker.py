@@ -0,0 +1,105 @@
+# tests/test_chunker.py
+# DeepAiUG v1.16.0 — Test per TextChunker su offset
+# ============================================================================
+# Confronta il chunker con l'implementazione precedente (basata su slice),
+# riportata qui come riferimento: i chunk devono essere identici.
+# ============================================================================
+
+import random
+import re
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from rag import Document, TextChunker
+
+
+# ---------------------------------------------------------------------------
+# Implementazione di riferimento (v1.4.0)
+# ---------------------------------------------------------------------------
+
+def _legacy_split_point(chunker, text, max_pos):
+    if max_pos >= len(text):
+        return len(text)
+    for sep in chunker.separators:
+        search_start = max(0, chunker.chunk_size // 3)
+        search_text = text[search_start:max_pos]
+        last_sep = search_text.rfind(sep)
+        if last_sep > 0:
+            return search_start + last_sep + len(sep)
+    return max_pos
+
+
+def _legacy_chunks(chunker, content):
+    """Ritorna [(text, start, end)] come il chunker v1.4.0."""
+    text = re.sub(r'\n{4,}', '\n\n\n', content)
+    text = re.sub(r' {3,}', '  ', text)
+    out = []
+    start = 0
+    while start < len(text):
+        if start + chunker.chunk_size >= len(text):
+            chunk_text = text[start:].strip()
+            if chunk_text:
+                out.append((chunk_text, start, len(text)))
+            break
+        end = start + _legacy_split_point(chunker, text[start:], chunker.chunk_size)
+        chunk_text = text[start:end].strip()
+        if chunk_text:
+            out.append((chunk_text, start, end))
+        start = max(start + 1, end - chunker.chunk_overlap)
+        if start >= len(text) or (end == start + chunker.chunk_size and end < len(text)):
+            break
+    return out
+
+
+def _random_text(rng, n_tokens):
+    pieces = ["parola", "testo", "a", "lungo", "\n", "\n\n", "\n\n\n\n", ". ",
+              "! ", "? ", "; ", ", ", "\n## Titolo\n", "\n### Sotto\n", "    "]
+    return " ".join(rng.choice(pieces) for _ in range(n_tokens))
+
+
+def _as_tuples(chunks):
+    return [(c.text, c.start_char, c.end_char) for c in chunks]
+
+
+# ---------------------------------------------------------------------------
+# Test
+# ---------------------------------------------------------------------------
+
+class TestChunkerEquivalence:
+    @pytest.mark.parametrize("chunk_size,overlap", [(1000, 200), (300, 50), (50, 10), (10, 9)])
+    def test_identical_to_legacy(self, chunk_size, overlap):
+        rng = random.Random(chunk_size)
+        chunker = TextChunker(chunk_size=chunk_size, chunk_overlap=overlap)
+        for n_tokens in (0, 5, 200, 3000):
+            content = _random_text(rng, n_tokens)
+            doc = Document(path="t.md", content=content)
+            assert _as_tuples(chunker.chunk_document(doc)) == _legacy_chunks(chunker, content)
+
+    def test_text_without_separators(self):
+        chunker = TextChunker(chunk_size=100, chunk_overlap=20)
+        content = "x" * 1050
+        doc = Document(path="t.md", content=content)
+        assert _as_tuples(chunker.chunk_document(doc)) == _legacy_chunks(chunker, content)
+
+
+class TestChunkIds:
+    def test_insert_at_top_keeps_later_ids(self):
+        paragraphs = [f"Paragrafo {i}. " + f"frase numero {i} del documento. " * 25 for i in range(6)]
+        chunker = TextChunker()
+        before = chunker.chunk_document(Document(path="n.md", content="\n\n".join(paragraphs)))
+        after = chunker.chunk_document(
+            Document(path="n.md", content="\n\n".join(["Nuovo paragrafo. " * 40] + paragraphs))
+        )
+        # Solo il primo chunk (che include l'inizio del documento) cambia
+        assert [c.id for c in before[1:]] == [c.id for c in after[-len(before) + 1:]]
+
+    def test_repeated_text_gets_distinct_ids(self):
+        chunker = TextChunker(chunk_size=120, chunk_overlap=0)
+        chunks = chunker.chunk_document(Document(path="d.md", content="\n\n".join(["uguale " * 14] * 3)))
+        assert len({c.text for c in chunks}) == 1
+        assert len({c.id for c in chunks}) == len(chunks) == 3
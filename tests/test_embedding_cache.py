@@ -0,0 +1,120 @@
+# tests/test_embedding_cache.py
+# DeepAiUG v1.16.0 — Test per la cache persistente degli embedding
+# ============================================================================
+
+import sys
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+
+# ---------------------------------------------------------------------------
+# Fixtures
+# ---------------------------------------------------------------------------
+
+class _CountingModel:
+    """Modello finto: vettore deterministico dalla lunghezza del testo."""
+
+    def __init__(self):
+        self.encoded = []
+
+    def encode(self, texts, convert_to_numpy=True, normalize_embeddings=True):
+        self.encoded.extend(texts)
+
+        class _Result(list):
+            def tolist(self):
+                return list(self)
+
+        return _Result([[float(len(t)), 0.5, -1.0] for t in texts])
+
+
+@pytest.fixture
+def helper_with_cache(tmp_path):
+    """_EmbeddingsHelper con modello finto e cache su tmp_path."""
+    from rag import embeddings
+    from rag.disk_cache import DiskLRUCache
+
+    helper = embeddings._EmbeddingsHelper.__new__(embeddings._EmbeddingsHelper)
+    helper.model_name = "test-model"
+    helper.model = _CountingModel()
+
+    cache = DiskLRUCache(tmp_path / "emb.sqlite")
+    with patch.object(embeddings, "_embedding_cache_singleton", cache):
+        yield helper
+    cache.close()
+
+
+# ---------------------------------------------------------------------------
+# Test: DiskLRUCache
+# ---------------------------------------------------------------------------
+
+class TestDiskLRUCache:
+    def test_roundtrip_and_persistence(self, tmp_path):
+        from rag.disk_cache import DiskLRUCache
+
+        cache = DiskLRUCache(tmp_path / "c.sqlite")
+        cache.put_many({"a": b"111", "b": b"22"})
+        assert cache.get("a") == b"111"
+        assert cache.get_many(["a", "b", "zzz"]) == {"a": b"111", "b": b"22"}
+        cache.close()
+
+        reopened = DiskLRUCache(tmp_path / "c.sqlite")
+        assert reopened.get("b") == b"22"
+        assert len(reopened) == 2
+        reopened.close()
+
+    def test_eviction_removes_least_recently_used(self, tmp_path):
+        from rag.disk_cache import DiskLRUCache
+
+        cache = DiskLRUCache(tmp_path / "c.sqlite", max_bytes=300)
+        cache.put("old", b"x" * 100)
+        cache.put("recent", b"x" * 100)
+        cache.get("old")  # "old" diventa la voce usata più di recente
+        cache.put("new", b"x" * 150)
+
+        assert cache.get("recent") is None
+        assert cache.get("old") is not None
+        assert cache.get("new") is not None
+        assert cache.get_stats()["total_bytes"] <= 300
+        cache.close()
+
+
+# ---------------------------------------------------------------------------
+# Test: encode_passages con cache
+# ---------------------------------------------------------------------------
+
+class TestEncodePassagesCache:
+    def test_second_call_hits_cache(self, helper_with_cache):
+        first = helper_with_cache.encode_passages(["uno", "due"])
+        assert len(helper_with_cache.model.encoded) == 2
+
+        second = helper_with_cache.encode_passages(["due", "uno"])
+        assert len(helper_with_cache.model.encoded) == 2
+        assert second == [first[1], first[0]]
+
+    def test_only_missing_texts_are_encoded(self, helper_with_cache):
+        helper_with_cache.encode_passages(["uno"])
+        helper_with_cache.encode_passages(["uno", "tre", "tre"])
+        assert helper_with_cache.model.encoded == ["passage: uno", "passage: tre"]
+
+    def test_key_depends_on_model(self, helper_with_cache):
+        helper_with_cache.encode_passages(["uno"])
+        helper_with_cache.model_name = "altro-modello"
+        helper_with_cache.encode_passages(["uno"])
+        assert len(helper_with_cache.model.encoded) == 2
+
+    def test_cache_errors_fall_back_to_encoding(self, helper_with_cache):
+        import sqlite3
+        from rag import embeddings
+
+        cache = embeddings._embedding_cache_singleton
+        with patch.object(cache, "get_many", side_effect=sqlite3.OperationalError("locked")), \
+             patch.object(cache, "put_many", side_effect=sqlite3.OperationalError("locked")):
+            vectors = helper_with_cache.encode_passages(["uno", "due"])
+
+        assert vectors == [[12.0, 0.5, -1.0], [12.0, 0.5, -1.0]]
+        assert helper_with_cache.model.encoded == ["passage: uno", "passage: due"]
@@ -0,0 +1,189 @@
+# tests/test_hybrid_search.py
+# DeepAiUG v1.16.0 — Test per la ricerca ibrida (densa + BM25 con RRF)
+# ============================================================================
+
+import sys
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+
+def _result(chunk_id, distance=0.5):
+    return {"id": chunk_id, "text": f"testo {chunk_id}",
+            "metadata": {"source": f"{chunk_id}.md"}, "distance": distance}
+
+
+def _manager_with_store(dense, keyword, has_dense=True):
+    from rag import KnowledgeBaseManager
+    from rag.vector_store import SimpleVectorStore
+
+    with patch.object(SimpleVectorStore, "_init_store", lambda self: None):
+        manager = KnowledgeBaseManager()
+    store = MagicMock()
+    store.has_dense_index = has_dense
+    store.search.return_value = dense
+    store.keyword_search.return_value = keyword
+    manager.vector_store = store
+    return manager
+
+
+# ---------------------------------------------------------------------------
+# Test: reciprocal_rank_fusion
+# ---------------------------------------------------------------------------
+
+class TestReciprocalRankFusion:
+    def test_items_in_both_lists_rank_first(self):
+        from rag.manager import reciprocal_rank_fusion
+
+        dense = [_result("a"), _result("b"), _result("c")]
+        keyword = [_result("c"), _result("d")]
+        fused = reciprocal_rank_fusion([dense, keyword], top_k=4, k=60)
+
+        # b e d a pari merito (entrambi rank 2): vince l'ordine delle liste
+        assert [r["id"] for r in fused] == ["c", "a", "b", "d"]
+        assert fused[0]["rrf_score"] == 1 / 63 + 1 / 61
+
+    def test_first_list_wins_for_payload(self):
+        from rag.manager import reciprocal_rank_fusion
+
+        fused = reciprocal_rank_fusion(
+            [[_result("a", distance=0.1)], [_result("a", distance=0.9)]], top_k=1
+        )
+        assert fused[0]["distance"] == 0.1
+
+
+# ---------------------------------------------------------------------------
+# Test: KnowledgeBaseManager.search
+# ---------------------------------------------------------------------------
+
+class TestManagerSearchModes:
+    def test_hybrid_fuses_dense_and_keyword(self):
+        manager = _manager_with_store(
+            dense=[_result("a"), _result("b")],
+            keyword=[_result("XR450"), _result("b")],
+        )
+        results = manager.search("ricambio XR450", top_k=2)
+
+        assert [r["id"] for r in results] == ["b", "a"]
+        manager.vector_store.search.assert_called_once_with("ricambio XR450", 8)
+        manager.vector_store.keyword_search.assert_called_once_with("ricambio XR450", 8)
+
+    def test_explicit_modes(self):
+        manager = _manager_with_store(dense=[_result("a")], keyword=[_result("k")])
+        assert [r["id"] for r in manager.search("q", 3, mode="dense")] == ["a"]
+        assert [r["id"] for r in manager.search("q", 3, mode="keyword")] == ["k"]
+
+    def test_hybrid_without_dense_index_uses_store_search(self):
+        manager = _manager_with_store(dense=[_result("a")], keyword=[], has_dense=False)
+        assert [r["id"] for r in manager.search("q", 3)] == ["a"]
+        manager.vector_store.keyword_search.assert_not_called()
+
+
+# ---------------------------------------------------------------------------
+# Test: RetrievalRequest (embedding della query condiviso)
+# ---------------------------------------------------------------------------
+
+class TestRetrievalRequest:
+    def test_embedding_computed_once_and_shared(self):
+        from core import kb_chat_indexer
+        from rag import retrieval
+        from rag.retrieval import RetrievalRequest
+        from rag.vector_store import SimpleVectorStore
+
+        helper = MagicMock()
+        helper.encode_query.return_value = [[0.1, 0.2]]
+        collection = MagicMock()
+        collection.count.return_value = 1
+        collection.query.return_value = {"ids": [[]], "documents": [[]]}
+
+        with patch.object(SimpleVectorStore, "_init_store", lambda self: None):
+            store = SimpleVectorStore()
+        store.use_chromadb, store.collection = True, collection
+
+        with patch.object(retrieval, "get_embeddings_helper", return_value=helper), \
+                patch.object(kb_chat_indexer, "_get_chroma_collection",
+                             return_value=(None, collection)):
+            request = RetrievalRequest("domanda")
+            store.search(request, 5)
+            kb_chat_indexer.search_chat_kb(request, top_k=5)
+
+        helper.encode_query.assert_called_once_with(["domanda"])
+        for call in collection.query.call_args_list:
+            assert call.kwargs["query_embeddings"] == [[0.1, 0.2]]
+            assert "query_texts" not in call.kwargs
+
+    def test_without_model_falls_back_to_query_texts(self):
+        from rag import retrieval
+        from rag.retrieval import RetrievalRequest
+
+        with patch.object(retrieval, "get_embeddings_helper", return_value=None):
+            assert RetrievalRequest("q").chroma_query_kwargs() == {"query_texts": ["q"]}
+
+
+# ---------------------------------------------------------------------------
+# Test: cache di embedding delle query e risultati
+# ---------------------------------------------------------------------------
+
+class TestSearchCaches:
+    def test_query_embedding_cached_across_requests(self):
+        from rag import retrieval
+        from rag.retrieval import RetrievalRequest
+
+        helper = MagicMock()
+        helper.encode_query.return_value = [[0.3, 0.4]]
+        with patch.object(retrieval, "get_embeddings_helper", return_value=helper):
+            first = RetrievalRequest("Come  configuro il NAS?").query_embedding
+            again = RetrievalRequest("  Come configuro il NAS? ").query_embedding
+
+        assert first == again == [0.3, 0.4]
+        helper.encode_query.assert_called_once_with(["Come configuro il NAS?"])
+
+    def test_results_cached_until_generation_changes(self):
+        import time
+
+        from rag.retrieval import bump_index_generation
+
+        manager = _manager_with_store(dense=[_result("a")], keyword=[_result("a")])
+        store = manager.vector_store
+
+        first = manager.search("backup", top_k=3)
+        start = time.perf_counter()
+        for _ in range(1000):
+            assert manager.search("backup", top_k=3) == first
+        assert (time.perf_counter() - start) / 1000 < 1e-3
+        assert store.search.call_count == 1
+
+        manager.search("backup", top_k=5)           # top_k diverso: nuova ricerca
+        manager.search("backup", 3, mode="dense")   # modo diverso: nuova ricerca
+        assert store.search.call_count == 3
+
+        bump_index_generation(store.cache_key)      # es. add_chunks / clear
+        manager.search("backup", top_k=3)
+        assert store.search.call_count == 4
+
+    def test_cached_results_metadata_is_copied(self):
+        from rag.retrieval import cached_search
+
+        original = [{"content": "x", "metadata": {"source": "a.md"}}]
+        first = cached_search("copy-test", "q", 3, None, lambda: original)
+        original[0]["metadata"]["source"] = "modificato"
+        first[0]["metadata"]["citation"] = 1
+
+        again = cached_search("copy-test", "q", 3, None, lambda: [])
+        assert again == [{"content": "x", "metadata": {"source": "a.md"}}]
+
+    def test_store_writes_bump_generation(self, tmp_path):
+        from rag import Document, TextChunker
+        from rag.retrieval import index_generation
+        from rag.vector_store import SimpleVectorStore
+
+        with patch.object(SimpleVectorStore, "_init_store", lambda self: None):
+            store = SimpleVectorStore(persist_path=str(tmp_path))
+        chunks = TextChunker().chunk_documents([Document(path="a.md", content="testo")])
+
+        before = index_generation(store.cache_key)
+        store.add_chunks(chunks)
+        store.clear()
+        assert index_generation(store.cache_key) == before + 2
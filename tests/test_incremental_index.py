@@ -0,0 +1,474 @@
+# tests/test_incremental_index.py
+# DeepAiUG v1.16.0 — Test per indicizzazione incrementale (manifest)
+# ============================================================================
+# Usa lo store in memoria (ChromaDB disattivato) e una cartella temporanea:
+# verifica che solo i documenti nuovi/modificati vengano ri-chunkati e che
+# i chunk dei file rimossi spariscano dall'indice.
+# ============================================================================
+
+import os
+import sys
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+
+# ---------------------------------------------------------------------------
+# Fixtures
+# ---------------------------------------------------------------------------
+
+@pytest.fixture
+def docs_dir(tmp_path):
+    """Cartella con 4 note markdown."""
+    folder = tmp_path / "docs"
+    folder.mkdir()
+    for i in range(4):
+        (folder / f"nota_{i}.md").write_text(
+            f"# Nota {i}\n\n" + f"contenuto della nota {i}. " * 80,
+            encoding="utf-8",
+        )
+    return folder
+
+
+@pytest.fixture
+def memory_manager(tmp_path, docs_dir):
+    """KnowledgeBaseManager con store in memoria e manifest in tmp_path."""
+    from rag import KnowledgeBaseManager, LocalFolderAdapter
+    from rag.vector_store import SimpleVectorStore
+
+    def _memory_only(self):
+        self.use_chromadb = False
+
+    with patch.object(SimpleVectorStore, "_init_store", _memory_only), \
+            patch("rag.vector_store.KNOWLEDGE_BASE_DIR", tmp_path):
+        manager = KnowledgeBaseManager()
+        manager.set_adapter(LocalFolderAdapter({
+            "folder_path": str(docs_dir),
+            "extensions": [".md"],
+        }))
+        yield manager
+
+
+def _indexed_files(manager) -> set:
+    return {Path(c.document.path).name for c in manager.vector_store.chunks}
+
+
+# ---------------------------------------------------------------------------
+# Test: manifest
+# ---------------------------------------------------------------------------
+
+class TestManifest:
+    def test_diff_new_changed_removed(self, tmp_path):
+        from rag.manifest import IndexManifest
+
+        manifest = IndexManifest(tmp_path / "m.json")
+        manifest.entries = {
+            "a": {"size": 1, "mtime_ns": 1, "hash": "x"},
+            "b": {"size": 2, "mtime_ns": 2, "hash": "y"},
+        }
+        to_load, removed = manifest.diff({
+            "a": {"size": 1, "mtime_ns": 1},
+            "c": {"size": 3, "mtime_ns": 3},
+        })
+        assert to_load == ["c"]
+        assert removed == ["b"]
+
+    def test_save_and_load_roundtrip(self, tmp_path):
+        from rag.manifest import IndexManifest
+
+        manifest = IndexManifest(tmp_path / "m.json")
+        manifest.reset("src", 1000, 200, "model")
+        manifest.entries["a"] = {"size": 1, "hash": "x", "chars": 10}
+        manifest.save()
+
+        loaded = IndexManifest.load(tmp_path / "m.json")
+        assert loaded.matches("src", 1000, 200, "model")
+        assert loaded.entries == manifest.entries
+        assert loaded.total_chars() == 10
+
+    def test_load_corrupted_file(self, tmp_path):
+        from rag.manifest import IndexManifest
+
+        path = tmp_path / "m.json"
+        path.write_text("{non json", encoding="utf-8")
+        assert len(IndexManifest.load(path)) == 0
+
+
+# ---------------------------------------------------------------------------
+# Test: index_documents(incremental=True)
+# ---------------------------------------------------------------------------
+
+class TestIncrementalIndex:
+    def test_first_sync_indexes_everything(self, memory_manager):
+        assert memory_manager.index_documents(incremental=True)
+        assert _indexed_files(memory_manager) == {f"nota_{i}.md" for i in range(4)}
+        assert memory_manager.get_stats()["document_count"] == 4
+
+    def test_second_sync_is_noop(self, memory_manager):
+        memory_manager.index_documents(incremental=True)
+        n_chunks = len(memory_manager.vector_store.chunks)
+
+        assert memory_manager.index_documents(incremental=True)
+        assert memory_manager.last_index_report["indexed"] == []
+        assert len(memory_manager.vector_store.chunks) == n_chunks
+
+    def test_only_changed_and_removed_files(self, memory_manager, docs_dir):
+        memory_manager.index_documents(incremental=True)
+
+        (docs_dir / "nota_1.md").write_text("testo nuovo " * 30, encoding="utf-8")
+        (docs_dir / "nota_2.md").unlink()
+        (docs_dir / "nota_4.md").write_text("nota aggiunta", encoding="utf-8")
+
+        assert memory_manager.index_documents(incremental=True)
+        rechunked = {Path(p).name for p in memory_manager.last_index_report["indexed"]}
+        assert rechunked == {"nota_1.md", "nota_4.md"}
+        assert _indexed_files(memory_manager) == {
+            "nota_0.md", "nota_1.md", "nota_3.md", "nota_4.md"
+        }
+
+    def test_touch_without_changes_skips_reembedding(self, memory_manager, docs_dir):
+        memory_manager.index_documents(incremental=True)
+
+        st = (docs_dir / "nota_0.md").stat()
+        os.utime(docs_dir / "nota_0.md", ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+
+        assert memory_manager.index_documents(incremental=True)
+        assert memory_manager.last_index_report["indexed"] == []
+
+    def test_chunk_params_change_forces_full_rebuild(self, memory_manager):
+        from rag import TextChunker
+
+        memory_manager.index_documents(incremental=True)
+        memory_manager.set_chunker(TextChunker(chunk_size=500, chunk_overlap=50))
+
+        assert memory_manager.index_documents(incremental=True)
+        rechunked = {Path(p).name for p in memory_manager.last_index_report["indexed"]}
+        assert rechunked == {f"nota_{i}.md" for i in range(4)}
+
+    def test_edited_document_rewrites_only_changed_chunks(self, memory_manager, docs_dir):
+        memory_manager.index_documents(incremental=True)
+        path = docs_dir / "nota_0.md"
+        paragraphs = [f"Paragrafo {i}. " + f"frase {i} della nota. " * 35 for i in range(5)]
+        path.write_text("\n\n".join(paragraphs), encoding="utf-8")
+        assert memory_manager.index_documents(incremental=True)
+        n_chunks = len(memory_manager.vector_store.chunks)
+
+        path.write_text("\n\n".join(paragraphs + ["Paragrafo aggiunto in fondo."]), encoding="utf-8")
+        os.utime(path, ns=(1, 1))
+        written = []
+        original_add = memory_manager.vector_store.add_chunks
+        with patch.object(memory_manager.vector_store, "add_chunks",
+                          lambda chunks, **kw: written.extend(chunks) or original_add(chunks, **kw)):
+            assert memory_manager.index_documents(incremental=True)
+
+        assert memory_manager.last_index_report["reused"] >= 3
+        assert len(written) <= 2
+        assert len(memory_manager.vector_store.chunks) in (n_chunks, n_chunks + 1)
+        ids = [c.id for c in memory_manager.vector_store.chunks]
+        assert len(ids) == len(set(ids))
+
+    def test_add_chunks_is_idempotent(self, memory_manager):
+        from rag import Document, TextChunker
+
+        chunks = TextChunker().chunk_documents([Document(path="x.md", content="testo " * 400)])
+        store = memory_manager.vector_store
+        assert store.add_chunks(chunks) and store.add_chunks(chunks + chunks[:1])
+        assert len(store.chunks) == len(chunks)
+
+
+# ---------------------------------------------------------------------------
+# Test: sorgente non raggiungibile
+# ---------------------------------------------------------------------------
+
+class _FakeWiki:
+    """Sorgente senza stamp (come un adapter wiki): pagine o errore a metà."""
+
+    def __new__(cls, pages, fail_after=None):
+        from rag import Document, SourceUnavailableError, WikiAdapter
+
+        class _Adapter(WikiAdapter):
+            def connect(self):
+                return True
+
+            def get_source_id(self):
+                return "fake://wiki"
+
+            def load_documents(self):
+                return list(self.iter_documents())
+
+            def iter_documents(self, progress_callback=None):
+                for i, name in enumerate(pages):
+                    if i == fail_after:
+                        raise SourceUnavailableError("wiki offline")
+                    yield Document(name, f"# {name}\n\n" + f"testo di {name}. " * 60)
+
+        return _Adapter()
+
+
+class TestUnavailableSource:
+    def test_unmounted_folder_keeps_index(self, memory_manager, docs_dir):
+        assert memory_manager.index_documents(incremental=True)
+        n_chunks = len(memory_manager.vector_store.chunks)
+
+        docs_dir.rename(docs_dir.with_name("scollegata"))
+        for incremental in (True, False):
+            assert memory_manager.index_documents(incremental=incremental) is False
+            assert "Cartella non accessibile" in memory_manager.last_index_report["error"]
+            assert len(memory_manager.vector_store.chunks) == n_chunks
+            assert memory_manager.manifest.document_count() == 4
+
+    def test_existing_empty_folder_removes_everything(self, memory_manager, docs_dir):
+        assert memory_manager.index_documents(incremental=True)
+        for path in docs_dir.iterdir():
+            path.unlink()
+
+        assert memory_manager.index_documents(incremental=True)
+        assert len(memory_manager.last_index_report["removed"]) == 4
+        assert memory_manager.vector_store.chunks == []
+
+    def test_interrupted_iteration_removes_nothing(self, memory_manager):
+        pages = ["a", "b", "c"]
+        memory_manager.set_adapter(_FakeWiki(pages))
+        assert memory_manager.index_documents(incremental=True)
+        n_chunks = len(memory_manager.vector_store.chunks)
+
+        # Offline dall'inizio: nemmeno la re-indicizzazione completa svuota l'indice
+        memory_manager.set_adapter(_FakeWiki(pages, fail_after=0))
+        for incremental in (True, False):
+            assert memory_manager.index_documents(incremental=incremental) is False
+            assert memory_manager.last_index_report["error"] == "wiki offline"
+            assert len(memory_manager.vector_store.chunks) == n_chunks
+
+        # Interrotta a metà: le pagine non lette non sono "eliminate"
+        memory_manager.set_adapter(_FakeWiki(pages, fail_after=1))
+        assert memory_manager.index_documents(incremental=True) is False
+        assert len(memory_manager.vector_store.chunks) == n_chunks
+        assert set(memory_manager.manifest.entries) == set(pages)
+
+
+    def test_failed_load_keeps_chunks_and_retries(self, memory_manager, docs_dir):
+        assert memory_manager.index_documents(incremental=True)
+        before = {c.id for c in memory_manager.vector_store.chunks
+                  if Path(c.document.path).name == "nota_1.md"}
+        path = docs_dir / "nota_1.md"
+        path.write_text("testo nuovo " * 30, encoding="utf-8")
+        old_entry = dict(memory_manager.manifest.entries[str(path)])
+
+        def _timeout(doc_paths):
+            for doc_path in doc_paths:
+                yield doc_path, None, TimeoutError("timeout")
+
+        with patch.object(memory_manager.adapter, "iter_load_documents", _timeout):
+            assert memory_manager.index_documents(incremental=True)
+        assert memory_manager.last_index_report["failed"] == [str(path)]
+        assert memory_manager.last_index_report["removed"] == []
+        assert memory_manager.manifest.entries[str(path)] == old_entry
+        assert before <= {c.id for c in memory_manager.vector_store.chunks}
+
+        # Sync successiva: il documento viene ritentato
+        assert memory_manager.index_documents(incremental=True)
+        assert memory_manager.last_index_report["indexed"] == [str(path)]
+
+# ---------------------------------------------------------------------------
+# Test: indicizzazione in streaming
+# ---------------------------------------------------------------------------
+
+class TestStreamingIndex:
+    def test_full_index_writes_bounded_batches(self, memory_manager):
+        from rag import manager as manager_module
+
+        batch_sizes = []
+        original_add = memory_manager.vector_store.add_chunks
+
+        def _spy_add(chunks, progress_callback=None):
+            batch_sizes.append(len(chunks))
+            return original_add(chunks, progress_callback=progress_callback)
+
+        with patch.object(manager_module, "STREAM_BATCH_CHUNKS", 3), \
+                patch.object(memory_manager.vector_store, "add_chunks", _spy_add), \
+                patch.object(memory_manager.adapter, "load_documents",
+                             side_effect=AssertionError("caricamento non in streaming")):
+            assert memory_manager.index_documents()
+
+        # Ogni nota produce 2-3 chunk: un blocco scritto ogni 1-2 documenti
+        assert len(batch_sizes) > 1
+        assert max(batch_sizes) < 3 + 3
+        assert _indexed_files(memory_manager) == {f"nota_{i}.md" for i in range(4)}
+        assert memory_manager.manifest.document_count() == 4
+        assert sum(e["chunks"] for e in memory_manager.manifest.entries.values()) == \
+            len(memory_manager.vector_store.chunks)
+
+    def test_failed_batch_keeps_earlier_batches_in_manifest(self, memory_manager):
+        from rag import manager as manager_module
+
+        calls = []
+        original_add = memory_manager.vector_store.add_chunks
+
+        def _fail_second(chunks, progress_callback=None):
+            calls.append(len(chunks))
+            if len(calls) == 2:
+                return False
+            return original_add(chunks, progress_callback=progress_callback)
+
+        with patch.object(manager_module, "STREAM_BATCH_CHUNKS", 1), \
+                patch.object(memory_manager.vector_store, "add_chunks", _fail_second):
+            assert memory_manager.index_documents(incremental=True) is False
+
+        assert memory_manager.manifest.document_count() == 1
+
+        # La sync successiva indicizza solo i documenti mancanti
+        assert memory_manager.index_documents(incremental=True)
+        assert len(memory_manager.last_index_report["indexed"]) == 3
+        assert _indexed_files(memory_manager) == {f"nota_{i}.md" for i in range(4)}
+
+
+# ---------------------------------------------------------------------------
+# Test: riuso dell'indice esistente
+# ---------------------------------------------------------------------------
+
+class TestIndexReuse:
+    def test_has_index_for_same_source_and_chunking(self, memory_manager, docs_dir):
+        from rag import LocalFolderAdapter
+
+        source_id = LocalFolderAdapter({"folder_path": str(docs_dir)}).get_source_id()
+        assert not memory_manager.has_index_for(source_id, 1000, 200)
+
+        memory_manager.index_documents(incremental=True)
+        assert memory_manager.has_index_for(source_id, 1000, 200)
+        assert not memory_manager.has_index_for(source_id, 500, 50)
+        assert not memory_manager.has_index_for("/altra/cartella", 1000, 200)
+
+        info = memory_manager.vector_store.get_index_info()
+        assert info["manifest_fingerprint"] == memory_manager.manifest.fingerprint()
+
+    def test_fingerprint_mismatch_forces_rebuild(self, memory_manager):
+        memory_manager.index_documents(incremental=True)
+        assert memory_manager.index_documents(incremental=True)
+        assert memory_manager.last_index_report["indexed"] == []
+
+        # Indice non allineato al manifest (es. collection modificata altrove)
+        memory_manager.vector_store.set_index_info({
+            **memory_manager.vector_store.get_index_info(),
+            "manifest_fingerprint": "diverso",
+        })
+        assert memory_manager.index_documents(incremental=True)
+        assert len(memory_manager.last_index_report["indexed"]) == 4
+
+
+# ---------------------------------------------------------------------------
+# Test: un indice per sorgente (registro + eviction LRU)
+# ---------------------------------------------------------------------------
+
+class TestPerSourceIndexes:
+    @pytest.fixture
+    def other_dir(self, tmp_path):
+        folder = tmp_path / "altri"
+        folder.mkdir()
+        (folder / "altro.md").write_text("# Altro\n\n" + "testo diverso. " * 80, encoding="utf-8")
+        return folder
+
+    def _local(self, folder):
+        from rag import LocalFolderAdapter
+
+        return LocalFolderAdapter({"folder_path": str(folder), "extensions": [".md"]})
+
+    def test_switching_back_reuses_index(self, memory_manager, docs_dir, other_dir):
+        assert memory_manager.index_documents(incremental=True)
+        first = memory_manager.vector_store
+
+        memory_manager.set_adapter(self._local(other_dir))
+        assert memory_manager.vector_store is not first
+        assert memory_manager.index_documents(incremental=True)
+        assert _indexed_files(memory_manager) == {"altro.md"}
+
+        memory_manager.set_adapter(self._local(docs_dir))
+        assert memory_manager.vector_store is first
+        assert memory_manager.index_documents(incremental=True)
+        assert memory_manager.last_index_report["indexed"] == []
+        assert len(memory_manager.index_registry.entries) == 2
+
+    def test_disk_budget_evicts_least_recent(self, memory_manager, docs_dir, other_dir):
+        from rag import manager as manager_module
+
+        assert memory_manager.index_documents(incremental=True)
+        first_name = memory_manager.vector_store.collection_name
+        first_manifest = memory_manager.vector_store.manifest_path
+        assert first_manifest.exists()
+
+        memory_manager.set_adapter(self._local(other_dir))
+        with patch.object(manager_module, "KB_INDEX_DISK_BUDGET_MB", 1e-9):
+            assert memory_manager.index_documents(incremental=True)
+
+        assert list(memory_manager.index_registry.entries) == [
+            memory_manager.vector_store.collection_name
+        ]
+        assert first_name not in memory_manager.index_registry.entries
+        assert not first_manifest.exists()
+
+    def test_selecting_source_creates_no_collection(self, tmp_path, docs_dir, other_dir):
+        """La collection ChromaDB nasce alla prima scrittura, non alla selezione"""
+        import types
+
+        from rag import KnowledgeBaseManager
+        from rag import vector_store
+
+        collections = {}
+
+        class _Collection:
+            def __init__(self, name, metadata):
+                self.name, self.metadata, self.ids = name, dict(metadata or {}), set()
+
+            def count(self):
+                return len(self.ids)
+
+            def upsert(self, ids, documents, metadatas, embeddings=None):
+                self.ids.update(ids)
+
+            def modify(self, metadata):
+                self.metadata = metadata
+
+        class _Client:
+            def get_collection(self, name, embedding_function=None):
+                if name not in collections:
+                    raise ValueError(f"Collection {name} does not exist")
+                return collections[name]
+
+            def get_or_create_collection(self, name, metadata=None, embedding_function=None):
+                return collections.setdefault(name, _Collection(name, metadata))
+
+            def delete_collection(self, name):
+                del collections[name]
+
+        chromadb = types.SimpleNamespace(PersistentClient=lambda path: _Client())
+        with patch.dict(sys.modules, {"chromadb": chromadb}), \
+                patch("rag.vector_store.KNOWLEDGE_BASE_DIR", tmp_path), \
+                patch.object(vector_store, "get_embedding_function", return_value=None), \
+                patch.object(vector_store, "get_embeddings_helper", return_value=None):
+            manager = KnowledgeBaseManager()
+            manager.set_adapter(self._local(other_dir))
+            manager.set_adapter(self._local(docs_dir))
+            assert collections == {}
+            assert manager.vector_store.get_stats()["using_chromadb"] is True
+            assert not manager.is_indexed()
+
+            assert manager.index_documents(incremental=True)
+            assert list(collections) == [manager.vector_store.collection_name]
+            assert list(manager.index_registry.entries) == list(collections)
+            assert collections[manager.vector_store.collection_name].count() > 0
+
+    def test_registry_lru_victims(self, tmp_path):
+        from rag.index_registry import IndexRegistry
+
+        registry = IndexRegistry(tmp_path / "_indexes.json")
+        for name, last_used in (("a", 3), ("b", 1), ("c", 2)):
+            registry.touch(name, "src-" + name, 1000, 200, size_bytes=100)
+            registry.entries[name]["last_used"] = last_used
+
+        assert registry.lru_victims(150, keep={"c"}) == ["b", "a"]
+        assert registry.lru_victims(250) == ["b"]
+        assert registry.lru_victims(0) == []
+        assert IndexRegistry(tmp_path / "_indexes.json").lookup("src-c", 1000, 200) == "c"
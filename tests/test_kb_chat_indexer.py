@@ -390,3 +390,32 @@ class TestMetaFile:
 
         meta = load_chat_kb_meta()
         assert meta == {}
+
+
+# ---------------------------------------------------------------------------
+# Test: handle ChromaDB condiviso
+# ---------------------------------------------------------------------------
+
+class TestCollectionPool:
+    def test_collection_reused_across_calls(self, tmp_vectorstore):
+        from core import kb_chat_indexer
+
+        with patch.object(
+            kb_chat_indexer, "_open_chroma_collection",
+            wraps=kb_chat_indexer._open_chroma_collection,
+        ) as opener:
+            _, first = kb_chat_indexer._get_chroma_collection()
+            _, second = kb_chat_indexer._get_chroma_collection()
+
+        assert first is second
+        assert opener.call_count == 1
+
+    def test_model_change_invalidates_pool(self, tmp_vectorstore):
+        from core import kb_chat_indexer
+
+        _, first = kb_chat_indexer._get_chroma_collection()
+        with patch.object(kb_chat_indexer, "get_active_model_tag", return_value="altro-modello"):
+            _, second = kb_chat_indexer._get_chroma_collection()
+
+        assert first is not second
+        assert (second.metadata or {}).get("embedding_model") == "altro-modello"
@@ -0,0 +1,161 @@
+# tests/test_local_folder_adapter.py
+# DeepAiUG v1.16.0 — Test per LocalFolderAdapter: caricamento parallelo e
+# cache del testo estratto
+# ============================================================================
+
+import json
+import multiprocessing
+import os
+import sys
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+
+@pytest.fixture(autouse=True)
+def extraction_cache(tmp_path):
+    """Cache di estrazione isolata in tmp_path (mai quella in knowledge_base/)."""
+    from rag.adapters import local_folder
+    from rag.disk_cache import DiskLRUCache
+
+    cache = DiskLRUCache(tmp_path / "extraction.sqlite")
+    with patch.object(local_folder, "_extraction_cache_singleton", cache):
+        yield cache
+    cache.close()
+
+
+@pytest.fixture
+def mixed_dir(tmp_path):
+    """Cartella con markdown, txt, HTML, canvas e un PDF corrotto."""
+    folder = tmp_path / "docs"
+    folder.mkdir()
+    for i in range(6):
+        (folder / f"nota_{i}.md").write_text(f"# Nota {i}\n\ntesto {i}", encoding="utf-8")
+        (folder / f"pagina_{i}.html").write_text(
+            f"<html><script>x()</script><body><p>pagina {i}</p></body></html>",
+            encoding="utf-8",
+        )
+    (folder / "appunti.txt").write_text("appunti", encoding="utf-8")
+    (folder / "mappa.canvas").write_text(
+        json.dumps({"nodes": [{"type": "text", "text": "nodo canvas"}]}), encoding="utf-8"
+    )
+    (folder / "rotto.pdf").write_bytes(b"non un pdf")
+    return folder
+
+
+# load_local_file originale, per _crash_in_worker (patch ereditata dai worker)
+_real_load = None
+
+
+def _crash_in_worker(file_path):
+    """Termina il processo worker sul file crash.html (nel processo principale carica)."""
+    if Path(file_path).name == "crash.html" and multiprocessing.parent_process() is not None:
+        os._exit(1)
+    return _real_load(file_path)
+
+
+def _adapter(folder, workers):
+    from rag import LocalFolderAdapter
+
+    return LocalFolderAdapter({
+        "folder_path": str(folder),
+        "extensions": [".md", ".txt", ".html", ".canvas", ".pdf"],
+        "workers": workers,
+    })
+
+
+class TestParallelLoading:
+    def test_parallel_matches_sequential(self, mixed_dir):
+        sequential = _adapter(mixed_dir, 1).load_documents()
+        parallel = _adapter(mixed_dir, 4).load_documents()
+
+        assert [d.path for d in parallel] == [d.path for d in sequential]
+        assert [d.content for d in parallel] == [d.content for d in sequential]
+        assert "rotto.pdf" not in {Path(d.path).name for d in parallel}
+        assert any(d.content == "pagina 3" for d in parallel)
+
+    def test_iter_load_documents_keeps_order_and_reports_failures(self, mixed_dir):
+        from rag.adapters import local_folder
+
+        real_load = local_folder.load_local_file
+
+        def _flaky(file_path):
+            if Path(file_path).name == "nota_2.md":
+                raise OSError("disco non leggibile")
+            return real_load(file_path)
+
+        paths = [str(mixed_dir / f"nota_{i}.md") for i in (5, 2, 0)]
+        with patch.object(local_folder, "load_local_file", _flaky):
+            results = list(_adapter(mixed_dir, 3).iter_load_documents(paths))
+
+        assert [p for p, _, _ in results] == paths
+        assert [doc is not None for _, doc, _ in results] == [True, False, True]
+        assert isinstance(results[1][2], OSError)
+
+    def test_dead_worker_does_not_stop_later_files(self, tmp_path):
+        global _real_load
+        from rag.adapters import local_folder
+
+        folder = tmp_path / "html"
+        folder.mkdir()
+        (folder / "crash.html").write_text("<p>crash</p>", encoding="utf-8")
+        for i in range(30):
+            (folder / f"pagina_{i:02d}.html").write_text(f"<p>pagina {i}</p>", encoding="utf-8")
+
+        _real_load = local_folder.load_local_file
+        with patch.object(local_folder, "load_local_file", _crash_in_worker):
+            docs = _adapter(folder, 2).load_documents()
+
+        contents = {d.content for d in docs}
+        assert {f"pagina {i}" for i in range(30)} <= contents
+        assert "crash" in contents
+
+
+class TestExtractionCache:
+    def test_unchanged_files_skip_extraction(self, mixed_dir, extraction_cache):
+        from rag.adapters import local_folder
+
+        first = _adapter(mixed_dir, 1).load_documents()
+        # 6 HTML + 1 canvas (il PDF corrotto non produce testo: non va in cache)
+        assert len(extraction_cache) == 7
+
+        with patch.object(local_folder, "_load_html_file",
+                          side_effect=AssertionError("estrazione non necessaria")):
+            for workers in (1, 4):
+                again = _adapter(mixed_dir, workers).load_documents()
+                assert [(d.path, d.content) for d in again] == \
+                    [(d.path, d.content) for d in first]
+
+    def test_modified_file_or_new_extractor_version_reextracts(self, mixed_dir):
+        import os
+
+        from rag.adapters import local_folder
+
+        page = mixed_dir / "pagina_0.html"
+        adapter = _adapter(mixed_dir, 1)
+        assert adapter.load_document(str(page)).content == "pagina 0"
+
+        page.write_text("<p>pagina riscritta</p>", encoding="utf-8")
+        st = page.stat()
+        os.utime(page, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+        assert adapter.load_document(str(page)).content == "pagina riscritta"
+
+        with patch.object(local_folder, "EXTRACTOR_VERSION", 999), \
+                patch.object(local_folder, "_load_html_file", return_value="v999") as extract:
+            assert adapter.load_document(str(page)).content == "v999"
+            extract.assert_called_once()
+
+    def test_raw_html_fallback_not_served_once_bs4_available(self, mixed_dir):
+        """Senza bs4 l'HTML è testo grezzo: non deve restare in cache dopo l'installazione"""
+        import sys
+
+        page = mixed_dir / "pagina_0.html"
+        adapter = _adapter(mixed_dir, 1)
+        with patch.dict(sys.modules, {"bs4": None}):
+            assert adapter.load_document(str(page)).content == page.read_text(encoding="utf-8")
+
+        assert adapter.load_document(str(page)).content == "pagina 0"
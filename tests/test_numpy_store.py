@@ -0,0 +1,150 @@
+# tests/test_numpy_store.py
+# DeepAiUG v1.16.0 — Test per l'indice vettoriale NumPy (fallback senza ChromaDB)
+# ============================================================================
+
+import sys
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+np = pytest.importorskip("numpy")
+
+
+# ---------------------------------------------------------------------------
+# Fixtures
+# ---------------------------------------------------------------------------
+
+_VOCAB = ["gatto", "cane", "server", "rete", "backup"]
+
+
+class _BagOfWordsHelper:
+    """Helper finto: vettore = conteggio delle parole di _VOCAB."""
+
+    model_name = "bow-test"
+
+    def _vec(self, text):
+        words = text.lower().split()
+        return [float(words.count(w)) for w in _VOCAB]
+
+    def encode_query(self, texts):
+        return [self._vec(t) for t in texts]
+
+    def encode_passages(self, texts):
+        return [self._vec(t) for t in texts]
+
+
+def _records(n):
+    return (
+        [f"id{i}" for i in range(n)],
+        [f"testo {i}" for i in range(n)],
+        [{"source": f"doc{i % 3}.md"} for i in range(n)],
+    )
+
+
+@pytest.fixture
+def numpy_store(tmp_path):
+    """SimpleVectorStore senza ChromaDB con helper di embedding finto."""
+    from rag import retrieval, vector_store
+    from rag.vector_store import SimpleVectorStore
+
+    def _no_chroma(self):
+        self.use_chromadb = False
+        self._init_numpy_index()
+
+    helper = _BagOfWordsHelper()
+    with patch.object(SimpleVectorStore, "_init_store", _no_chroma), \
+            patch.object(vector_store, "get_embeddings_helper", return_value=helper), \
+            patch.object(retrieval, "get_embeddings_helper", return_value=helper), \
+            patch.object(vector_store, "get_active_model_tag", return_value="bow-test"):
+        yield lambda: SimpleVectorStore(persist_path=str(tmp_path / "vs"))
+
+
+# ---------------------------------------------------------------------------
+# Test: NumpyVectorIndex
+# ---------------------------------------------------------------------------
+
+class TestNumpyVectorIndex:
+    def test_top_k_ordered_by_cosine(self, tmp_path):
+        from rag.numpy_store import NumpyVectorIndex
+
+        index = NumpyVectorIndex(tmp_path / "idx", "m")
+        rng = np.random.default_rng(0)
+        vectors = rng.normal(size=(50, 8)).astype(np.float32)
+        ids, texts, metas = _records(50)
+        index.add(ids, vectors, texts, metas)
+
+        query = vectors[7]
+        results = index.search(query, top_k=5)
+        normed = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+        expected = np.argsort(-(normed @ (query / np.linalg.norm(query))))[:5]
+
+        assert [r["text"] for r in results] == [texts[i] for i in expected]
+        assert results[0]["distance"] == pytest.approx(0.0, abs=1e-5)
+
+    def test_growth_delete_and_persistence(self, tmp_path):
+        from rag.numpy_store import NumpyVectorIndex
+
+        index = NumpyVectorIndex(tmp_path / "idx", "m")
+        ids, texts, metas = _records(3000)  # oltre la capacità iniziale
+        index.add(ids, np.eye(3000, 16, dtype=np.float32) + 0.01, texts, metas)
+        assert index.delete_sources(["doc0.md"]) == 1000
+        index.save()
+
+        reloaded = NumpyVectorIndex(tmp_path / "idx", "m")
+        assert len(reloaded) == 2000
+        assert reloaded.ids == index.ids
+        assert all(m["source"] != "doc0.md" for m in reloaded.metadatas)
+
+    def test_model_change_discards_index(self, tmp_path):
+        from rag.numpy_store import NumpyVectorIndex
+
+        index = NumpyVectorIndex(tmp_path / "idx", "m1")
+        ids, texts, metas = _records(2)
+        index.add(ids, [[1.0, 0.0], [0.0, 1.0]], texts, metas)
+        index.save()
+
+        assert len(NumpyVectorIndex(tmp_path / "idx", "m2")) == 0
+
+
+# ---------------------------------------------------------------------------
+# Test: SimpleVectorStore con fallback NumPy
+# ---------------------------------------------------------------------------
+
+class TestStoreNumpyFallback:
+    def test_semantic_search_survives_restart(self, numpy_store):
+        from rag import Document, TextChunker
+
+        docs = [
+            Document(path="animali.md", content="gatto cane gatto"),
+            Document(path="it.md", content="server rete backup server"),
+        ]
+        chunks = TextChunker().chunk_documents(docs)
+
+        store = numpy_store()
+        assert store.add_chunks(chunks)
+        assert store.search("backup del server", top_k=1)[0]["metadata"]["source"] == "it.md"
+
+        restarted = numpy_store()
+        assert restarted.get_stats()["chunk_count"] == 2
+        assert restarted.search("il mio gatto", top_k=1)[0]["metadata"]["source"] == "animali.md"
+
+        restarted.delete_sources(["animali.md"])
+        assert [r["metadata"]["source"] for r in restarted.search("gatto", top_k=5)] == ["it.md"]
+
+    def test_legacy_metadata_are_migrated(self, numpy_store):
+        from rag import Document, TextChunker
+
+        chunks = TextChunker().chunk_documents([Document(path="it.md", content="server rete")])
+        store = numpy_store()
+        # Indice pre-v1.16.0: id e testo ripetuti nei metadata
+        store.numpy_index.add([c.id for c in chunks], [[1.0] * 5], [c.text for c in chunks],
+                              [c.to_dict() for c in chunks])
+        store.numpy_index.save()
+
+        meta = numpy_store().search("server", top_k=1)[0]["metadata"]
+        assert "text" not in meta and "id" not in meta
+        assert meta["source"] == "it.md" and meta["chunk_index"] == 0
@@ -1,7 +1,15 @@
 # tests/test_persistence.py
 # DeepAiUG v1.14.2 — Test per get_vault_used()
+# v1.16.0 — Test per il catalogo delle conversazioni
 # ============================================================================
 
+import json
+import os
+from unittest.mock import patch
+
+import pytest
+
+from core import persistence
 from core.persistence import get_vault_used
 
 
@@ -21,3 +29,69 @@ def test_get_vault_used_false_explicit():
     """Chat con vault_used esplicito False → False"""
     conv = {"id": "x", "vault_used": False, "messages": []}
     assert get_vault_used(conv) == False
+
+
+# ---------------------------------------------------------------------------
+# v1.16.0 — Catalogo conversazioni
+# ---------------------------------------------------------------------------
+
+@pytest.fixture
+def conv_dir(tmp_path):
+    """Patcha CONVERSATIONS_DIR su una directory temporanea."""
+    with patch.object(persistence, "CONVERSATIONS_DIR", tmp_path):
+        yield tmp_path
+
+
+def _save(conv_id, messages=None):
+    return persistence.save_conversation(
+        conv_id, "2026-03-16T10:00:00",
+        messages or [{"role": "user", "content": "ciao"}],
+        "test-model", "Local (Ollama)", 10,
+    )
+
+
+def test_catalog_updated_on_save_and_delete(conv_dir):
+    """save/delete aggiornano il catalogo senza bisogno di rescan"""
+    _save("a")
+    _save("b")
+    catalog = json.loads((conv_dir / persistence.CATALOG_FILENAME).read_text())
+    assert set(catalog["entries"]) == {"conv_a.json", "conv_b.json"}
+
+    persistence.delete_conversation("a")
+    ids = [c["id"] for c in persistence.list_saved_conversations()]
+    assert ids == ["b"]
+
+
+def test_catalog_skips_parsing_unchanged_files(conv_dir):
+    """File non modificati → nessun json.load sulla conversazione"""
+    _save("a")
+    persistence.list_saved_conversations()
+
+    with patch.object(persistence, "conversation_has_sensitive_content") as check:
+        result = persistence.list_saved_conversations()
+    assert check.call_count == 0
+    assert result[0]["id"] == "a"
+
+
+def test_catalog_detects_hand_edited_files(conv_dir):
+    """File modificato a mano (mtime diverso) → riepilogo ricostruito"""
+    _save("a")
+    path = conv_dir / "conv_a.json"
+    data = json.loads(path.read_text())
+    data["model"] = "modello-modificato"
+    path.write_text(json.dumps(data))
+    st = path.stat()
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+
+    assert persistence.list_saved_conversations()[0]["model"] == "modello-modificato"
+
+
+def test_kb_metadata_update_reflected_in_list(conv_dir):
+    """update_conversation_kb_metadata aggiorna anche il catalogo"""
+    _save("a")
+    persistence.update_conversation_kb_metadata(
+        "a", {"includi_in_kb": True, "rilevanza": 3, "tipo": [], "note": ""}
+    )
+    conv = persistence.list_saved_conversations()[0]
+    assert conv["kb_metadata"]["includi_in_kb"] is True
+    assert conv["kb_metadata"]["rilevanza"] == 3
@@ -0,0 +1,95 @@
+# tests/test_pipelined_add.py
+# DeepAiUG v1.16.0 — Test per la pipeline encode/scrittura di add_chunks
+# ============================================================================
+# Helper di embedding e collection ChromaDB finti (con sleep): verificano
+# ordine dei batch, progress callback invariato e sovrapposizione temporale
+# tra encode e scrittura.
+# ============================================================================
+
+import sys
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+_DELAY = 0.05
+
+
+class _SlowHelper:
+    model_name = "slow-test"
+
+    def __init__(self, fail_on_batch=None):
+        self.calls = 0
+        self.fail_on_batch = fail_on_batch
+
+    def encode_passages(self, texts):
+        self.calls += 1
+        if self.calls == self.fail_on_batch:
+            raise RuntimeError("encode fallito")
+        time.sleep(_DELAY)
+        return [[float(len(t)), 1.0] for t in texts]
+
+
+class _SlowCollection:
+    def __init__(self):
+        self.added_ids = []
+
+    def upsert(self, ids, documents, metadatas, embeddings=None):
+        assert embeddings is not None and len(embeddings) == len(ids)
+        time.sleep(_DELAY)
+        self.added_ids.extend(ids)
+
+
+@pytest.fixture
+def store_factory(tmp_path):
+    from rag import vector_store
+    from rag.vector_store import SimpleVectorStore
+
+    def _fake_chroma(self):
+        self.use_chromadb = True
+        self.collection = _SlowCollection()
+
+    def _make(helper):
+        with patch.object(SimpleVectorStore, "_init_store", _fake_chroma):
+            store = SimpleVectorStore(persist_path=str(tmp_path / "vs"))
+        return store, patch.object(vector_store, "get_embeddings_helper", return_value=helper)
+
+    return _make
+
+
+def _chunks(n):
+    from rag import Chunk, Document
+
+    doc = Document(path="doc.md", content="x")
+    return [Chunk(f"testo {i}", doc, i, 0, 1) for i in range(n)]
+
+
+class TestPipelinedAddChunks:
+    def test_order_progress_and_overlap(self, store_factory):
+        from rag.vector_store import CHROMA_BATCH_SIZE
+
+        store, helper_patch = store_factory(_SlowHelper())
+        chunks = _chunks(CHROMA_BATCH_SIZE * 6)
+        progress = []
+
+        with helper_patch:
+            start = time.perf_counter()
+            assert store.add_chunks(chunks, progress_callback=lambda s, f: progress.append(f))
+            elapsed = time.perf_counter() - start
+
+        assert store.collection.added_ids == [c.id for c in chunks]
+        assert progress == pytest.approx([(i + 1) / 6 for i in range(6)])
+        # Sequenziale: 12 × _DELAY; in pipeline ≈ 7 × _DELAY
+        assert elapsed < 10 * _DELAY
+
+    def test_encode_error_is_reported(self, store_factory):
+        from rag.vector_store import CHROMA_BATCH_SIZE
+
+        store, helper_patch = store_factory(_SlowHelper(fail_on_batch=3))
+        with helper_patch:
+            assert store.add_chunks(_chunks(CHROMA_BATCH_SIZE * 5)) is False
+        assert len(store.collection.added_ids) == CHROMA_BATCH_SIZE * 2
@@ -0,0 +1,110 @@
+# tests/test_vault.py
+# DeepAiUG v1.16.0 — Test per la scansione dei vault (walk_files)
+# ============================================================================
+
+import os
+import sys
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+
+@pytest.fixture
+def vault(tmp_path):
+    """Vault Obsidian con cartelle da escludere e sottocartelle annidate."""
+    root = tmp_path / "vault"
+    files = [
+        "home.md", "mappa.canvas", "note/a.md", "note/b.txt", "note/sub/c.md",
+        ".obsidian/workspace.md", ".trash/vecchia.md", "templates/daily.md",
+        "progetti/templates_old/x.md", "progetti/y.md", "immagine.png",
+    ]
+    for rel in files:
+        path = root / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text("testo", encoding="utf-8")
+    return root
+
+
+def _legacy_scan(folder, extensions, exclude_patterns, recursive=True):
+    """Implementazione precedente (un rglob per estensione) come riferimento."""
+    glob_fn = Path(folder).rglob if recursive else Path(folder).glob
+    files = set()
+    for ext in extensions:
+        for f in glob_fn(f"*{ext}"):
+            if not any(pat in str(f) for pat in exclude_patterns):
+                files.add(f)
+    return sorted(files)
+
+
+class TestWalkFiles:
+    @pytest.mark.parametrize("recursive", [True, False])
+    def test_matches_legacy_scan(self, vault, recursive):
+        from rag.vault import walk_files
+
+        extensions = [".md", ".canvas"]
+        excludes = [".obsidian", "templates", ".trash"]
+        assert walk_files(vault, extensions, excludes, recursive) == \
+            _legacy_scan(vault, extensions, excludes, recursive)
+
+    def test_excluded_directories_are_not_opened(self, vault):
+        from rag import vault as vault_module
+
+        opened = []
+        real_scandir = os.scandir
+
+        def _spy(path):
+            opened.append(Path(path).name)
+            return real_scandir(path)
+
+        with patch.object(vault_module.os, "scandir", _spy):
+            files = vault_module.scan_vault_files(str(vault), {
+                "include_ext": [".md", ".canvas"],
+                "exclude_patterns": [".obsidian", ".trash", "templates"],
+            })
+
+        assert {".obsidian", ".trash", "templates", "templates_old"}.isdisjoint(opened)
+        assert [f.relative_to(vault).as_posix() for f in files] == [
+            "home.md", "mappa.canvas", "note/a.md", "note/sub/c.md", "progetti/y.md",
+        ]
+
+
+@pytest.fixture
+def summary_cache(tmp_path):
+    """Cache dei riepiloghi vault isolata in tmp_path."""
+    from rag import vault as vault_module
+
+    with patch.object(vault_module, "VAULT_SUMMARY_CACHE_FILE", tmp_path / "summary.json"), \
+            patch.object(vault_module, "_summary_cache", None):
+        yield vault_module
+
+
+class TestVaultSummary:
+    def test_summary_counts_files(self, vault, summary_cache):
+        (vault / ".obsidian" / "app.json").write_text("{}", encoding="utf-8")
+        summary = summary_cache.get_vault_summary(str(vault))
+        assert summary["type"] == "obsidian"
+        assert summary["file_count"] == 5  # .obsidian, .trash, templates esclusi
+        assert summary["total_bytes"] == 5 * len("testo")
+        assert summary_cache.get_vault_summary(str(vault / "inesistente")) is None
+
+    def test_cached_until_a_directory_changes(self, vault, summary_cache):
+        with patch.object(summary_cache, "_scan_vault_summary",
+                          wraps=summary_cache._scan_vault_summary) as scan:
+            first = summary_cache.get_vault_summary(str(vault))
+            assert summary_cache.get_vault_summary(str(vault)) == first
+
+            # Cache su disco: un nuovo processo (cache in memoria vuota) non riscansiona
+            summary_cache._summary_cache = None
+            assert summary_cache.get_vault_summary(str(vault)) == first
+            assert scan.call_count == 1
+
+            (vault / "note" / "sub" / "nuova.md").write_text("x", encoding="utf-8")
+            st = (vault / "note" / "sub").stat()
+            os.utime(vault / "note" / "sub", ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+            assert summary_cache.get_vault_summary(str(vault))["file_count"] == \
+                first["file_count"] + 1
+            assert scan.call_count == 2
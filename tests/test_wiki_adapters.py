@@ -0,0 +1,588 @@
+# tests/test_wiki_adapters.py
+# DeepAiUG v1.16.0 — Test per gli adapter wiki: download del contenuto a
+# batch, sync incrementale con cache locale delle pagine, richieste
+# concorrenti con rate limit e retry
+# ============================================================================
+# Sito mwclient e client DokuWiki finti (registrano le chiamate): nessuna
+# rete e nessuna dipendenza da mwclient/dokuwiki.
+# ============================================================================
+
+import sys
+import threading
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+
+class _FakePage:
+    def __init__(self, name, revision=1):
+        self.name = name
+        self.namespace = 0
+        self.revision = revision
+        self.touched = "2026-01-01T00:00:00Z"
+        self.redirect = False
+
+    def text(self):
+        return f"testo singolo di {self.name}"
+
+    def categories(self):
+        raise AssertionError("una richiesta per pagina")
+
+
+class _FakeSite:
+    """
+    api("query", prop="revisions"|"info", titles=...) con eventuale
+    continuazione; revs = {titolo: revisione} delle pagine esistenti.
+    """
+
+    def __init__(self, split_continue=False, fail=False, revs=None):
+        self.calls = []
+        self.split_continue = split_continue
+        self.fail = fail
+        self.revs = revs or {}
+        self.changes = []
+        self.members = {}
+        self.all_pages = []
+
+    def recentchanges(self, **kwargs):
+        return list(self.changes)
+
+    def allpages(self, namespace):
+        return list(self.all_pages)
+
+    def api(self, action, **kwargs):
+        self.calls.append(kwargs)
+        if self.fail:
+            raise RuntimeError("API non disponibile")
+        if kwargs.get("list") == "categorymembers":
+            members = self.members.get(kwargs["cmtitle"], [])
+            # Due pagine di risultati per verificare la continuazione
+            half = len(members) // 2
+            if "cmcontinue" in kwargs:
+                return {"query": {"categorymembers": [{"title": t} for t in members[half:]]}}
+            return {
+                "query": {"categorymembers": [{"title": t} for t in members[:half]]},
+                "continue": {"cmcontinue": "x", "continue": "-||"},
+            }
+        if kwargs["prop"] == "info":
+            pages = {}
+            for i, t in enumerate(kwargs["titles"].split("|")):
+                if t in self.revs:
+                    pages[str(i)] = {"title": t, "ns": 0, "lastrevid": self.revs[t]}
+                else:
+                    pages[str(-i - 1)] = {"title": t, "ns": 0, "missing": ""}
+            return {"query": {"pages": pages}}
+        titles = kwargs["titles"].split("|")
+        if self.split_continue and "rvcontinue" not in kwargs:
+            titles, cont = titles[:1], {"continue": {"rvcontinue": "x", "continue": "||"}}
+        elif self.split_continue:
+            titles, cont = titles[1:], {}
+        else:
+            cont = {}
+        pages = {
+            str(i): {
+                "title": t,
+                "revisions": [{"slots": {"main": {"*": f"'''Testo''' di [[{t}]]"}}}],
+            }
+            for i, t in enumerate(titles)
+        }
+        return {"query": {"pages": pages}, **cont}
+
+
+@pytest.fixture
+def make_adapter(tmp_path):
+    from rag.adapters.mediawiki import MediaWikiAdapter
+
+    def _make(pages, site, batch_size=50):
+        adapter = MediaWikiAdapter({
+            "url": "https://wiki.example.org",
+            "batch_size": batch_size,
+            "cache_dir": str(tmp_path / "wiki_cache"),
+            "request_delay": 0,
+        })
+        adapter.site = site
+        patches = [
+            patch.object(MediaWikiAdapter, "connect", return_value=True),
+            patch.object(MediaWikiAdapter, "_get_pages_list", return_value=pages),
+            patch.object(MediaWikiAdapter, "_save_sync_info"),
+        ]
+        return adapter, patches
+
+    return _make
+
+
+def _run(adapter, patches, progress=None):
+    for p in patches:
+        p.start()
+    try:
+        return list(adapter.iter_documents(progress_callback=progress))
+    finally:
+        for p in patches:
+            p.stop()
+
+
+class TestBatchedFetch:
+    def test_one_api_call_per_batch(self, make_adapter):
+        pages = [_FakePage(f"Pagina {i}") for i in range(120)]
+        site = _FakeSite()
+        adapter, patches = make_adapter(pages, site)
+        progress = []
+
+        docs = _run(adapter, patches, lambda frac, status: progress.append(frac))
+
+        assert len(site.calls) == 3
+        assert sorted(len(c["titles"].split("|")) for c in site.calls) == [20, 50, 50]
+        assert [d.metadata["title"] for d in docs] == [p.name for p in pages]
+        assert "Testo di Pagina 0" in docs[0].content
+        assert len(progress) == 120 and progress[-1] == pytest.approx(1.0)
+
+    def test_batch_size_capped_by_api_limit(self, make_adapter):
+        site = _FakeSite()
+        adapter, patches = make_adapter([_FakePage(f"P{i}") for i in range(60)], site, batch_size=500)
+        _run(adapter, patches)
+        assert len(site.calls) == 2
+
+    def test_continuation_is_followed(self, make_adapter):
+        site = _FakeSite(split_continue=True)
+        adapter, patches = make_adapter([_FakePage("A"), _FakePage("B")], site)
+        docs = _run(adapter, patches)
+        assert len(site.calls) == 2
+        assert site.calls[1]["rvcontinue"] == "x"
+        assert [d.metadata["title"] for d in docs] == ["A", "B"]
+
+    def test_failed_batch_falls_back_to_single_pages(self, make_adapter):
+        adapter, patches = make_adapter([_FakePage("A"), _FakePage("B")], _FakeSite(fail=True))
+        docs = _run(adapter, patches)
+        assert [d.content for d in docs] == ["testo singolo di A", "testo singolo di B"]
+
+
+def _stamps_and_load(adapter, patches, doc_paths=None):
+    for p in patches:
+        p.start()
+    try:
+        stamps = adapter.list_document_stamps()
+        loaded = {
+            path: doc
+            for path, doc, _ in adapter.iter_load_documents(doc_paths if doc_paths is not None else stamps)
+        }
+        return stamps, loaded
+    finally:
+        for p in patches:
+            p.stop()
+
+
+class TestIncrementalSync:
+    def test_recentchanges_updates_listing_and_cache(self, make_adapter):
+        from rag.adapters.mediawiki import MediaWikiAdapter
+
+        site = _FakeSite(revs={"A": 1, "B": 1})
+        adapter, patches = make_adapter([_FakePage("A"), _FakePage("B")], site)
+        stamps, loaded = _stamps_and_load(adapter, patches)
+        path_a, path_b = adapter._doc_path("A"), adapter._doc_path("B")
+        assert stamps == {path_a: {"rev": "1"}, path_b: {"rev": "1"}}
+        assert loaded[path_a].metadata["title"] == "A"
+        assert adapter.sync_stats["sync_mode"] == "full"
+
+        # Seconda sync: A modificata, B cancellata, C creata
+        site.revs = {"A": 2, "C": 5}
+        site.changes = [{"title": "A"}, {"title": "B"}, {"title": "C"}]
+        site.calls.clear()
+        adapter, patches = make_adapter([], site)
+        list_pages = patch.object(MediaWikiAdapter, "_get_pages_list", side_effect=AssertionError)
+        stamps, loaded = _stamps_and_load(adapter, [patches[0], list_pages, patches[2]])
+
+        path_c = adapter._doc_path("C")
+        assert stamps == {path_a: {"rev": "2"}, path_c: {"rev": "5"}}
+        assert adapter.sync_stats["sync_mode"] == "incremental"
+        assert set(loaded) == {path_a, path_c}
+        # Una richiesta prop=info + una prop=revisions
+        assert [c["prop"] for c in site.calls] == ["info", "revisions"]
+
+    def test_cached_revision_is_not_downloaded_again(self, make_adapter):
+        site = _FakeSite(revs={"A": 1})
+        adapter, patches = make_adapter([_FakePage("A")], site)
+        _stamps_and_load(adapter, patches)
+
+        # Re-indicizzazione completa (es. cambio chunking): testo dalla cache
+        site.calls.clear()
+        adapter, patches = make_adapter([_FakePage("A")], site)
+        stamps, loaded = _stamps_and_load(adapter, patches)
+        assert site.calls == []
+        assert "Testo di A" in loaded[adapter._doc_path("A")].content
+
+    def test_expired_cache_forces_full_listing(self, tmp_path):
+        from rag.adapters.wiki_cache import WikiPageCache
+
+        cache = WikiPageCache(tmp_path / "pages.sqlite")
+        filters = {"namespaces": [0]}
+        assert cache.changes_since(filters, 24) is None
+        cache.mark_synced(1000.0, full=True, filters=filters)
+        with patch("rag.adapters.wiki_cache.time.time", return_value=1000.0 + 3600):
+            assert cache.changes_since(filters, 24) < 1000.0
+            assert cache.changes_since({"namespaces": [0, 4]}, 24) is None
+            assert cache.changes_since(filters, 0.5) is None
+        cache.close()
+
+
+class TestExcludedCategories:
+    def test_members_fetched_in_bulk(self):
+        from rag.adapters.mediawiki import MediaWikiAdapter
+
+        adapter = MediaWikiAdapter({
+            "url": "https://wiki.example.org",
+            "exclude_categories": ["Bozze", "Categoria:Archivio"],
+            "request_delay": 0,
+        })
+        site = _FakeSite()
+        site.all_pages = [_FakePage(f"P{i}") for i in range(200)]
+        site.members = {
+            "Category:Bozze": ["P1", "P2", "P3", "Altro"],
+            "Category:Archivio": ["P10", "P11"],
+        }
+        adapter.site = site
+
+        pages = adapter._get_pages_list()
+
+        assert len(pages) == 195
+        assert {"P1", "P2", "P3", "P10", "P11"}.isdisjoint(p.name for p in pages)
+        # Due categorie × due pagine di risultati, indipendente dal numero di pagine
+        assert len(site.calls) == 4
+
+
+class _FakeDokuPages:
+    def __init__(self):
+        self.revs = {"ns:a": 100, "ns:b": 100}
+        self.changed = []
+        self.gets = []
+
+    def list(self, *args):
+        return [{"id": pid, "rev": rev} for pid, rev in self.revs.items()]
+
+    def changes(self, timestamp):
+        return [{"name": pid, "version": self.revs.get(pid, 999)} for pid in self.changed]
+
+    def get(self, page_id):
+        self.gets.append(page_id)
+        return f"**{page_id}** v{self.revs[page_id]}" if page_id in self.revs else ""
+
+
+class TestDokuWikiIncrementalSync:
+    def test_changes_and_deletions(self, tmp_path):
+        from rag.adapters.dokuwiki import DokuWikiAdapter
+
+        wiki = type("Wiki", (), {"pages": _FakeDokuPages()})()
+
+        def _sync():
+            adapter = DokuWikiAdapter({
+                "url": "https://doku.example.org",
+                "cache_dir": str(tmp_path),
+                "request_delay": 0,
+            })
+            with patch.object(DokuWikiAdapter, "connect", return_value=True), \
+                    patch.object(DokuWikiAdapter, "_new_client", return_value=wiki):
+                stamps = adapter.list_document_stamps()
+                return adapter, stamps, {p: doc for p, doc, _ in adapter.iter_load_documents(stamps)}
+
+        adapter, stamps, loaded = _sync()
+        assert sorted(wiki.pages.gets) == ["ns:a", "ns:b"]
+
+        # ns:b cancellata (contenuto vuoto), ns:a invariata
+        del wiki.pages.revs["ns:b"]
+        wiki.pages.changed = ["ns:b"]
+        wiki.pages.gets.clear()
+        adapter, stamps, loaded = _sync()
+        assert adapter.sync_stats["sync_mode"] == "incremental"
+        assert wiki.pages.gets == ["ns:b"]
+        assert loaded[adapter._doc_path("ns:a")].content == "ns:a v100"
+        assert loaded[adapter._doc_path("ns:b")] is None
+
+    def test_last_modified_matches_listing_rev(self, tmp_path):
+        import xmlrpc.client
+        from rag.adapters.dokuwiki import DokuWikiAdapter, _to_timestamp
+
+        assert _to_timestamp(xmlrpc.client.DateTime("20240131T10:15:00")) == 1706696100
+        assert _to_timestamp(xmlrpc.client.DateTime("20240131T11:15:00+0100")) == 1706696100
+        assert _to_timestamp("1706696100") == 1706696100
+
+        pages = _FakeDokuPages()
+        pages.revs = {"ns:a": 1706696100}
+        # DokuWiki senza "version": solo lastModified come DateTime XML-RPC
+        pages.changes = lambda timestamp: [
+            {"name": "ns:a", "lastModified": xmlrpc.client.DateTime("20240131T10:15:00")}
+        ]
+        wiki = type("Wiki", (), {"pages": pages})()
+
+        for _ in range(2):
+            adapter = DokuWikiAdapter({
+                "url": "https://doku.example.org",
+                "cache_dir": str(tmp_path),
+                "request_delay": 0,
+            })
+            with patch.object(DokuWikiAdapter, "connect", return_value=True), \
+                    patch.object(DokuWikiAdapter, "_new_client", return_value=wiki):
+                stamps = adapter.list_document_stamps()
+
+        assert adapter.sync_stats["sync_mode"] == "incremental"
+        assert stamps[adapter._doc_path("ns:a")]["rev"] == "1706696100"
+
+
+class TestUnreachableWiki:
+    def test_mediawiki_listing_failures_raise(self, make_adapter):
+        from rag import SourceUnavailableError
+        from rag.adapters.mediawiki import MediaWikiAdapter
+
+        adapter, patches = make_adapter([], _FakeSite())
+        offline = patch.object(MediaWikiAdapter, "connect", return_value=False)
+        broken = patch.object(MediaWikiAdapter, "_get_pages_list", side_effect=OSError("timeout"))
+        for variant in ([offline, patches[2]], patches, [patches[0], broken, patches[2]]):
+            for p in variant:
+                p.start()
+            try:
+                with pytest.raises(SourceUnavailableError):
+                    adapter.list_document_stamps()
+                with pytest.raises(SourceUnavailableError):
+                    list(adapter.iter_documents())
+            finally:
+                for p in variant:
+                    p.stop()
+
+    def test_dokuwiki_listing_failures_raise(self, tmp_path):
+        from rag import SourceUnavailableError
+        from rag.adapters.dokuwiki import DokuWikiAdapter
+
+        pages = _FakeDokuPages()
+        wiki = type("Wiki", (), {"pages": pages})()
+        adapter = DokuWikiAdapter({
+            "url": "https://doku.example.org",
+            "cache_dir": str(tmp_path),
+            "request_delay": 0,
+        })
+
+        with patch.object(DokuWikiAdapter, "connect", return_value=False):
+            with pytest.raises(SourceUnavailableError):
+                adapter.list_document_stamps()
+            with pytest.raises(SourceUnavailableError):
+                list(adapter.iter_documents())
+
+        pages.list = lambda *args: (_ for _ in ()).throw(RuntimeError("XML-RPC fault"))
+        with patch.object(DokuWikiAdapter, "connect", return_value=True), \
+                patch.object(DokuWikiAdapter, "_new_client", return_value=wiki):
+            with pytest.raises(SourceUnavailableError):
+                adapter.list_document_stamps()
+
+
+class TestLoadFailures:
+    def test_mediawiki_failed_batch_is_not_a_deletion(self, make_adapter):
+        adapter, patches = make_adapter([_FakePage("A"), _FakePage("B")], _FakeSite(fail=True))
+        for p in patches:
+            p.start()
+        try:
+            stamps = adapter.list_document_stamps()
+            results = list(adapter.iter_load_documents(stamps))
+        finally:
+            for p in patches:
+                p.stop()
+
+        assert [doc for _, doc, _ in results] == [None, None]
+        assert all(isinstance(error, RuntimeError) for _, _, error in results)
+
+    def test_mediawiki_iteration_with_failed_pages_raises(self, make_adapter):
+        from rag import SourceUnavailableError
+
+        adapter, patches = make_adapter([_FakePage("A"), _FakePage("B")], _FakeSite(fail=True))
+        with patch.object(_FakePage, "text", side_effect=RuntimeError("API non disponibile")):
+            with pytest.raises(SourceUnavailableError, match="2 pagine non scaricate"):
+                _run(adapter, patches)
+
+    def test_dokuwiki_failed_page_is_not_a_deletion(self, tmp_path):
+        from rag.adapters.dokuwiki import DokuWikiAdapter
+
+        pages = _FakeDokuPages()
+        wiki = type("Wiki", (), {"pages": pages})()
+        adapter = DokuWikiAdapter({
+            "url": "https://doku.example.org",
+            "cache_dir": str(tmp_path),
+            "request_delay": 0,
+        })
+
+        def _get(page_id):
+            if page_id == "ns:b":
+                raise RuntimeError("XML-RPC fault")
+            return f"**{page_id}**"
+
+        pages.get = _get
+        with patch.object(DokuWikiAdapter, "connect", return_value=True), \
+                patch.object(DokuWikiAdapter, "_new_client", return_value=wiki):
+            stamps = adapter.list_document_stamps()
+            results = {p: (doc, error) for p, doc, error in adapter.iter_load_documents(stamps)}
+
+        doc_a, error_a = results[adapter._doc_path("ns:a")]
+        doc_b, error_b = results[adapter._doc_path("ns:b")]
+        assert doc_a.content == "ns:a" and error_a is None
+        assert doc_b is None and isinstance(error_b, RuntimeError)
+
+
+class _HTTPError(Exception):
+    def __init__(self, status, retry_after=None):
+        super().__init__(f"HTTP {status}")
+        headers = {"Retry-After": str(retry_after)} if retry_after is not None else {}
+        self.response = type("Response", (), {"status_code": status, "headers": headers})()
+
+
+class TestFetching:
+    def test_token_bucket_enforces_rate(self):
+        from rag.adapters.fetching import TokenBucket
+
+        bucket = TokenBucket(rate=20)
+        start = time.monotonic()
+        for _ in range(5):
+            bucket.acquire()
+        # Primo token subito, poi uno ogni 50 ms
+        assert time.monotonic() - start >= 0.19
+
+    def test_estimate_fetch_seconds_takes_slower_bound(self):
+        from rag.adapters.fetching import estimate_fetch_seconds
+
+        # Rate limit dominante: 10 richieste a 1 ogni 0.5 s
+        assert estimate_fetch_seconds(10, 0.5, workers=4, latency=1.0) == 5.0
+        # Latenza dominante: nessun delay, 4 worker sovrappongono le richieste
+        assert estimate_fetch_seconds(10, 0, workers=4, latency=1.0) == 2.5
+        assert estimate_fetch_seconds(10, 0, workers=1, latency=1.0) == 10.0
+
+    def test_retry_on_429_and_5xx_only(self):
+        from rag.adapters import fetching
+
+        calls = []
+
+        def flaky():
+            calls.append(1)
+            if len(calls) == 1:
+                raise _HTTPError(429, retry_after=2)
+            if len(calls) == 2:
+                raise _HTTPError(503)
+            return "ok"
+
+        def not_found():
+            calls.append(1)
+            raise _HTTPError(404)
+
+        with patch.object(fetching.time, "sleep") as sleep:
+            assert fetching.call_with_retry(flaky) == "ok"
+            with pytest.raises(_HTTPError):
+                fetching.call_with_retry(not_found)
+        assert len(calls) == 4
+        # Retry-After rispettato, poi backoff esponenziale
+        assert sleep.call_args_list[0].args == (2.0,)
+        assert sleep.call_count == 2
+
+    def test_iter_ordered_overlaps_latency(self):
+        from rag.adapters.fetching import iter_ordered
+
+        active, peak = [0], [0]
+        lock = threading.Lock()
+
+        def slow(i):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.05)
+            with lock:
+                active[0] -= 1
+            if i == 3:
+                raise ValueError("pagina rotta")
+            return i * 10
+
+        results = list(iter_ordered(slow, range(8), workers=4))
+        assert [r[0] for r in results] == list(range(8))
+        assert [r[1] for r in results if r[2] is None] == [0, 10, 20, 40, 50, 60, 70]
+        assert isinstance(results[3][2], ValueError)
+        assert peak[0] == 4
+
+
+_DUMP_HEADER = """<mediawiki xmlns="http://www.mediawiki.org/xml/export-0.11/" version="0.11">
+  <siteinfo>
+    <sitename>Wiki di prova</sitename>
+    <base>https://wiki.example.org/wiki/Pagina_principale</base>
+    <namespaces>
+      <namespace key="0" case="first-letter" />
+      <namespace key="14" case="first-letter">Categoria</namespace>
+    </namespaces>
+  </siteinfo>
+"""
+
+
+def _dump_page(title, text, ns=0, redirect=False, revisions=1):
+    revs = "".join(
+        f"<revision><id>{i}</id><timestamp>2026-01-0{i}T00:00:00Z</timestamp>"
+        f"<text xml:space=\"preserve\">{text} r{i}</text></revision>"
+        for i in range(1, revisions + 1)
+    )
+    redirect_tag = f'<redirect title="{title}x" />' if redirect else ""
+    return f"<page><title>{title}</title><ns>{ns}</ns><id>1</id>{redirect_tag}{revs}</page>\n"
+
+
+class TestMediaWikiDump:
+    @pytest.fixture
+    def dump_file(self, tmp_path):
+        import bz2
+
+        pages = [_dump_page(f"Voce {i}", f"'''Voce''' {i} [[collegamento]]") for i in range(500)]
+        pages += [
+            _dump_page("Storia", "Testo", revisions=3),
+            _dump_page("Vecchia", "#RINVIA [[Nuova]]", redirect=True),
+            _dump_page("Wiki:Aiuto", "Aiuto", ns=4),
+            _dump_page("Bozza", "Da finire [[Categoria:Bozze|B]]"),
+            _dump_page("Privata", "Riservato"),
+        ]
+        data = (_DUMP_HEADER + "".join(pages) + "</mediawiki>\n").encode("utf-8")
+        path = tmp_path / "pages-articles.xml.bz2"
+        path.write_bytes(bz2.compress(data))
+        return path
+
+    def test_streams_filtered_documents(self, dump_file):
+        from rag import MediaWikiDumpAdapter
+
+        adapter = MediaWikiDumpAdapter({
+            "dump_path": str(dump_file),
+            "exclude_categories": ["Bozze"],
+            "exclude_pages": ["Priv*"],
+        })
+        progress = []
+        docs = list(adapter.iter_documents(lambda frac, status: progress.append(frac)))
+
+        titles = [d.metadata["title"] for d in docs]
+        assert titles == [f"Voce {i}" for i in range(500)] + ["Storia"]
+        # Ultima revisione, wikitext pulito, path come MediaWikiAdapter
+        storia = docs[-1]
+        assert storia.content == "Testo r3"
+        assert storia.path == "mediawiki://https://wiki.example.org/wiki/Storia"
+        assert docs[0].content == "Voce 0 collegamento r1"
+        assert progress[-1] == 1.0 and len(progress) > 1
+        assert adapter.sync_stats["loaded_pages"] == 501
+
+    def test_max_pages_and_missing_file(self, dump_file, tmp_path):
+        from rag import MediaWikiDumpAdapter, SourceUnavailableError
+
+        adapter = MediaWikiDumpAdapter({"dump_path": str(dump_file), "max_pages": 10})
+        assert len(list(adapter.iter_documents())) == 10
+        with pytest.raises(SourceUnavailableError):
+            list(MediaWikiDumpAdapter({"dump_path": str(tmp_path / "no.xml")}).iter_documents())
+
+    def test_truncated_dump_raises_after_read_pages(self, tmp_path):
+        """Dump troncato: le pagine lette escono, poi l'errore (non una fine normale)"""
+        from rag import MediaWikiDumpAdapter, SourceUnavailableError
+
+        pages = "".join(_dump_page(f"Voce {i}", "Testo") for i in range(3))
+        path = tmp_path / "troncato.xml"
+        path.write_text(_DUMP_HEADER + pages + "<page><title>Voce 3</title><ns>0", encoding="utf-8")
+
+        read = []
+        with pytest.raises(SourceUnavailableError, match="troncato.xml"):
+            for doc in MediaWikiDumpAdapter({"dump_path": str(path)}).iter_documents():
+                read.append(doc.metadata["title"])
+        assert read == ["Voce 0", "Voce 1", "Voce 2"]
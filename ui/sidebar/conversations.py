@@ -1,5 +1,7 @@
 # ui/sidebar/conversations.py
 # DeepAiUG v1.4.0 - Sidebar: Gestione conversazioni salvate
+# v1.16.0 - Avviso KB pesante da catalogo + riepilogo vault in cache
+# v1.16.0 - Al caricamento riusa l'indice esistente (sync incrementale)
 # ============================================================================
 
 from pathlib import Path
@@ -15,8 +17,8 @@ from core import (
 )
 from rag import KnowledgeBaseManager, TextChunker, LocalFolderAdapter
 from rag.embeddings import get_seconds_per_file, format_eta, get_active_model_tag
-from config.constants import VAULT_SESSION_KEY, VAULT_LAST_SYNC_KEY, VAULT_FILE_COUNT_KEY
-from rag.vault import detect_vault_type, scan_vault_files
+from config.constants import VAULT_SESSION_KEY, VAULT_LAST_SYNC_KEY, VAULT_FILE_COUNT_KEY, VAULT_TYPES
+from rag.vault import detect_vault_type, get_vault_summary
 import time
 from ui.socratic import SocraticHistory, clear_socratic_cache  # v1.9.0
 
@@ -57,7 +59,11 @@ def render_conversations_manager():
         conv_options.append({"label": label, "id": c["id"],
                              "is_sensitive": c.get("is_sensitive", False),
                              "reason": c.get("reason", ""), "icons": icons,
-                             "kb_metadata": c.get("kb_metadata", {})})
+                             "kb_metadata": c.get("kb_metadata", {}),
+                             "kb_enabled": c.get("kb_enabled", False),
+                             "kb_folder_path": c.get("kb_folder_path", ""),
+                             "kb_chunk_size": c.get("kb_chunk_size", DEFAULT_CHUNK_SIZE),
+                             "kb_chunk_overlap": c.get("kb_chunk_overlap", DEFAULT_CHUNK_OVERLAP)})
 
     selected = st.sidebar.selectbox(
         "Carica",
@@ -96,7 +102,7 @@ def render_conversations_manager():
                         )
                     else:
                         # Controlla se ha vault pesante — se sì chiede conferma
-                        needs_confirm = _has_heavy_kb(sel_entry["id"])
+                        needs_confirm = _has_heavy_kb(sel_entry)
                         if needs_confirm:
                             st.session_state["pending_load_id"] = sel_entry["id"]
                             st.rerun()
@@ -112,7 +118,7 @@ def render_conversations_manager():
             # Pannello conferma per vault pesanti
             pending_id = st.session_state.get("pending_load_id")
             if pending_id and pending_id == sel_entry["id"]:
-                _show_load_warning(pending_id)
+                _show_load_warning(sel_entry)
                 col_ok, col_no = st.sidebar.columns(2)
                 with col_ok:
                     if st.button("✅ Procedi", key="confirm_load"):
@@ -185,48 +191,60 @@ def _get_kb_metadata_icon(kb_metadata: dict | None) -> str:
     return "📚"
 
 
-def _has_heavy_kb(conversation_id: str) -> bool:
+def _kb_vault_summary(conv_entry: dict):
     """
-    Ritorna True se la conversazione ha una KB locale attiva
-    con almeno 50 file — soglia per mostrare la conferma.
+    Riepilogo (in cache) del vault della KB locale di una conversazione,
+    ricavato dal catalogo senza caricare il file della conversazione.
+    None se la conversazione non usa una KB locale esistente.
     """
-    from core import load_conversation as _load_raw
-    data = _load_raw(conversation_id)
-    if not data:
-        return False
-    kb_settings = data.get("knowledge_base", {})
-    if not kb_settings.get("use_knowledge_base", False):
-        return False
-    folder_path = kb_settings.get("kb_folder_path", "")
-    if not folder_path or not Path(folder_path).exists():
+    if not conv_entry.get("kb_enabled", False):
+        return None
+    return get_vault_summary(conv_entry.get("kb_folder_path", ""))
+
+
+def _kb_already_indexed(conv_entry: dict) -> bool:
+    """
+    True se la KB corrente contiene già l'indice della cartella della
+    conversazione con gli stessi parametri di chunking: il caricamento
+    farà solo una sync incrementale.
+    """
+    kb_manager = st.session_state.get("kb_manager")
+    if not kb_manager or not conv_entry.get("kb_enabled", False):
         return False
-    vault_info = detect_vault_type(folder_path)
-    file_list = scan_vault_files(folder_path, vault_info)
-    return len(file_list) >= 50
+    source_id = LocalFolderAdapter(
+        {"folder_path": conv_entry.get("kb_folder_path", "")}
+    ).get_source_id()
+    return kb_manager.has_index_for(
+        source_id,
+        conv_entry.get("kb_chunk_size", DEFAULT_CHUNK_SIZE),
+        conv_entry.get("kb_chunk_overlap", DEFAULT_CHUNK_OVERLAP),
+    )
 
 
-def _show_load_warning(conversation_id: str):
+def _has_heavy_kb(conv_entry: dict) -> bool:
     """
-    Mostra avviso informativo prima di caricare una conversazione
-    con Knowledge Base attiva. Legge i metadati senza caricare
-    l'intera conversazione.
+    Ritorna True se la conversazione ha una KB locale attiva
+    con almeno 50 file da re-indicizzare — soglia per mostrare la
+    conferma. Con un indice già presente non serve conferma.
     """
-    from core import load_conversation as _load_raw
-    data = _load_raw(conversation_id)
-    if not data:
-        return
+    summary = _kb_vault_summary(conv_entry)
+    if not summary or summary["file_count"] < 50:
+        return False
+    return not _kb_already_indexed(conv_entry)
 
-    kb_settings = data.get("knowledge_base", {})
-    if not kb_settings.get("use_knowledge_base", False):
-        return
 
-    folder_path = kb_settings.get("kb_folder_path", "")
-    if not folder_path or not Path(folder_path).exists():
+def _show_load_warning(conv_entry: dict):
+    """
+    Mostra avviso informativo prima di caricare una conversazione
+    con Knowledge Base attiva. Usa il riepilogo del catalogo e quello
+    del vault in cache, senza caricare la conversazione né rileggere
+    la cartella.
+    """
+    summary = _kb_vault_summary(conv_entry)
+    if not summary:
         return
 
-    vault_info = detect_vault_type(folder_path)
-    file_list = scan_vault_files(folder_path, vault_info)
-    n_files = len(file_list)
+    n_files = summary["file_count"]
 
     # v1.15.0 — stima adattiva al modello di embedding attivo
     # (era hardcoded 0.4 s/file pre-1.15.0, troppo ottimistica per e5-small)
@@ -236,7 +254,7 @@ def _show_load_warning(conversation_id: str):
     short_model = model_tag.rsplit("/", 1)[-1] if "/" in model_tag else model_tag
 
     st.sidebar.info(
-        f"{vault_info['icon']} **{vault_info['label']}** — {n_files} file  \n"
+        f"{summary['icon']} **{summary['label']}** — {n_files} file  \n"
         f"⏱️ Ri-indicizzazione stimata: **{stima_str}** "
         f"(modello: `{short_model}`)"
     )
@@ -303,9 +321,19 @@ def _load_conversation(conversation_id: str):
                     "recursive": kb_settings["kb_recursive"]
                 })
                 kb_manager.set_adapter(adapter)
+                # v1.16.0 — indice già presente per cartella + chunking:
+                # sync incrementale (solo file cambiati), altrimenti
+                # index_documents ricade da sé sulla re-indicizzazione completa
+                already_indexed = kb_manager.has_index_for(
+                    adapter.get_source_id(),
+                    kb_settings["kb_chunk_size"],
+                    kb_settings["kb_chunk_overlap"],
+                )
                 # Re-indicizza con progress bar (v1.13.4 callback)
                 progress_bar = st.sidebar.progress(
-                    0, text="Re-indicizzazione in corso..."
+                    0,
+                    text="Aggiornamento indice..." if already_indexed
+                    else "Re-indicizzazione in corso..."
                 )
 
                 def _progress_cb(*args, **kwargs):
@@ -325,12 +353,13 @@ def _load_conversation(conversation_id: str):
                             text=f"Re-indicizzazione: {chunks_done}/{chunks_total} chunk"
                         )
 
-                kb_manager.index_documents(progress_callback=_progress_cb)
+                kb_manager.index_documents(progress_callback=_progress_cb, incremental=True)
                 progress_bar.empty()
 
-                # Aggiorna stato vault
-                vault_info = detect_vault_type(folder_path)
-                file_list = scan_vault_files(folder_path, vault_info)
-                st.session_state[VAULT_SESSION_KEY]    = vault_info
-                st.session_state[VAULT_LAST_SYNC_KEY]  = time.time()
-                st.session_state[VAULT_FILE_COUNT_KEY] = len(file_list)
+                # Aggiorna stato vault (riepilogo in cache, senza riscansione)
+                summary = get_vault_summary(folder_path)
+                if summary:
+                    vault_type = summary["type"]
+                    st.session_state[VAULT_SESSION_KEY]    = {**VAULT_TYPES[vault_type], "type": vault_type}
+                    st.session_state[VAULT_LAST_SYNC_KEY]  = time.time()
+                    st.session_state[VAULT_FILE_COUNT_KEY] = summary["file_count"]
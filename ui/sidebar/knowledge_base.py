@@ -2,8 +2,14 @@
 # DeepAiUG v1.12.0 - Sidebar: Configurazione Knowledge Base Multi-Tipo
 # ============================================================================
 # 🆕 v1.12.0: container parameter per supporto st.expander
+# 🆕 v1.16.0: stima ETA con walk_files (una sola scansione della cartella)
+# 🆕 v1.16.0: conteggio file del vault rilevato da get_vault_summary (cache)
+# 🆕 v1.16.0: sorgente "Dump MediaWiki (XML)" (MediaWikiDumpAdapter, offline)
+# 🆕 v1.16.0: ETA wiki da richieste batch, worker e rate limit
+# 🆕 v1.16.0: errore della sorgente mostrato se la sync viene annullata
 # ============================================================================
 
+import math
 from pathlib import Path
 from datetime import datetime
 import streamlit as st
@@ -27,11 +33,15 @@ from rag import (
     TextChunker,
     LocalFolderAdapter,
     MediaWikiAdapter,
+    MediaWikiDumpAdapter,
     DokuWikiAdapter,
 )
 from config.constants import VAULT_SESSION_KEY, VAULT_LAST_SYNC_KEY, VAULT_FILE_COUNT_KEY
+from config.constants import MEDIAWIKI_DEFAULT_BATCH_SIZE, MEDIAWIKI_DEFAULT_REQUEST_DELAY, WIKI_FETCH_WORKERS
 from core.url_validator import is_blocked, classify_url
-from rag.vault import detect_vault_type, scan_vault_files
+from rag.vault import detect_vault_type, scan_vault_files, walk_files, get_vault_summary
+from rag.adapters.fetching import estimate_fetch_seconds
+from rag.adapters.mediawiki import MEDIAWIKI_MAX_TITLES_PER_REQUEST
 from rag.embeddings import (
     get_seconds_per_file,
     get_seconds_per_wiki_page,
@@ -223,6 +233,8 @@ def _render_custom_source_selector():
         _render_local_folder_config()
     elif source_id == "mediawiki":
         _render_mediawiki_custom_config()
+    elif source_id == "mediawiki_dump":
+        _render_mediawiki_dump_config()
     elif source_id == "dokuwiki":
         _render_dokuwiki_custom_config()
 
@@ -295,7 +307,7 @@ def _render_local_folder_from_yaml(source: dict, adapter_config: dict):
         st.session_state[VAULT_SESSION_KEY] = vault_info
         _container.info(
             f"{vault_info['icon']} **{vault_info['label']} rilevato**  \n"
-            f"{len(scan_vault_files(folder_path, vault_info))} file compatibili trovati"
+            f"{get_vault_summary(folder_path)['file_count']} file compatibili trovati"
         )
         auto_ext = vault_info['include_ext']
     else:
@@ -371,7 +383,7 @@ def _render_local_folder_config():
         st.session_state[VAULT_SESSION_KEY] = vault_info
         _container.info(
             f"{vault_info['icon']} **{vault_info['label']} rilevato**  \n"
-            f"{len(scan_vault_files(folder_path, vault_info))} file compatibili trovati"
+            f"{get_vault_summary(folder_path)['file_count']} file compatibili trovati"
         )
         auto_ext = vault_info['include_ext']
     else:
@@ -536,6 +548,49 @@ def _render_mediawiki_custom_config():
             _container.error("❌ Specifica un URL wiki valido")
 
 
+def _render_mediawiki_dump_config():
+    """Renderizza configurazione per un dump XML MediaWiki (offline)."""
+    dump_path = _container.text_input(
+        "Percorso dump",
+        value=st.session_state.get("mw_dump_path", ""),
+        placeholder="/path/to/itwiki-latest-pages-articles.xml.bz2",
+        help="File .xml, .xml.bz2 o .xml.gz (Special:Export o dumps.wikimedia.org)"
+    )
+    st.session_state["mw_dump_path"] = dump_path
+
+    if dump_path and Path(dump_path).is_file():
+        size_mb = Path(dump_path).stat().st_size / 1024 / 1024
+        _container.info(f"🗜️ Dump di **{size_mb:,.0f} MB** — letto in streaming, senza rete")
+    elif dump_path:
+        _container.warning("⚠️ File non trovato")
+
+    # Opzioni avanzate
+    with _container.expander("⚙️ Opzioni avanzate", expanded=False):
+        dump_namespace = st.number_input(
+            "Namespace", value=0, min_value=0,
+            help="0 = Main (articoli normali)", key="mw_dump_ns"
+        )
+        dump_max_pages = st.number_input(
+            "Max pagine", value=0, min_value=0,
+            help="0 = tutte le pagine", key="mw_dump_max"
+        )
+
+    # Parametri Chunking
+    _render_chunking_params(key_prefix="mw_dump")
+
+    # Pulsante indicizzazione
+    if _container.button("🔄 Indicizza Dump", use_container_width=True, type="primary"):
+        if dump_path and Path(dump_path).is_file():
+            adapter_config = {
+                "dump_path": dump_path,
+                "namespaces": [dump_namespace],
+                "max_pages": dump_max_pages,
+            }
+            _sync_source("mediawiki_dump", adapter_config)
+        else:
+            _container.error("❌ Percorso dump non valido")
+
+
 def _render_dokuwiki_custom_config():
     """Renderizza configurazione custom per DokuWiki."""
     _container.markdown("**URL Wiki:**")
@@ -593,8 +648,10 @@ def _show_indexing_eta(source_type: str, config: dict):
 
     - Per cartelle/vault: conta i file presenti applicando estensioni e
       pattern di esclusione, moltiplica per il fattore secondi/file.
-    - Per wiki: usa max_pages (se impostato) e considera anche il delay HTTP.
-      Senza max_pages mostra un avviso generico.
+    - Per wiki: usa max_pages (se impostato). Il download è stimato sulle
+      richieste HTTP (pagine per batch su MediaWiki, una per pagina su
+      DokuWiki), sovrapposte dai worker ma limitate a 1/request_delay al
+      secondo. Senza max_pages mostra un avviso generico.
     """
     model_tag = get_active_model_tag()
     short_model = model_tag.rsplit("/", 1)[-1] if "/" in model_tag else model_tag
@@ -609,15 +666,7 @@ def _show_indexing_eta(source_type: str, config: dict):
         exclude_patterns = config.get("exclude_patterns", [])
         recursive = config.get("recursive", True)
 
-        files = []
-        glob_fn = Path(folder).rglob if recursive else Path(folder).glob
-        for ext in extensions:
-            for f in glob_fn(f"*{ext}"):
-                if exclude_patterns and any(p in str(f) for p in exclude_patterns):
-                    continue
-                files.append(f)
-
-        n_files = len(files)
+        n_files = len(walk_files(folder, extensions, exclude_patterns, recursive=recursive))
         if n_files == 0:
             _container.warning("⚠️ Nessun file trovato con le estensioni configurate")
             return
@@ -634,15 +683,24 @@ def _show_indexing_eta(source_type: str, config: dict):
     # ---- MediaWiki / DokuWiki ----
     if source_type in ("mediawiki", "dokuwiki"):
         max_pages = int(config.get("max_pages", 0) or 0)
-        request_delay = float(config.get("request_delay", 0.5) or 0.5)
+        request_delay = float(config.get("request_delay", MEDIAWIKI_DEFAULT_REQUEST_DELAY) or 0)
+        workers = int(config.get("workers", WIKI_FETCH_WORKERS) or 1)
 
         if max_pages > 0:
-            spp = get_seconds_per_wiki_page(request_delay)
-            eta_sec = max(10, int(max_pages * spp))
+            if source_type == "mediawiki":
+                batch_size = int(config.get("batch_size", MEDIAWIKI_DEFAULT_BATCH_SIZE) or 1)
+                pages_per_request = max(1, min(batch_size, MEDIAWIKI_MAX_TITLES_PER_REQUEST))
+            else:
+                pages_per_request = 1  # DokuWiki: una chiamata wiki.getPage per pagina
+            n_requests = math.ceil(max_pages / pages_per_request)
+            fetch_sec = estimate_fetch_seconds(n_requests, request_delay, workers)
+            # Solo parsing + embedding: il download è già in fetch_sec
+            embed_sec = max_pages * get_seconds_per_wiki_page(0)
+            eta_sec = max(10, int(fetch_sec + embed_sec))
             _container.info(
-                f"🌐 **{max_pages} pagine wiki** (max)  \n"
+                f"🌐 **{max_pages} pagine wiki** (max, {n_requests} richieste HTTP)  \n"
                 f"⏱️ Tempo stimato: **{format_eta(eta_sec)}** "
-                f"(modello: `{short_model}`, delay HTTP: {request_delay}s)  \n"
+                f"(modello: `{short_model}`, delay HTTP: {request_delay}s, worker: {workers})  \n"
                 f"💡 Il throttling HTTP è dominante, l'embedding è veloce"
             )
         else:
@@ -653,9 +711,13 @@ def _show_indexing_eta(source_type: str, config: dict):
         return
 
 
-def _sync_source(source_type: str, config: dict):
+def _sync_source(source_type: str, config: dict, incremental: bool = True):
     """
     Sincronizza una sorgente creando l'adapter appropriato.
+
+    Di default la sync è incrementale: vengono ri-indicizzati solo i
+    documenti nuovi o modificati rispetto al manifest della collection
+    (re-indicizzazione completa automatica se sorgente o chunking cambiano).
     """
     kb_manager: KnowledgeBaseManager = st.session_state["kb_manager"]
 
@@ -678,6 +740,8 @@ def _sync_source(source_type: str, config: dict):
         adapter = LocalFolderAdapter(config)
     elif source_type == "mediawiki":
         adapter = MediaWikiAdapter(config)
+    elif source_type == "mediawiki_dump":
+        adapter = MediaWikiDumpAdapter(config)
     elif source_type == "dokuwiki":
         adapter = DokuWikiAdapter(config)
     else:
@@ -695,13 +759,20 @@ def _sync_source(source_type: str, config: dict):
     def _ui_progress(status: str, frac: float):
         progress_bar.progress(min(frac, 1.0), text=status)
 
-    success = kb_manager.index_documents(progress_callback=_ui_progress)
+    success = kb_manager.index_documents(
+        progress_callback=_ui_progress, incremental=incremental
+    )
 
     if success:
         progress_bar.progress(1.0, text="✅ Indicizzazione completata!")
     else:
         progress_bar.empty()
-        _container.error("❌ Errore indicizzazione")
+        # Sorgente non leggibile: l'indice precedente è rimasto invariato
+        error = kb_manager.last_index_report.get("error")
+        if error:
+            _container.error(f"❌ Errore indicizzazione: {error}  \nL'indice esistente non è stato modificato.")
+        else:
+            _container.error("❌ Errore indicizzazione")
 
 
 def _show_last_sync_info(source_type: str, config: dict):